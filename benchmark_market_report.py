@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Market Update Benchmark
+Builds synthetic AKP databases and times the report generator against them
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from generate_market_report import (
+    DATABASES, AKPConnection, MarketReportGenerator, bootstrap_indexes, refresh_aggregates
+)
+
+BENCH_DIR = Path(__file__).parent / "benchmarks"
+DATA_DIR = BENCH_DIR / "data"
+RESULTS_PATH = BENCH_DIR / "results.jsonl"
+
+# Synthetic database files, named as in "10. Database AKP"
+DATABASE_FILES = {alias: Path(path).name for alias, path in DATABASES.items()}
+
+# Series families: (prefix, number of series, popularity weight, tenor range in years)
+# SUN FR series dominate PLTE trading, followed by SBSN PBS; the rest trade rarely
+SERIES_FAMILIES = [
+    ('FR', 70, 1.0, (5, 30)),
+    ('PBS', 35, 0.45, (3, 25)),
+    ('VR', 6, 0.05, (5, 10)),
+    ('SPN', 12, 0.10, (0.25, 1)),
+    ('SPNS', 10, 0.05, (0.25, 1)),
+    ('ORI', 8, 0.08, (3, 6)),
+    ('SR', 8, 0.06, (2, 5)),
+    ('SBR', 5, 0.03, (2, 4)),
+    ('ST', 5, 0.02, (2, 4))
+]
+BENCHMARK_SHARE = 0.45  # share of FR/PBS trades in the ten most recent long series
+AUCTION_MULTIPLIER = 3  # trades on auction days (every other Tuesday) relative to normal days
+HOLIDAYS_PER_YEAR = 15
+OUTLIER_RATE = 0.005  # trades with a zero, negative or >20% yield
+TRANSACTIONS_PER_TRADE = 0.2  # Transaksi_Harian rows per PLTE row
+TRANSACTION_TYPES = ['SALE', 'ALLOTMENT', 'FOP', 'REPO', 'REPO 2nd LEG', 'REVERSE REPO']
+OWNERSHIP_CATEGORIES = ['SUN', 'SBSN']
+INSERT_CHUNK = 200000
+
+
+def parse_count(value):
+    """Parse a row count such as 250000, 500K, 10M or 1.5M"""
+    value = str(value).strip().upper().replace('_', '')
+    scale = {'K': 1000, 'M': 1000000, 'B': 1000000000}.get(value[-1:], 1)
+    number = value[:-1] if scale > 1 else value
+    return int(float(number) * scale)
+
+
+def trading_days(years, end, rng):
+    """Weekdays over the last `years` years up to end, minus random holidays"""
+    start = end - timedelta(days=round(365.25 * years))
+    days = []
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    holidays = set(rng.sample(days[:-2], min(len(days) - 2, round(HOLIDAYS_PER_YEAR * years))))
+    return [day for day in days if day not in holidays]
+
+
+def make_series(first_day, last_day, rng):
+    """Series with issue and maturity dates spread over (and beyond) the history"""
+    span = (last_day - first_day).days
+    series = []
+    for prefix, count, weight, (min_tenor, max_tenor) in SERIES_FAMILIES:
+        digits = 3 if prefix in ('PBS', 'ORI', 'SR', 'ST', 'SBR') else 4
+        for number in range(1, count + 1):
+            tenor = rng.uniform(min_tenor, max_tenor)
+            # Issue anywhere from one tenor before the history to its last month
+            issue = first_day + timedelta(days=rng.randint(-round(tenor * 365), max(span - 30, 0)))
+            maturity = issue + timedelta(days=round(tenor * 365.25))
+            series.append({
+                'code': f"{prefix}{number:0{digits}d}",
+                'family': prefix,
+                'weight': weight / count,
+                'issue': issue,
+                'maturity': maturity,
+                'coupon': round(rng.uniform(5, 9) * 8) / 8
+            })
+    return series
+
+
+def curve_yield(level, years):
+    """Nelson-Siegel-shaped yield (%) at a remaining tenor"""
+    x = max(years, 0.01) / 2.5
+    slope = (1 - math.exp(-x)) / x
+    return level - 1.2 * slope + 0.8 * (slope - math.exp(-x))
+
+
+def generate_databases(directory, plte_rows, years, seed=42, end=None):
+    """Write the five AKP databases with synthetic data to directory
+
+    DB_PLTE gets about plte_rows trades spread over the trading days of the
+    last `years` years, with heavier auction days, Zipf-like popularity per
+    series (recent FR/PBS benchmarks trade most), yields around a drifting
+    curve by remaining tenor and a small share of invalid yields. The other
+    tables get one row per day (per tenor/category where applicable).
+    """
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in DATABASE_FILES.values():
+        (directory / name).unlink(missing_ok=True)
+
+    end = end or date.today()
+    days = trading_days(years, end, rng)
+    series = make_series(days[0], days[-1], rng)
+    auctions = {day for day in days if day.weekday() == 1 and day.isocalendar()[1] % 2 == 0}
+    day_weights = [AUCTION_MULTIPLIER if day in auctions else 1 for day in days]
+    per_weight = plte_rows / sum(day_weights)
+
+    # Curve level and market series as random walks
+    level, usd, ihsg, ust, cds = 6.8, 15500.0, 7000.0, 3.5, 90.0
+    market = []
+    for day in days:
+        level += rng.gauss(0, 0.03)
+        usd *= math.exp(rng.gauss(0, 0.004))
+        ihsg *= math.exp(rng.gauss(0, 0.009))
+        ust += rng.gauss(0, 0.04)
+        cds *= math.exp(rng.gauss(0, 0.02))
+        market.append({'day': day, 'level': level, 'usd': usd, 'ihsg': ihsg, 'ust': ust, 'cds': cds})
+
+    def connect(alias):
+        conn = sqlite3.connect(directory / DATABASE_FILES[alias])
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        return conn
+
+    started = time.monotonic()
+    plte = connect('plte')
+    plte.execute("""
+        CREATE TABLE DB_PLTE (
+            tanggal_transaksi TEXT, Securities_Id TEXT, Yield REAL, Price REAL,
+            Coupon_Rate REAL, Volume REAL, Value REAL, Mature_Date TEXT
+        )
+    """)
+    transaksi = connect('transaksi')
+    transaksi.execute("""
+        CREATE TABLE Transaksi_Harian (
+            TANGGAL_SETELMEN TEXT, JENIS_TRANSAKSI TEXT, SERI TEXT,
+            NOMINAL REAL, NILAI_TRANSAKSI REAL, YIELD REAL
+        )
+    """)
+
+    def trades():
+        for day, weight, state in zip(days, day_weights, market):
+            live = [s for s in series if s['issue'] <= day < s['maturity']]
+            if not live:
+                continue
+            # The ten most recently issued long FR/PBS series act as benchmarks
+            recent = sorted((s for s in live if s['family'] in ('FR', 'PBS')),
+                            key=lambda s: s['issue'], reverse=True)[:10]
+            weights = [s['weight'] + (BENCHMARK_SHARE / len(recent) if s in recent else 0) for s in live]
+            count = max(1, round(rng.lognormvariate(0, 0.25) * per_weight * weight))
+            stamp = day.isoformat()
+            for s in rng.choices(live, weights, k=count):
+                years_left = (s['maturity'] - day).days / 365.25
+                value = curve_yield(state['level'], years_left) + rng.gauss(0, 0.04)
+                if s['family'] not in ('FR', 'SPN', 'VR', 'ORI', 'SBR'):
+                    value += 0.15  # SBSN spread
+                if rng.random() < OUTLIER_RATE:
+                    value = rng.choice([0.0, -1.0, 25.0])
+                price = 100 + (s['coupon'] - value) * min(years_left, 15) * 0.8
+                volume = round(rng.lognormvariate(22, 1.2), -6)
+                yield (stamp, s['code'], value, price, s['coupon'], volume, volume * price / 100,
+                       s['maturity'].isoformat())
+
+    inserted = transactions = 0
+    batch = []
+    for trade in trades():
+        batch.append(trade)
+        if len(batch) >= INSERT_CHUNK:
+            inserted, transactions = _flush(plte, transaksi, batch, inserted, transactions, rng)
+            batch = []
+    inserted, transactions = _flush(plte, transaksi, batch, inserted, transactions, rng)
+    plte.commit()
+    transaksi.commit()
+    plte.close()
+    transaksi.close()
+
+    kepemilikan = connect('kepemilikan')
+    kepemilikan.execute("""
+        CREATE TABLE Kepemilikan_Investor_Tradable (
+            tanggal TEXT, KATEGORI_SBN TEXT, Total_CN REAL, Total_CR REAL, Total_OR REAL
+        )
+    """)
+    holdings = {category: [4e13, 3.5e14, 8e14] for category in OWNERSHIP_CATEGORIES}
+    rows = []
+    for day in days:
+        for category, values in holdings.items():
+            for i in range(3):
+                values[i] *= math.exp(rng.gauss(0.0002, 0.002))
+            rows.append((day.isoformat(), category, *values))
+    kepemilikan.executemany("INSERT INTO Kepemilikan_Investor_Tradable VALUES (?, ?, ?, ?, ?)", rows)
+    kepemilikan.commit()
+    kepemilikan.close()
+
+    subreg = connect('subreg')
+    subreg.execute("CREATE TABLE Subreg (tanggal TEXT)")
+    subreg.commit()
+    subreg.close()
+
+    domestik = connect('domestik')
+    domestik.executescript("""
+        CREATE TABLE Kurs_IDR (tanggal TEXT, USD REAL, EUR REAL, JPY REAL, SGD REAL);
+        CREATE TABLE "10Y_General" (tanggal TEXT, Indonesia REAL, USA REAL);
+        CREATE TABLE CDS_Indo (tanggal TEXT, PRICE REAL, TENOR TEXT);
+        CREATE TABLE NDF_Update (tanggal TEXT, IHN_1M_Curncy REAL, IHN_6M_Curncy REAL, IHN_12M_Curncy REAL);
+        CREATE TABLE Saham_Peers (tanggal TEXT, Indonesia REAL, USA REAL, Japan REAL, Hongkong REAL,
+                                  Shanghai REAL, German REAL);
+        CREATE TABLE Commodity_DB (tanggal TEXT, ICP REAL, WTI REAL, PALM_OIL REAL);
+    """)
+    for state in market:
+        stamp = state['day'].isoformat()
+        domestik.execute("INSERT INTO Kurs_IDR VALUES (?, ?, ?, ?, ?)",
+                         (stamp, state['usd'], state['usd'] * 1.08, state['usd'] / 150, state['usd'] / 1.35))
+        domestik.execute('INSERT INTO "10Y_General" VALUES (?, ?, ?)',
+                         (stamp, curve_yield(state['level'], 10), state['ust']))
+        for tenor, scale in (('CDS 5Y', 1.0), ('CDS 10Y', 1.6)):
+            domestik.execute("INSERT INTO CDS_Indo VALUES (?, ?, ?)", (stamp, state['cds'] * scale, tenor))
+        domestik.execute("INSERT INTO NDF_Update VALUES (?, ?, ?, ?)",
+                         (stamp, state['usd'] * 1.002, state['usd'] * 1.01, state['usd'] * 1.02))
+        domestik.execute("INSERT INTO Saham_Peers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (stamp, state['ihsg'], state['ihsg'] * 0.8, state['ihsg'] * 5,
+                          state['ihsg'] * 2.7, state['ihsg'] * 0.45, state['ihsg'] * 2.5))
+        domestik.execute("INSERT INTO Commodity_DB VALUES (?, ?, ?, ?)",
+                         (stamp, 60 + rng.gauss(0, 3), 58 + rng.gauss(0, 3), 950 + rng.gauss(0, 30)))
+    domestik.commit()
+    domestik.close()
+
+    print(f"Generated {inserted:,} PLTE trades and {transactions:,} settlements over {len(days)} trading days "
+          f"({days[0]} to {days[-1]}, {len(series)} series) in {time.monotonic() - started:.1f}s")
+    return {'plte_rows': inserted, 'transactions': transactions, 'days': len(days),
+            'first_day': days[0].isoformat(), 'last_day': days[-1].isoformat(), 'series': len(series)}
+
+
+def _flush(plte, transaksi, batch, inserted, transactions, rng):
+    """Insert a batch of trades and a sample of them as settlements"""
+    plte.executemany("INSERT INTO DB_PLTE VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    settlements = [
+        (trade[0], rng.choice(TRANSACTION_TYPES), trade[1], trade[5], trade[6], trade[2])
+        for trade in batch if rng.random() < TRANSACTIONS_PER_TRADE
+    ]
+    transaksi.executemany("INSERT INTO Transaksi_Harian VALUES (?, ?, ?, ?, ?, ?)", settlements)
+    return inserted + len(batch), transactions + len(settlements)
+
+
+def dataset(plte_rows, years, seed, data_dir=DATA_DIR, regenerate=False, bootstrap=False):
+    """Directory of the synthetic databases for these parameters, generated on first use"""
+    directory = Path(data_dir) / f"plte{plte_rows}-y{years:g}-s{seed}{'-bootstrap' if bootstrap else ''}"
+    params_path = directory / "params.json"
+    if regenerate or not params_path.exists():
+        params_path.unlink(missing_ok=True)
+        stats = generate_databases(directory, plte_rows, years, seed)
+        if bootstrap:
+            databases = databases_in(directory)
+            started = time.monotonic()
+            with contextlib.redirect_stdout(io.StringIO()):
+                bootstrap_indexes(databases)
+                refresh_aggregates(databases)
+            stats['bootstrap_seconds'] = time.monotonic() - started
+        params_path.write_text(json.dumps(stats, indent=2))
+    return directory, json.loads(params_path.read_text())
+
+
+def databases_in(directory):
+    """Schema alias -> database file in a synthetic data directory"""
+    return {alias: Path(directory) / name for alias, name in DATABASE_FILES.items()}
+
+
+def _summary(timings):
+    return {'median': statistics.median(timings), 'min': min(timings), 'max': max(timings), 'runs': len(timings)}
+
+
+def run_benchmark(directory, repeat=5):
+    """Time every getter on a warm connection, the quality checks and the full report on fresh connections"""
+    databases = databases_in(directory)
+    results = {'getters': {}, 'quality': None, 'report': None}
+
+    generator = MarketReportGenerator(connect=lambda: AKPConnection(databases))
+    try:
+        for name, (getter, _, _) in generator.sources().items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                with generator.db.transaction():
+                    rows = getattr(generator, getter)()
+                timings.append(time.perf_counter() - started)
+            results['getters'][name] = dict(_summary(timings), rows=len(rows))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            data, _ = generator.fetch_all()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            generator.check_quality(data)
+            timings.append(time.perf_counter() - started)
+        results['quality'] = dict(_summary(timings), trades=sum(row['trades'] for row in data['plte'] or []),
+                                  flagged=len(data['plte_flags'] or []))
+    finally:
+        generator.close()
+
+    # Each full run opens its own connections, as a scheduled run would
+    timings = []
+    for _ in range(repeat):
+        generator = MarketReportGenerator(connect=lambda: AKPConnection(databases))
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                report = generator.generate_report()
+        finally:
+            generator.close()
+        timings.append(time.perf_counter() - started)
+    results['report'] = dict(_summary(timings), date=report['date'], unavailable=report['unavailable'])
+    return results
+
+
+def git_revision():
+    """Short commit hash of the working tree, with '-dirty' for uncommitted changes"""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=Path(__file__).parent, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                               text=True, cwd=Path(__file__).parent).stdout.strip()
+        return revision + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_results(path=RESULTS_PATH):
+    if not Path(path).exists():
+        return []
+    return [json.loads(line) for line in Path(path).read_text().splitlines() if line.strip()]
+
+
+def print_results(result, baseline=None):
+    """Print the timings of a run, and the change against a baseline run when given"""
+    def row(label, current, previous):
+        line = f"{label:<20} {current['median'] * 1000:>10.2f} {current['min'] * 1000:>10.2f}"
+        if previous:
+            change = (current['median'] / previous['median'] - 1) * 100 if previous['median'] else float('nan')
+            line += f" {previous['median'] * 1000:>10.2f} {change:>+8.1f}%"
+        return line
+
+    header = f"{'Stage':<20} {'Median ms':>10} {'Min ms':>10}"
+    if baseline:
+        header += f" {'Base ms':>10} {'Change':>9}"
+        print(f"Compared with {baseline['revision']} ({baseline['timestamp']})")
+    print(header)
+    print("-" * len(header))
+    for name, timing in result['getters'].items():
+        print(row(name, timing, baseline and baseline['getters'].get(name)))
+    print(row('check_quality', result['quality'], baseline and baseline.get('quality')))
+    print(row('full report', result['report'], baseline and baseline['report']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the market report generator on synthetic AKP databases")
+    parser.add_argument('--plte-rows', type=parse_count, default=parse_count('1M'),
+                        help="PLTE trades to generate, e.g. 1M, 10M, 100M (default: 1M)")
+    parser.add_argument('--years', type=float, default=3, help="years of trading history (default: 3)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed (default: 42)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per stage (default: 5)")
+    parser.add_argument('--bootstrap', action='store_true',
+                        help="create the indexes, catalogs and daily aggregates before timing")
+    parser.add_argument('--regenerate', action='store_true', help="rebuild the synthetic databases")
+    parser.add_argument('--data-dir', default=DATA_DIR, help=f"where synthetic databases are kept (default: {DATA_DIR})")
+    parser.add_argument('--results', default=RESULTS_PATH, help=f"results file (default: {RESULTS_PATH})")
+    parser.add_argument('--compare', nargs='?', const='previous', metavar='REVISION',
+                        help="compare with the latest stored run of the same dataset (or of REVISION)")
+    args = parser.parse_args(argv)
+
+    directory, stats = dataset(args.plte_rows, args.years, args.seed, args.data_dir,
+                               args.regenerate, args.bootstrap)
+    result = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'dataset': directory.name,
+        'params': {'plte_rows': args.plte_rows, 'years': args.years, 'seed': args.seed,
+                   'bootstrap': args.bootstrap, 'repeat': args.repeat},
+        'stats': stats,
+        'python': sys.version.split()[0],
+        'sqlite': sqlite3.sqlite_version
+    }
+    result.update(run_benchmark(directory, args.repeat))
+
+    baseline = None
+    if args.compare:
+        previous = [r for r in load_results(args.results) if r['dataset'] == result['dataset']]
+        if args.compare != 'previous':
+            previous = [r for r in previous if str(r['revision']).startswith(args.compare)]
+        baseline = previous[-1] if previous else None
+        if baseline is None:
+            print(f"No stored run of {result['dataset']} to compare with")
+    print_results(result, baseline)
+
+    Path(args.results).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.results, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(result, default=str) + "\n")
+    print(f"Results appended to: {args.results}")
+
+
+if __name__ == "__main__":
+    main()
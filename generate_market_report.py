@@ -4,11 +4,30 @@ Market Update Report Generator
 Generates daily market update reports from AKP databases
 """
 
+import argparse
+import contextlib
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import re
+import shutil
 import sqlite3
-import pandas as pd
+import subprocess
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from copy import deepcopy
 from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-import sys
+
+# pandas, NumPy and pyarrow are imported where they are needed: the daily
+# report runs on plain rows, so a short run does not pay for loading them
+pa = ds = None  # pyarrow and pyarrow.dataset, see _require_pyarrow()
 
 # Database paths
 DB_DIR = Path(__file__).parent / "10. Database AKP"
@@ -18,499 +37,4238 @@ DB_TRANSAKSI = DB_DIR / "DB_Transaksi_Harian.db"
 DB_SUBREG = DB_DIR / "DB_Subreg.db"
 DB_DOMESTIK = DB_DIR / "Database_Domestik_Internasional.db"
 
+# Schema alias -> database file, attached together on one connection
+DATABASES = {
+    'domestik': DB_DOMESTIK,
+    'plte': DB_PLTE,
+    'kepemilikan': DB_KEPEMILIKAN,
+    'transaksi': DB_TRANSAKSI,
+    'subreg': DB_SUBREG
+}
 
-class MarketReportGenerator:
+# Per-schema tuning for large files on a network share
+MMAP_SIZE = 256 * 1024 * 1024  # bytes
+CACHE_SIZE_KIB = 64 * 1024  # page cache per schema
+STATEMENT_CACHE = 128  # prepared statements kept per connection
+STREAM_CHUNK_SIZE = 50000  # raw rows per fetchmany() round trip when streaming
+
+# On-disk cache of query results, keyed by SQL and database file identity
+QUERY_CACHE_DIR = Path(__file__).parent / ".query_cache"
+QUERY_CACHE_MAX_BYTES = 256 * 1024 * 1024  # least recently used entries are evicted beyond this
+
+# Valid yield range (%) for the headline statistics; trades outside it are
+# counted but left out of the yield mean/variance
+YIELD_MIN = 0
+YIELD_MAX = 20
+
+# Series family (alphabetic prefix of the series code) -> market
+SERIES_FAMILIES = {
+    'FR': 'SUN',     # Fixed Rate
+    'VR': 'SUN',     # Variable Rate
+    'SPN': 'SUN',    # Surat Perbendaharaan Negara
+    'ORI': 'SUN',    # Obligasi Ritel Indonesia
+    'SBR': 'SUN',    # Savings Bond Ritel
+    'PBS': 'SBSN',   # Project Based Sukuk
+    'SPNS': 'SBSN',  # SPN Syariah
+    'SR': 'SBSN',    # Sukuk Ritel
+    'ST': 'SBSN',    # Sukuk Tabungan
+    'SDHI': 'SBSN',  # Sukuk Dana Haji Indonesia
+    'IFR': 'SBSN'    # Islamic Fixed Rate
+}
+
+# Benchmark series shown in the SUN and SBSN tables
+BENCHMARK_SERIES = ['FR0091', 'FR0092', 'FR0093', 'FR0094', 'FR0095',
+                    'FR0096', 'FR0097', 'FR0098', 'FR0099']
+SBSN_BENCHMARK_SERIES = ['PBS030', 'PBS034', 'PBS038', 'PBS040']
+
+# Report configuration; report_config.json next to this script (or --config)
+# overrides any of these top-level keys
+CONFIG_PATH = Path(__file__).parent / "report_config.json"
+DEFAULT_CONFIG = {
+    'benchmarks': {'SUN': BENCHMARK_SERIES, 'SBSN': SBSN_BENCHMARK_SERIES},
+    'curves': {'SUN': ['FR'], 'SBSN': ['PBS']},  # market -> families fitted
+    'curve_tenors': [1, 5, 10, 15, 20],  # years
+    'sections': ['sun', 'sbsn', 'international'],  # rendered in this order
+    # Variant name -> top-level keys overriding the rest of the configuration,
+    # plus the 'formats' exported for it (see build_variants())
+    'variants': {},
+    # Data-quality checks run on every fetched dataset (see check_quality());
+    # keys missing from the configuration file keep these defaults
+    'quality': {
+        'enabled': True,
+        'robust_z': 3.5,  # modified z-score beyond which a trade's yield is an outlier in its series
+        'min_trades': 5,  # trades a series needs on a day before its outliers are judged
+        'par_tolerance': 0.5,  # a price this many points above (below) par with a yield
+        'coupon_tolerance': 0.25,  # this many points above (below) the coupon is a mismatch
+        'max_missing_days': 2  # business days a source may skip between two of its dates
+    }
+}
+
+# Market data source -> key columns of one observation, for the duplicate and
+# stale checks of check_quality(); the first column is the date
+QUALITY_KEYS = {
+    'fx': ('tanggal',),
+    'ust': ('tanggal',),
+    'cds': ('tanggal', 'tenor'),
+    'ndf': ('tanggal',),
+    'stocks': ('tanggal',),
+    'commodities': ('tanggal',)
+}
+QUALITY_SAMPLE = 20  # flagged trades listed in the quality report
+# Sources whose carried-forward columns get no change in the report, only their level;
+# the rest are flagged only
+STALE_EXCLUDED = ('fx', 'ust', 'ndf', 'stocks')
+STALE_TEXT = 'tidak diperbarui'  # printed in place of a skipped change
+ISSUES = ('outlier', 'invalid', 'mismatch')  # get_plte_flags() flags, as listed per flagged trade
+
+# Nelson-Siegel decay parameters (years) searched when fitting a curve
+NS_TAU_GRID = (0.25, 15, 60)  # start, stop, number of points
+NS_MIN_POINTS = 4  # fewer traded series fall back to linear interpolation
+
+PLTE_STATS_COLUMNS = [
+    'date', 'security', 'trades', 'yield_count', 'yield_mean', 'yield_m2', 'yield_volume', 'yield_weighted',
+    'positive_count', 'positive_yield', 'price', 'price_count', 'maturity', 'volume', 'value'
+]
+
+# Saham_Peers column -> index name
+STOCK_INDICES = {
+    'Indonesia': 'IHSG',
+    'USA': 'S&P 500',
+    'Japan': 'Nikkei',
+    'Hongkong': 'Hang Seng',
+    'Shanghai': 'Shanghai',
+    'German': 'DAX'
+}
+
+# Report source -> (getter, schema, timeout in seconds). Sources are independent
+# of each other and are fetched concurrently by MarketReportGenerator.fetch_all().
+SOURCES = {
+    'plte': ('get_plte_stats', 'plte', 120),
+    'ownership': ('get_ownership_data', 'kepemilikan', 30),
+    'transactions': ('get_transaction_data', 'transaksi', 120),
+    'fx': ('get_fx_data', 'domestik', 30),
+    'ust': ('get_ust_data', 'domestik', 30),
+    'cds': ('get_cds_data', 'domestik', 30),
+    'ndf': ('get_ndf_data', 'domestik', 30),
+    'stocks': ('get_stock_indices', 'domestik', 30),
+    'commodities': ('get_commodity_data', 'domestik', 30)
+}
+# Sources fetched only while the quality stage is enabled (see
+# MarketReportGenerator.sources())
+QUALITY_SOURCES = {
+    'plte_flags': ('get_plte_flags', 'plte', 120)
+}
+
+# Source -> (date column, n, 'dates' | 'rows' | 'source'): what a getter
+# returns for a single report day, i.e. the rows of the latest n dates, the
+# latest n rows, or the rows on the dates kept for source n.
+# build_reports() fetches a whole range once and cuts it per day with this.
+SOURCE_HISTORY = {
+    'plte': ('date', 2, 'dates'),
+    'plte_flags': ('date', 'plte', 'source'),
+    'ownership': ('date', 1, 'dates'),
+    'transactions': ('settle_date', 2, 'dates'),
+    'fx': ('tanggal', 2, 'dates'),
+    'ust': ('tanggal', 2, 'dates'),
+    'cds': ('tanggal', 1, 'dates'),
+    'ndf': ('tanggal', 2, 'dates'),
+    'stocks': ('tanggal', 2, 'dates'),
+    'commodities': ('tanggal', 2, 'dates')
+}
+
+# Covering indexes created by --bootstrap-indexes: (schema, name, table, columns)
+INDEXES = [
+    ('plte', 'idx_plte_tanggal_seri_yield', 'DB_PLTE', ('tanggal_transaksi', 'Securities_Id', 'Yield')),
+    ('transaksi', 'idx_transaksi_tanggal_jenis', 'Transaksi_Harian', ('TANGGAL_SETELMEN', 'JENIS_TRANSAKSI', 'NOMINAL')),
+    ('kepemilikan', 'idx_kepemilikan_tanggal', 'Kepemilikan_Investor_Tradable', ('tanggal', 'KATEGORI_SBN')),
+    ('domestik', 'idx_kurs_tanggal', 'Kurs_IDR', ('tanggal',)),
+    ('domestik', 'idx_10y_tanggal', '10Y_General', ('tanggal',)),
+    ('domestik', 'idx_cds_tanggal_tenor', 'CDS_Indo', ('tanggal', 'TENOR')),
+    ('domestik', 'idx_ndf_tanggal', 'NDF_Update', ('tanggal',)),
+    ('domestik', 'idx_saham_tanggal', 'Saham_Peers', ('tanggal',)),
+    ('domestik', 'idx_commodity_tanggal', 'Commodity_DB', ('tanggal',))
+]
+
+# Catalogs of distinct trading dates, refreshed from their high-water mark with
+# the aggregates, so "latest N dates" is an index seek: schema -> (table, column, catalog)
+DATE_CATALOGS = {
+    'plte': ('DB_PLTE', 'tanggal_transaksi', 'PLTE_Trading_Dates'),
+    'transaksi': ('Transaksi_Harian', 'TANGGAL_SETELMEN', 'Transaksi_Trading_Dates')
+}
+
+# Day, month-to-date and year-to-date figures as window functions over a
+# `history` CTE. Ownership is a level, so each row carries the level of the
+# previous date and of the last date before its month and year; history must
+# start at the last date before the year. Transactions are flows, so each row
+# carries running sums since its month and year start, over a dense date x
+# type grid so that a type without trades on a date still has its totals.
+OWNERSHIP_FLOWS_SQL = """
+    SELECT
+        tanggal, KATEGORI_SBN, total_cn, total_cr, total_or,
+        prev_cn, prev_cr, prev_or,
+        FIRST_VALUE(prev_cn) OVER month_start AS month_base_cn,
+        FIRST_VALUE(prev_cr) OVER month_start AS month_base_cr,
+        FIRST_VALUE(prev_or) OVER month_start AS month_base_or,
+        FIRST_VALUE(prev_cn) OVER year_start AS year_base_cn,
+        FIRST_VALUE(prev_cr) OVER year_start AS year_base_cr,
+        FIRST_VALUE(prev_or) OVER year_start AS year_base_or
+    FROM (
+        SELECT
+            *,
+            LAG(total_cn) OVER category AS prev_cn,
+            LAG(total_cr) OVER category AS prev_cr,
+            LAG(total_or) OVER category AS prev_or
+        FROM history
+        WINDOW category AS (PARTITION BY KATEGORI_SBN ORDER BY tanggal)
+    )
+    WINDOW
+        month_start AS (PARTITION BY KATEGORI_SBN, substr(tanggal, 1, 7) ORDER BY tanggal),
+        year_start AS (PARTITION BY KATEGORI_SBN, substr(tanggal, 1, 4) ORDER BY tanggal)
+"""
+TRANSACTIONS_TO_DATE_SQL = """
+    SELECT
+        days.tanggal,
+        types.JENIS_TRANSAKSI,
+        COALESCE(history.transactions, 0) AS transactions,
+        COALESCE(history.nominal, 0) AS nominal,
+        COALESCE(history.value, 0) AS value,
+        COALESCE(history.yield_count, 0) AS yield_count,
+        COALESCE(history.yield_sum, 0) AS yield_sum,
+        TOTAL(history.nominal) OVER month_to_date AS mtd_nominal,
+        TOTAL(history.value) OVER month_to_date AS mtd_value,
+        TOTAL(history.nominal) OVER year_to_date AS ytd_nominal,
+        TOTAL(history.value) OVER year_to_date AS ytd_value,
+        DENSE_RANK() OVER (PARTITION BY substr(days.tanggal, 1, 7) ORDER BY days.tanggal) AS mtd_days,
+        DENSE_RANK() OVER (PARTITION BY substr(days.tanggal, 1, 4) ORDER BY days.tanggal) AS ytd_days
+    FROM (SELECT DISTINCT tanggal FROM history) AS days
+    CROSS JOIN (SELECT DISTINCT JENIS_TRANSAKSI FROM history) AS types
+    LEFT JOIN history USING (tanggal, JENIS_TRANSAKSI)
+    WINDOW
+        month_to_date AS (PARTITION BY types.JENIS_TRANSAKSI, substr(days.tanggal, 1, 7) ORDER BY days.tanggal),
+        year_to_date AS (PARTITION BY types.JENIS_TRANSAKSI, substr(days.tanggal, 1, 4) ORDER BY days.tanggal)
+"""
+
+# Daily aggregate tables refreshed incrementally by --refresh-aggregates. Each
+# run rebuilds only the dates from the stored high-water mark onwards (the
+# high-water date itself may have received more rows since the last refresh).
+AGGREGATE_LOG = 'Aggregate_Refresh_Log'
+AGGREGATES = {
+    'PLTE_Daily_Series': {
+        'schema': 'plte',
+        'table': 'DB_PLTE',
+        'column': 'tanggal_transaksi',
+        'create': """
+            CREATE TABLE IF NOT EXISTS {schema}.PLTE_Daily_Series (
+                tanggal TEXT,
+                Securities_Id TEXT,
+                trades INTEGER,
+                yield_count INTEGER,       -- trades with 0 < Yield < 20
+                yield_sum REAL,
+                yield_sumsq REAL,
+                yield_volume REAL,
+                yield_weighted REAL,       -- sum of Yield * Volume
+                positive_count INTEGER,    -- trades with Yield > 0
+                positive_yield_sum REAL,
+                positive_price_count INTEGER,
+                positive_price_sum REAL,
+                maturity TEXT,
+                coupon REAL,
+                volume REAL,
+                value REAL,
+                yield_median REAL,         -- centre and spread of the 0 < Yield < 20 trades,
+                yield_mad REAL,            -- scoring them in get_plte_flags()
+                yield_mean_deviation REAL
+            );
+            CREATE INDEX IF NOT EXISTS {schema}.idx_plte_daily_series ON PLTE_Daily_Series (tanggal, Securities_Id);
+        """,
+        # Valid yields sort first in each series, so positions 1..n are the sorted valid yields
+        'refresh': """
+            INSERT INTO {schema}.PLTE_Daily_Series
+            WITH ranked AS (
+                SELECT
+                    tanggal_transaksi, Securities_Id, Yield, Price, Volume, Value, Mature_Date, Coupon_Rate,
+                    Yield > 0 AND Yield < 20 AS valid,
+                    ROW_NUMBER() OVER (series ORDER BY Yield > 0 AND Yield < 20 DESC, Yield) AS position,
+                    COUNT(CASE WHEN Yield > 0 AND Yield < 20 THEN 1 END) OVER series AS n
+                FROM {schema}.DB_PLTE
+                WHERE tanggal_transaksi >= ?
+                WINDOW series AS (PARTITION BY tanggal_transaksi, Securities_Id)
+            ),
+            centred AS (
+                SELECT *, AVG(CASE WHEN valid AND position IN ((n + 1) / 2, (n + 2) / 2) THEN Yield END)
+                    OVER (PARTITION BY tanggal_transaksi, Securities_Id) AS median
+                FROM ranked
+            ),
+            spread AS (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY tanggal_transaksi, Securities_Id ORDER BY valid DESC, ABS(Yield - median)
+                ) AS deviation_position
+                FROM centred
+            )
+            SELECT
+                tanggal_transaksi,
+                Securities_Id,
+                COUNT(*),
+                COUNT(CASE WHEN valid THEN 1 END),
+                TOTAL(CASE WHEN valid THEN Yield END),
+                TOTAL(CASE WHEN valid THEN Yield * Yield END),
+                TOTAL(CASE WHEN valid THEN Volume END),
+                TOTAL(CASE WHEN valid THEN Yield * Volume END),
+                COUNT(CASE WHEN Yield > 0 THEN 1 END),
+                TOTAL(CASE WHEN Yield > 0 THEN Yield END),
+                COUNT(CASE WHEN Yield > 0 THEN Price END),
+                TOTAL(CASE WHEN Yield > 0 THEN Price END),
+                MAX(CASE WHEN Yield > 0 THEN Mature_Date END),
+                MAX(Coupon_Rate),
+                TOTAL(Volume),
+                TOTAL(Value),
+                MAX(median),
+                AVG(CASE WHEN valid AND deviation_position IN ((n + 1) / 2, (n + 2) / 2) THEN ABS(Yield - median) END),
+                AVG(CASE WHEN valid THEN ABS(Yield - median) END)
+            FROM spread
+            GROUP BY tanggal_transaksi, Securities_Id
+        """
+    },
+    'Transaksi_Daily_Type': {
+        'schema': 'transaksi',
+        'table': 'Transaksi_Harian',
+        'column': 'TANGGAL_SETELMEN',
+        'create': """
+            CREATE TABLE IF NOT EXISTS {schema}.Transaksi_Daily_Type (
+                tanggal TEXT,
+                JENIS_TRANSAKSI TEXT,
+                transactions INTEGER,
+                nominal REAL,
+                value REAL,
+                yield_count INTEGER,
+                yield_sum REAL,
+                mtd_nominal REAL,          -- running sums since the month / year start
+                mtd_value REAL,
+                ytd_nominal REAL,
+                ytd_value REAL,
+                mtd_days INTEGER,          -- settlement dates since the month / year start
+                ytd_days INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS {schema}.idx_transaksi_daily_type ON Transaksi_Daily_Type (tanggal, JENIS_TRANSAKSI);
+        """,
+        # Rows of the year before ?1 are already aggregated and seed the running sums
+        'refresh': """
+            INSERT INTO {schema}.Transaksi_Daily_Type
+            WITH history AS (
+                SELECT tanggal, JENIS_TRANSAKSI, transactions, nominal, value, yield_count, yield_sum
+                FROM {schema}.Transaksi_Daily_Type
+                WHERE tanggal >= substr(?1, 1, 4) || '-01-01' AND tanggal < ?1
+                UNION ALL
+                SELECT
+                    TANGGAL_SETELMEN,
+                    JENIS_TRANSAKSI,
+                    COUNT(*),
+                    SUM(NOMINAL),
+                    SUM(NILAI_TRANSAKSI),
+                    COUNT(YIELD),
+                    TOTAL(YIELD)
+                FROM {schema}.Transaksi_Harian
+                WHERE TANGGAL_SETELMEN >= ?1
+                GROUP BY TANGGAL_SETELMEN, JENIS_TRANSAKSI
+            )
+            SELECT * FROM (""" + TRANSACTIONS_TO_DATE_SQL + """) WHERE tanggal >= ?1
+        """
+    },
+    'Kepemilikan_Daily_Category': {
+        'schema': 'kepemilikan',
+        'table': 'Kepemilikan_Investor_Tradable',
+        'column': 'tanggal',
+        'create': """
+            CREATE TABLE IF NOT EXISTS {schema}.Kepemilikan_Daily_Category (
+                tanggal TEXT,
+                KATEGORI_SBN TEXT,
+                total_cn REAL,
+                total_cr REAL,
+                total_or REAL,
+                prev_cn REAL,              -- levels on the category's previous date
+                prev_cr REAL,
+                prev_or REAL,
+                month_base_cn REAL,        -- levels on the last date before the month
+                month_base_cr REAL,
+                month_base_or REAL,
+                year_base_cn REAL,         -- levels on the last date before the year
+                year_base_cr REAL,
+                year_base_or REAL
+            );
+            CREATE INDEX IF NOT EXISTS {schema}.idx_kepemilikan_daily_category ON Kepemilikan_Daily_Category (tanggal, KATEGORI_SBN);
+        """,
+        # Levels from the last date before the year of ?1 are already aggregated
+        'refresh': """
+            INSERT INTO {schema}.Kepemilikan_Daily_Category
+            WITH history AS (
+                SELECT tanggal, KATEGORI_SBN, total_cn, total_cr, total_or
+                FROM {schema}.Kepemilikan_Daily_Category
+                WHERE tanggal >= COALESCE((
+                    SELECT MAX(tanggal) FROM {schema}.Kepemilikan_Daily_Category
+                    WHERE tanggal < substr(?1, 1, 4) || '-01-01'
+                ), '') AND tanggal < ?1
+                UNION ALL
+                SELECT tanggal, KATEGORI_SBN, SUM(Total_CN), SUM(Total_CR), SUM(Total_OR)
+                FROM {schema}.Kepemilikan_Investor_Tradable
+                WHERE tanggal >= ?1
+                GROUP BY tanggal, KATEGORI_SBN
+            )
+            SELECT * FROM (""" + OWNERSHIP_FLOWS_SQL + """) WHERE tanggal >= ?1
+        """
+    }
+}
+
+# Columnar snapshot written by --snapshot and read by --backend snapshot:
+# name -> (schema, table, date column). Each table is stored as uncompressed
+# Arrow IPC files partitioned by month (<name>/month=YYYY-MM/part-0.arrow), so
+# they can be memory-mapped and read column by column.
+SNAPSHOT_DIR = Path(__file__).parent / "snapshot"
+SNAPSHOT_TABLES = {
+    'DB_PLTE': ('plte', 'DB_PLTE', 'tanggal_transaksi'),
+    'Transaksi_Harian': ('transaksi', 'Transaksi_Harian', 'TANGGAL_SETELMEN'),
+    'Kepemilikan_Investor_Tradable': ('kepemilikan', 'Kepemilikan_Investor_Tradable', 'tanggal'),
+    'Kurs_IDR': ('domestik', 'Kurs_IDR', 'tanggal'),
+    'Saham_Peers': ('domestik', 'Saham_Peers', 'tanggal'),
+    '10Y_General': ('domestik', '10Y_General', 'tanggal'),
+    'CDS_Indo': ('domestik', 'CDS_Indo', 'tanggal'),
+    'NDF_Update': ('domestik', 'NDF_Update', 'tanggal'),
+    'Commodity_DB': ('domestik', 'Commodity_DB', 'tanggal')
+}
+SNAPSHOT_MANIFEST = '_manifest.json'
+# Tables whose getters read back to the last date of the previous year (the
+# ytd figures); --backend snapshot loads them from December of the year before
+# the requested start, the others from the month before it
+SNAPSHOT_YTD_TABLES = ('Kepemilikan_Investor_Tradable', 'Transaksi_Harian')
+
+# --watch: seconds between polls of the databases' data_version, the local
+# HTTP endpoint serving the report model, and how often a fetch is repeated
+# when an ETL commit lands while it runs
+WATCH_INTERVAL = 5
+WATCH_HOST = '127.0.0.1'
+WATCH_PORT = 8765
+WATCH_RETRIES = 3
+
+# --format charts: PNG files under CHART_DIR, one worker process per chart.
+# Trend charts cover CHART_WINDOW_DAYS up to the report date, fetched once for
+# all of them; a chart is skipped when the hash of its input (and of
+# CHART_VERSION, bumped when the drawing changes) matches the stored one.
+CHART_DIR = Path(__file__).parent / "charts"
+CHART_WINDOW_DAYS = 90
+CHART_SOURCES = ['fx', 'ndf', 'stocks', 'ust']
+CHART_VERSION = 1
+
+
+def load_config(path=None):
+    """Load the report configuration, falling back to DEFAULT_CONFIG"""
+    config = deepcopy(DEFAULT_CONFIG)
+    path = Path(path) if path is not None else CONFIG_PATH
+    if path.exists():
+        with open(path, encoding='utf-8') as f:
+            config.update(json.load(f))
+    return config
+
+
+def robust_spread(values):
+    """Median, median absolute deviation and mean absolute deviation of sorted values
+    
+    The same figures PLTE_Daily_Series stores per series as yield_median,
+    yield_mad and yield_mean_deviation.
+    """
+    count = len(values)
+    median = (values[(count - 1) // 2] + values[count // 2]) / 2
+    deviations = sorted(abs(value - median) for value in values)
+    mad = (deviations[(count - 1) // 2] + deviations[count // 2]) / 2
+    return median, mad, sum(deviations) / count
+
+
+def nelson_siegel(tenors, beta0, beta1, beta2, tau):
+    """Nelson-Siegel yields at the given tenors (years)"""
+    import numpy as np
+    x = np.maximum(np.asarray(tenors, dtype=float), 1e-6) / tau
+    slope = (1 - np.exp(-x)) / x
+    return beta0 + beta1 * slope + beta2 * (slope - np.exp(-x))
+
+
+def fit_nelson_siegel(tenors, yields):
+    """Least-squares Nelson-Siegel fit over a grid of tau values
+    
+    For each tau the model is linear in the betas, so all grid points are
+    solved at once with a stacked pseudo-inverse. Returns
+    (beta0, beta1, beta2, tau).
+    """
+    import numpy as np
+    grid = np.linspace(*NS_TAU_GRID)
+    tenors = np.maximum(np.asarray(tenors, dtype=float), 1e-6)
+    yields = np.asarray(yields, dtype=float)
+    x = tenors[None, :] / grid[:, None]
+    slope = (1 - np.exp(-x)) / x
+    design = np.stack([np.ones_like(x), slope, slope - np.exp(-x)], axis=2)  # (tau, series, 3)
+    betas = np.linalg.pinv(design) @ yields  # (tau, 3)
+    residuals = (design @ betas[:, :, None])[:, :, 0] - yields
+    best = int(np.argmin((residuals ** 2).sum(axis=1)))
+    return (*betas[best], grid[best])
+
+
+def series_family(security):
+    """Family of a series code, i.e. its alphabetic prefix ('FR0091' -> 'FR')"""
+    match = re.match(r'[A-Z]+', str(security or '').strip().upper())
+    return match.group(0) if match else None
+
+
+def _history_clause(source, column):
+    """Condition for the dates from the trading date before ? up to ?; params are (start, start, end)"""
+    return f"{column} BETWEEN COALESCE((SELECT MAX({column}) FROM {source} WHERE {column} < ?), ?) AND ?"
+
+
+def slice_history(data, date):
+    """Cut range-mode source rows down to what the getters return for one report date"""
+    day = str(date)[:10]
+    sliced = {}
+    for name, rows in data.items():
+        if rows is None or name not in SOURCE_HISTORY or SOURCE_HISTORY[name][2] == 'source':
+            sliced[name] = rows
+            continue
+        column, n, unit = SOURCE_HISTORY[name]
+        # Compare on the date part; some tables store timestamps
+        upto = [row for row in rows if str(row[column])[:10] <= day]
+        if unit == 'rows':
+            sliced[name] = upto[:n]
+        else:
+            latest = set(_unique(row[column] for row in upto)[:n])
+            sliced[name] = [row for row in upto if row[column] in latest]
+    for name, rows in data.items():
+        if rows is not None and name in SOURCE_HISTORY and SOURCE_HISTORY[name][2] == 'source':
+            column, source, _ = SOURCE_HISTORY[name]
+            dates = {row[SOURCE_HISTORY[source][0]] for row in sliced.get(source) or []}
+            sliced[name] = [row for row in rows if row[column] in dates]
+    return sliced
+
+
+def _chart_start(date):
+    """First date of the CHART_WINDOW_DAYS trend window ending on a report date"""
+    return (_parse_date(str(date)[:10]) - timedelta(days=CHART_WINDOW_DAYS)).strftime('%Y-%m-%d')
+
+
+def slice_chart_history(history, date):
+    """Cut chart source rows fetched for a range down to what export_charts() fetches for one report date
+    
+    That is the CHART_WINDOW_DAYS up to the date, plus the last date before
+    the window (rows arrive latest date first).
+    """
+    day, start = str(date)[:10], _chart_start(date)
+    sliced = {}
+    for name, rows in history.items():
+        if rows is None:
+            sliced[name] = None
+            continue
+        column = SOURCE_HISTORY[name][0]
+        upto = [row for row in rows if str(row[column])[:10] <= day]
+        before = next((str(row[column])[:10] for row in upto if str(row[column])[:10] < start), start)
+        sliced[name] = [row for row in upto if str(row[column])[:10] >= before]
+    return sliced
+
+
+def _check_trades(stats, flags, settings):
+    """Take the outliers and invalid yields flagged by get_plte_flags() out of the per-series statistics
+    
+    Each flagged series has those trades subtracted from its accumulators
+    (RunningStats.remove() for the outliers, the positive yield and price
+    sums for both), so the trades themselves are never fetched. Returns
+    (stats, report) with stats a new list of the per-series rows.
+    """
+    removed = {}
+    for trade in flags:
+        if not (trade['outlier'] or trade['invalid']):
+            continue
+        # [yield stats, positive count, positive yield sum, price count, price sum]
+        acc = removed.setdefault((trade['date'], trade['security']), [RunningStats(), 0, 0.0, 0, 0.0])
+        if trade['outlier']:
+            acc[0].add(trade['yield'], trade['volume'])
+        acc[1] += 1
+        acc[2] += trade['yield']
+        if trade['price'] is not None:
+            acc[3] += 1
+            acc[4] += trade['price']
+    
+    checked = []
+    for row in stats:
+        acc = removed.get((row['date'], row['security']))
+        if acc is not None:
+            yields = RunningStats(row['yield_count'], row['yield_mean'], row['yield_m2'],
+                                  row['yield_volume'], row['yield_weighted']).remove(acc[0])
+            positive_count = row['positive_count'] - acc[1]
+            price_count = row['price_count'] - acc[3]
+            row = dict(
+                row,
+                yield_count=yields.count,
+                yield_mean=yields.mean,
+                yield_m2=yields.m2,
+                yield_volume=yields.volume,
+                yield_weighted=yields.weighted,
+                positive_count=positive_count,
+                positive_yield=((row['positive_yield'] * row['positive_count'] - acc[2]) / positive_count
+                                if positive_count else None),
+                price=(row['price'] * row['price_count'] - acc[4]) / price_count if price_count else None,
+                price_count=price_count
+            )
+        checked.append(row)
+    
+    outliers = sorted((trade for trade in flags if trade['outlier']), key=lambda trade: -abs(trade['robust_z']))
+    report = {
+        'trades': sum(row['trades'] for row in stats),
+        'invalid_yields': sum(row['trades'] - row['yield_count'] for row in stats),
+        'outliers': len(outliers),
+        'mismatches': sum(1 for trade in flags if trade['mismatch']),
+        'adjusted_series': len(removed),
+        'flagged': [
+            dict(
+                {key: value for key, value in trade.items() if key not in ISSUES},
+                issues=[issue for issue in ISSUES if trade[issue]]
+            )
+            for trade in outliers + [trade for trade in flags if trade['invalid']] +
+            [trade for trade in flags if trade['mismatch'] and not trade['outlier']]
+        ][:QUALITY_SAMPLE]
+    }
+    return checked, report
+
+
+def _date_gaps(dates, max_missing_days):
+    """Consecutive dates (latest first) between which more than max_missing_days business days are missing"""
+    days = sorted({str(date)[:10] for date in dates}, reverse=True)
+    
+    def business_days(start, end):
+        # Weekdays in [start, end): five per whole week, then the remaining days one by one
+        start, end = datetime.strptime(start, '%Y-%m-%d'), datetime.strptime(end, '%Y-%m-%d')
+        weeks, rest = divmod((end - start).days, 7)
+        return weeks * 5 + sum((start.weekday() + offset) % 7 < 5 for offset in range(rest))
+    
+    missing = [business_days(older, newer) - 1 for newer, older in zip(days[:-1], days[1:])]
+    return [{'from': older, 'to': newer, 'missing_days': gap}
+            for newer, older, gap in zip(days[:-1], days[1:], missing) if gap > max_missing_days]
+
+
+def _carried_forward(quality, name, rows):
+    """Columns of a STALE_EXCLUDED source carried forward on its latest date (rows latest first)"""
+    if not quality or name not in STALE_EXCLUDED or not rows:
+        return set()
+    source = quality['sources'].get(name, {})
+    date = rows[0]['tanggal']
+    if date in source.get('stale_dates', []):
+        return set(rows[0]) - {'tanggal'}
+    return {column for entry in source.get('stale_columns', []) if entry['date'] == date
+            for column in entry['columns']}
+
+
+def _unique(values):
+    """Distinct values in order of first appearance"""
+    return list(dict.fromkeys(values))
+
+
+INVESTOR_TYPES = ('domestic_individual', 'domestic_company', 'non_resident')
+
+
+def _ownership_changes(rows):
+    """Sum ownership rows of one date into levels and day/mtd/ytd changes per investor type
+    
+    A change is None when a row lacks its base level, e.g. a category first
+    reported after the start of the month.
+    """
+    def total(key):
+        values = [row[key] for row in rows]
+        return None if any(value is None for value in values) else sum(values)
+    
+    levels = {investor: sum(row[investor] or 0 for row in rows) for investor in INVESTOR_TYPES}
+    levels['total'] = sum(levels.values())
+    changes = {}
+    for period, prefix in (('day', 'prev'), ('mtd', 'month_base'), ('ytd', 'year_base')):
+        bases = {investor: total(f'{prefix}_{investor}') for investor in INVESTOR_TYPES}
+        bases['total'] = None if None in bases.values() else sum(bases.values())
+        changes[period] = {
+            investor: None if base is None else levels[investor] - base for investor, base in bases.items()
+        }
+    return dict(levels, changes=changes)
+
+
+class RunningStats:
+    """Online (Welford) mean and variance with a volume-weighted mean
+    
+    Accumulators can be merged (Chan et al.), so per-series statistics roll
+    up into per-day or per-family figures without revisiting the trades.
+    """
+    
+    __slots__ = ('count', 'mean', 'm2', 'volume', 'weighted')
+    
+    def __init__(self, count=0, mean=0.0, m2=0.0, volume=0.0, weighted=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.volume = volume
+        self.weighted = weighted
+    
+    def add(self, value, volume=None):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if volume:
+            self.volume += volume
+            self.weighted += value * volume
+    
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.volume += other.volume
+        self.weighted += other.weighted
+        return self
+    
+    def remove(self, other):
+        """Take the values accumulated in other back out, the inverse of merge()"""
+        if other.count == 0:
+            return self
+        count = self.count - other.count
+        if count <= 0:
+            self.count, self.mean, self.m2, self.volume, self.weighted = 0, 0.0, 0.0, 0.0, 0.0
+            return self
+        mean = (self.mean * self.count - other.mean * other.count) / count
+        delta = other.mean - mean
+        self.m2 = max(self.m2 - other.m2 - delta * delta * count * other.count / self.count, 0.0)
+        self.mean = mean
+        self.count = count
+        self.volume -= other.volume
+        self.weighted -= other.weighted
+        return self
+    
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else float('nan')
+    
+    @property
+    def std(self):
+        return self.variance ** 0.5
+    
+    @property
+    def vw_mean(self):
+        return self.weighted / self.volume if self.volume else float('nan')
+
+
+class Profiler:
+    """Per-stage instrumentation written by --profile
+    
+    Each getter, calculate_* step and renderer becomes one stage record with
+    wall and CPU time (of the thread running it), rows returned, bytes read
+    through read() calls by that thread (Linux only; pages served from the
+    mmap are not counted), traced Python memory, the SQLite plan of every
+    query issued and query cache hits and misses. Failures are recorded with
+    the exception before it propagates. Memory peaks are process-wide, so for
+    stages running concurrently (the getters) they are an upper bound.
+    """
+    
     def __init__(self):
+        self.run = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+        self.stages = []
+        self._lock = threading.Lock()
+        self._active = 0
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    @contextlib.contextmanager
+    def stage(self, name, kind):
+        """Time the enclosed block; the yielded dict takes extra fields (rows, queries, ...)"""
+        record = {'run': self.run, 'stage': name, 'kind': kind}
+        with self._lock:
+            if self._active == 0:
+                tracemalloc.reset_peak()
+            self._active += 1
+        memory = tracemalloc.get_traced_memory()[0]
+        io = _thread_read_bytes()
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = f"{type(e).__name__}: {e.__cause__ or e}"
+            raise
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall
+            record['cpu_seconds'] = time.thread_time() - cpu
+            if io is not None:
+                record['read_bytes'] = _thread_read_bytes() - io
+            current, peak = tracemalloc.get_traced_memory()
+            record['memory_bytes'] = current - memory
+            record['memory_peak_bytes'] = peak
+            with self._lock:
+                self._active -= 1
+                self.stages.append(record)
+    
+    def write(self, path, fmt='jsonl'):
+        """Append the stages to path as JSON lines, or overwrite it with OpenMetrics text"""
+        if fmt == 'openmetrics':
+            Path(path).write_text(self.openmetrics(), encoding='utf-8')
+        else:
+            with open(path, 'a', encoding='utf-8') as f:
+                for record in self.stages:
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        print(f"Profile written to: {path}")
+    
+    def openmetrics(self):
+        """The numeric stage fields as OpenMetrics gauges labelled by stage and kind"""
+        metrics = {
+            'wall_seconds': "Wall-clock time of the stage",
+            'cpu_seconds': "CPU time of the thread running the stage",
+            'rows': "Rows returned by the stage",
+            'read_bytes': "Bytes read through read() calls during the stage",
+            'memory_peak_bytes': "Peak traced Python memory during the stage",
+            'cache_hits': "Query cache hits",
+            'cache_misses': "Query cache misses",
+            'errors': "Whether the stage failed"
+        }
+        lines = []
+        for metric, help_text in metrics.items():
+            lines.append(f"# TYPE akp_report_stage_{metric} gauge")
+            lines.append(f"# HELP akp_report_stage_{metric} {help_text}")
+            for record in self.stages:
+                value = int('error' in record) if metric == 'errors' else record.get(metric)
+                if value is not None:
+                    lines.append(f'akp_report_stage_{metric}{{stage="{record["stage"]}",kind="{record["kind"]}"}} {value}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def _thread_read_bytes():
+    """Bytes read by the calling thread so far (Linux /proc), or None"""
+    try:
+        with open('/proc/thread-self/io') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def profiled(kind):
+    """Record calls of a MarketReportGenerator method as stages of its profiler
+    
+    String arguments (the market) are appended to the stage name. Getters
+    also record the plan of every query they issued and the cache hits and
+    misses on their connection.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.profiler is None:
+                return method(self, *args, **kwargs)
+            labels = [value for value in (*args, *kwargs.values()) if isinstance(value, str)]
+            name = method.__name__ + (f"[{','.join(labels)}]" if labels else '')
+            with self.profiler.stage(name, kind) as record:
+                if kind != 'getter':
+                    return method(self, *args, **kwargs)
+                db = self.db
+                db.trace, db.cache_trace = [], []
+                try:
+                    result = method(self, *args, **kwargs)
+                    record['rows'] = len(result)
+                    return result
+                finally:
+                    record['queries'] = db.explain_trace()
+                    record['cache_hits'] = db.cache_trace.count(True)
+                    record['cache_misses'] = db.cache_trace.count(False)
+                    db.trace = db.cache_trace = None
+        return wrapper
+    return decorate
+
+
+class QueryCache:
+    """On-disk cache of query results, keyed by SQL and database identity
+    
+    Each entry is a pickled result stored under <sql hash>-<identity hash>,
+    where the identity covers the size and mtime of every database file the
+    query reads (including its WAL) and its schema version. A query against a
+    changed file therefore misses, and storing the new result removes the
+    entries of older versions of the same query. Total size is capped at
+    max_bytes by evicting the least recently used entries. With refresh=True
+    nothing is read from the cache but results are still stored.
+    """
+    
+    def __init__(self, directory=QUERY_CACHE_DIR, max_bytes=QUERY_CACHE_MAX_BYTES, refresh=False):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _digest(value):
+        return hashlib.sha256(repr(value).encode()).hexdigest()[:32]
+    
+    def get(self, key, identity):
+        """Return (True, result) for a current entry, (False, None) otherwise"""
+        path = self.directory / f"{self._digest(key)}-{self._digest(identity)}.pkl"
+        if not self.refresh:
+            try:
+                with open(path, 'rb') as f:
+                    result = pickle.load(f)
+                os.utime(path)  # mtime doubles as the LRU timestamp
+                with self._lock:
+                    self.hits += 1
+                return True, result
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+        with self._lock:
+            self.misses += 1
+        return False, None
+    
+    def put(self, key, identity, result):
+        """Store a result, dropping stale versions of the key and evicting beyond max_bytes"""
+        prefix = self._digest(key)
+        path = self.directory / f"{prefix}-{self._digest(identity)}.pkl"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write under a per-thread name and rename, so readers never see a partial entry
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        
+        with self._lock:
+            for stale in self.directory.glob(f"{prefix}-*.pkl"):
+                if stale != path:
+                    stale.unlink(missing_ok=True)
+            self._evict()
+    
+    def _evict(self):
+        entries = []
+        for entry in self.directory.glob("*.pkl"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+    
+    def clear(self):
+        for entry in self.directory.glob("*.pkl"):
+            entry.unlink(missing_ok=True)
+
+
+class AKPConnection:
+    """Read-only connection with all AKP databases attached under one handle
+    
+    Each file is attached as a schema (plte, kepemilikan, transaksi, subreg,
+    domestik), so cross-database queries run in a single statement and page
+    caches stay warm across queries. Statements are prepared once and reused
+    from sqlite3's statement cache as long as the same SQL text is executed.
+    """
+    
+    def __init__(self, databases=None, mmap_size=MMAP_SIZE, cache_size_kib=CACHE_SIZE_KIB, read_only=True,
+                 cache=None):
+        self.databases = dict(DATABASES if databases is None else databases)
+        self.unavailable = {}
+        self.plans = None  # when a list, queries are explained instead of executed
+        self.cache = cache  # QueryCache for read_sql() and cached() results, or None
+        self.trace = None  # when a list, (query, params) of every query issued is appended
+        self.cache_trace = None  # when a list, True/False for every query cache hit/miss
+        self._tables = {}
+        self._fresh = {}
+        self._identities = {}
+        # Connections are never shared between threads while in use, but may be
+        # interrupted or closed from the thread that owns the scheduler
+        self.conn = sqlite3.connect('file::memory:', uri=True, cached_statements=STATEMENT_CACHE,
+                                    check_same_thread=False)
+        
+        for alias, path in self.databases.items():
+            try:
+                uri = Path(path).resolve().as_uri() + ('?mode=ro' if read_only else '?mode=rw')
+                self.conn.execute(f"ATTACH DATABASE ? AS {alias}", (uri,))
+                self.conn.execute(f"PRAGMA {alias}.mmap_size = {int(mmap_size)}")
+                self.conn.execute(f"PRAGMA {alias}.cache_size = -{int(cache_size_kib)}")
+            except sqlite3.Error as e:
+                self.unavailable[alias] = f"{Path(path).name}: {e}"
+        
+        if read_only:
+            self.conn.execute("PRAGMA query_only = 1")
+    
+    def alias_for(self, db_path):
+        """Return the schema alias a database file is attached under"""
+        for alias, path in self.databases.items():
+            if Path(path) == Path(db_path):
+                return alias
+        raise KeyError(f"{db_path} is not an attached AKP database")
+    
+    def has_table(self, schema, table):
+        """Check whether a table exists in an attached schema (cached)"""
+        key = (schema, table)
+        if key not in self._tables:
+            self._tables[key] = schema not in self.unavailable and bool(self.conn.execute(
+                f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone())
+        return self._tables[key]
+    
+    def has_index(self, schema, index):
+        """Check whether an index exists in an attached schema (cached with the tables)"""
+        key = (schema, 'index', index)
+        if key not in self._tables:
+            self._tables[key] = schema not in self.unavailable and bool(self.conn.execute(
+                f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'index' AND name = ?", (index,)
+            ).fetchone())
+        return self._tables[key]
+    
+    def catalog_fresh(self, schema):
+        """Check whether a trading-date catalog reaches the latest raw date (cached)
+        
+        The raw MAX is a seek on the bootstrap index; a catalog behind it (an
+        ETL load not yet followed by --refresh-aggregates) is not used.
+        """
+        key = ('catalog', schema)
+        if key not in self._fresh:
+            table, column, catalog = DATE_CATALOGS[schema]
+            self._fresh[key] = self.has_table(schema, catalog) and bool(self.conn.execute(
+                f"SELECT (SELECT MAX(tanggal) FROM {schema}.{catalog}) IS (SELECT MAX({column}) FROM {schema}.{table})"
+            ).fetchone()[0])
+        return self._fresh[key]
+    
+    def latest_dates_sql(self, schema, n):
+        """Subquery selecting the latest n trading dates of a cataloged table"""
+        table, column, catalog = DATE_CATALOGS[schema]
+        if self.catalog_fresh(schema):
+            return f"SELECT tanggal FROM {schema}.{catalog} ORDER BY tanggal DESC LIMIT {int(n)}"
+        return f"SELECT DISTINCT {column} FROM {schema}.{table} ORDER BY {column} DESC LIMIT {int(n)}"
+    
+    def range_dates_sql(self, schema):
+        """Subquery selecting the trading dates of a cataloged table from the one
+        before the first ? up to the third ?; params are (start, start, end)"""
+        table, column, catalog = DATE_CATALOGS[schema]
+        if self.catalog_fresh(schema):
+            return f"SELECT tanggal FROM {schema}.{catalog} WHERE {_history_clause(f'{schema}.{catalog}', 'tanggal')}"
+        return f"SELECT DISTINCT {column} FROM {schema}.{table} WHERE {_history_clause(f'{schema}.{table}', column)}"
+    
+    def aggregate_fresh(self, name):
+        """Check whether an aggregate table covers every row of its raw table (cached)
+        
+        Fresh means the table has the current column layout, the stored
+        high-water mark is the latest raw date and that date still has as many
+        raw rows as when it was aggregated.
+        """
+        if name not in self._fresh:
+            spec = AGGREGATES[name]
+            schema, table, column = spec['schema'], spec['table'], spec['column']
+            fresh = False
+            if self.has_table(schema, name) and self.has_table(schema, AGGREGATE_LOG):
+                columns = [row[1] for row in self.conn.execute(f"PRAGMA {schema}.table_info({name})")]
+                if columns == _aggregate_columns(name):
+                    row = self.conn.execute(f"""
+                        SELECT high_water_mark = (SELECT MAX({column}) FROM {schema}.{table})
+                           AND high_water_rows = (SELECT COUNT(*) FROM {schema}.{table} WHERE {column} = high_water_mark)
+                        FROM {schema}.{AGGREGATE_LOG} WHERE aggregate = ?
+                    """, (name,)).fetchone()
+                    fresh = bool(row and row[0])
+            self._fresh[name] = fresh
+        return self._fresh[name]
+    
+    def identity(self, schema):
+        """Identity of an attached database file: size and mtime of the file and its WAL, schema version
+        
+        PRAGMA data_version is only meaningful within one connection, so it
+        cannot key a cache shared between runs; a commit in WAL mode changes
+        the -wal file instead of the main file, hence both are included.
+        """
+        if schema not in self._identities:
+            path = Path(self.databases[schema])
+            files = []
+            for file in (path, path.with_name(path.name + '-wal')):
+                try:
+                    stat = file.stat()
+                    files.append((file.name, stat.st_size, stat.st_mtime_ns))
+                except FileNotFoundError:
+                    pass
+            version = self.conn.execute(f"PRAGMA {schema}.schema_version").fetchone()[0]
+            self._identities[schema] = (str(path.resolve()), tuple(files), version)
+        return self._identities[schema]
+    
+    def schemas_in(self, query):
+        """Attached schemas a query refers to"""
+        return sorted(alias for alias in self.databases if re.search(rf'\b{alias}\.', query))
+    
+    def cached(self, key, schemas, compute):
+        """Return compute(), served from the query cache while the schemas' files are unchanged"""
+        if self.cache is None or self.plans is not None:
+            return compute()
+        identity = tuple(self.identity(schema) for schema in schemas)
+        hit, result = self.cache.get(key, identity)
+        if self.cache_trace is not None:
+            self.cache_trace.append(hit)
+        if not hit:
+            result = compute()
+            self.cache.put(key, identity, result)
+        return result
+    
+    @contextlib.contextmanager
+    def transaction(self):
+        """Run the enclosed queries in one read transaction
+        
+        Every attached file is read from a single snapshot (in WAL mode a
+        concurrent ETL commit is not seen until the transaction ends), and the
+        cached table, freshness and identity checks are redone against it.
+        """
+        self._tables.clear()
+        self._fresh.clear()
+        self._identities.clear()
+        self.conn.execute("BEGIN")
+        try:
+            yield self
+        finally:
+            self.conn.commit()
+    
+    def execute(self, query, params=()):
+        """Execute a query and return all rows"""
+        if self._explain(query, params):
+            return []
+        return self.conn.execute(query, params).fetchall()
+    
+    def records(self, query, params=()):
+        """Execute a query and return its rows as dicts keyed by column name"""
+        if self._explain(query, params):
+            return []
+        
+        def fetch():
+            cursor = self.conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor]
+        return self.cached((query, tuple(params)), self.schemas_in(query), fetch)
+    
+    def read_sql(self, query, params=()):
+        """Execute a query and return the result as a DataFrame (imports pandas)"""
+        import pandas as pd
+        if self._explain(query, params):
+            return pd.DataFrame()
+        return self.cached(('read_sql', query, tuple(params)), self.schemas_in(query),
+                           lambda: pd.read_sql_query(query, self.conn, params=params))
+    
+    def iterate(self, query, params=(), chunk_size=STREAM_CHUNK_SIZE):
+        """Execute a query and yield its rows in chunks of at most chunk_size"""
+        if self._explain(query, params):
+            return
+        cursor = self.conn.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+    
+    def _explain(self, query, params):
+        """Record the query plan instead of running the query, when plans are being collected
+        
+        Also the single entry point of every query, where tracing records it.
+        """
+        if self.trace is not None:
+            self.trace.append((query, params))
+        if self.plans is None:
+            return False
+        plan = self.conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+        self.plans.append((query, [row[3] for row in plan]))
+        return True
+    
+    def explain_trace(self):
+        """[{'sql', 'plan'}] for the queries recorded in trace"""
+        traced = []
+        for query, params in self.trace or []:
+            try:
+                plan = [row[3] for row in self.conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+            except sqlite3.Error as e:
+                plan = [f"unavailable: {e}"]
+            traced.append({'sql': ' '.join(query.split()), 'plan': plan})
+        return traced
+    
+    def interrupt(self):
+        """Abort the query currently running on this connection"""
+        self.conn.interrupt()
+    
+    def close(self):
+        self.conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SnapshotConnection(AKPConnection):
+    """AKPConnection backed by the columnar snapshot instead of the .db files
+    
+    Each schema is an in-memory database. A snapshot table is loaded when a
+    query refers to it, with only the columns that query names and only the
+    rows of the dates it can read (see _window()), so the getters' SQL runs
+    unchanged. A later query that needs another column or dates outside
+    those loaded reloads the table.
+    Tables that are not in the snapshot (catalogs, aggregates) do not exist
+    here and the getters fall back to the raw tables as usual.
+    """
+    
+    def __init__(self, directory=SNAPSHOT_DIR, **kwargs):
+        _require_pyarrow()
+        super().__init__(databases={}, read_only=False, cache=None, **kwargs)
+        self.directory = Path(directory)
+        self._loaded = {}
+        for alias in DATABASES:
+            self.conn.execute(f"ATTACH DATABASE ':memory:' AS {alias}")
+    
+    def has_table(self, schema, table):
+        self._load(f'{schema}.{table}')
+        return super().has_table(schema, table)
+    
+    def execute(self, query, params=()):
+        self._load(query, params)
+        return super().execute(query, params)
+    
+    def records(self, query, params=()):
+        self._load(query, params)
+        return super().records(query, params)
+    
+    def read_sql(self, query, params=()):
+        self._load(query, params)
+        return super().read_sql(query, params)
+    
+    def iterate(self, query, params=(), chunk_size=STREAM_CHUNK_SIZE):
+        self._load(query, params)
+        return super().iterate(query, params, chunk_size)
+    
+    def _window(self, name, params):
+        """First and last date (None: the latest) a query on snapshot table `name` can read
+        
+        In range mode these are the earliest and latest dates among the
+        query's params, the start moved back one month for the trading date
+        before it. The daily getters read the latest two dates, which are
+        looked up in the date column of the last two partitions alone. Both
+        modes start in December of the previous year for SNAPSHOT_YTD_TABLES.
+        """
+        dates = [param for param in params if isinstance(param, str) and re.match(r'\d{4}-\d{2}-\d{2}', param)]
+        if dates:
+            first, last = min(dates), max(dates)
+        else:
+            first, last = max(path.name.split('=', 1)[1] for path in (self.directory / name).glob('month=*')), None
+            if name not in SNAPSHOT_YTD_TABLES:
+                _, _, column = SNAPSHOT_TABLES[name]
+                latest = read_snapshot(name, columns=[column], latest=2, directory=self.directory)
+                return sorted(day for day in latest.column(column).unique().to_pylist() if day is not None)[-2:][0], None
+        year, month = int(first[:4]), int(first[5:7])
+        if name in SNAPSHOT_YTD_TABLES:
+            return f"{year - 1}-12-01", last
+        return f"{year - (month == 1)}-{(month - 2) % 12 + 1:02d}-01", last
+    
+    def _load(self, query, params=()):
+        """Copy the snapshot rows and columns a query needs into its schemas"""
+        for name, (schema, table, _) in SNAPSHOT_TABLES.items():
+            if not re.search(rf'\b{schema}\."?{re.escape(table)}\b', query):
+                continue
+            manifest_path = self.directory / name / SNAPSHOT_MANIFEST
+            if not manifest_path.exists():
+                continue
+            layout = json.loads(manifest_path.read_text())['columns']
+            columns = {c for c in layout if re.search(rf'\b{re.escape(c)}\b', query, re.IGNORECASE)}
+            loaded_columns, loaded_start, loaded_end = self._loaded.get(name, (set(), None, None))
+            if name in self._loaded and not columns:
+                continue
+            start, end = self._window(name, params) if columns else (None, None)
+            if (columns <= loaded_columns and loaded_start is not None and start >= loaded_start
+                    and (loaded_end is None or end is not None and end <= loaded_end)):
+                continue
+            
+            self.conn.execute(f'DROP TABLE IF EXISTS {schema}."{table}"')
+            if not columns:
+                # has_table(): create the table empty; the first query fills it
+                names = ', '.join(f'"{c}"' for c in layout)
+                self.conn.execute(f'CREATE TABLE {schema}."{table}" ({names})')
+                self._loaded[name] = (set(), None, None)
+                continue
+            columns = [c for c in layout if c in columns | loaded_columns]
+            if loaded_start is not None:
+                # Keep the dates already loaded for earlier queries
+                start = min(start, loaded_start)
+                end = None if end is None or loaded_end is None else max(end, loaded_end)
+            # Filtered by date while scanning, so only the window's rows become Python values
+            scanner = scan_snapshot(name, columns=columns, start=start, end=end, directory=self.directory)
+            names = ', '.join(f'"{c}"' for c in columns)
+            self.conn.execute(f'CREATE TABLE {schema}."{table}" ({names})')
+            insert = f'INSERT INTO {schema}."{table}" VALUES ({", ".join("?" * len(columns))})'
+            for batch in scanner.to_batches():
+                self.conn.executemany(insert, zip(*(array.to_pylist() for array in batch.columns)))
+            self._loaded[name] = (set(columns), start, end)
+
+
+class MarketReportGenerator:
+    def __init__(self, db=None, connect=AKPConnection, config=None, profiler=None):
+        self.connect = connect
+        self.config = load_config() if config is None else config
+        self.profiler = profiler
         self.report_date = None
         self.previous_date = None
         self.data = {}
+        self.errors = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._owned = []
+        if db is not None:
+            self._local.db = db
+    
+    @property
+    def db(self):
+        """Connection for the calling thread, opened on first use"""
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self.connect()
+            self._local.db = db
+            with self._lock:
+                self._owned.append(db)
+        return db
+    
+    def close(self):
+        """Close the connections this generator opened for its workers"""
+        with self._lock:
+            owned, self._owned = self._owned, []
+        for db in owned:
+            db.close()
+    
+    def quality_settings(self):
+        """The configured quality thresholds over DEFAULT_CONFIG['quality']"""
+        return dict(DEFAULT_CONFIG['quality'], **self.config.get('quality', {}))
+    
+    def sources(self):
+        """The sources a report fetches: SOURCES, plus QUALITY_SOURCES while the quality stage is enabled"""
+        if self.quality_settings()['enabled']:
+            return dict(SOURCES, **QUALITY_SOURCES)
+        return dict(SOURCES)
+    
+    def fetch_all(self, sources=None, max_workers=None, start=None, end=None, executor=None, consistent=False):
+        """Run the source getters concurrently, one connection per worker
+        
+        Returns (data, errors): data maps each source name to its rows
+        (or None) and errors maps failed or timed-out sources to a reason, so a
+        broken source only empties its own report section. With start and end,
+        each getter returns the whole range (see build_reports()). Passing a
+        long-lived executor keeps its workers' connections warm between calls.
+        By default every source of sources() is fetched. With consistent, the
+        sources of one database run one after another in a single read
+        transaction, so they all see the same commit; the group times out after
+        the longest timeout of its sources.
+        """
+        sources = self.sources() if sources is None else dict(sources)
+        data = {name: None for name in sources}
+        errors = {}
+        running = {}
+        timed_out = {}
+        groups = {}
+        for name, (_, schema, _) in sources.items():
+            groups.setdefault(schema if consistent else name, []).append(name)
+        
+        def run(key, names):
+            db = self.db
+            schema = sources[names[0]][1]
+            if schema in db.unavailable:
+                raise sqlite3.OperationalError(db.unavailable[schema])
+            running[key] = db
+            results = {}
+            with db.transaction():
+                for name in names:
+                    try:
+                        results[name] = getattr(self, sources[name][0])(start=start, end=end)
+                    except Exception as e:
+                        results[name] = e
+            return results
+        
+        owned = executor is None
+        if owned:
+            executor = ThreadPoolExecutor(max_workers=max_workers or len(groups))
+        stage = self.profiler.stage('fetch_all', 'fetch') if self.profiler else contextlib.nullcontext({})
+        try:
+            with stage as record:
+                started = time.monotonic()
+                futures = {key: executor.submit(run, key, names) for key, names in groups.items()}
+                for key, future in futures.items():
+                    names = groups[key]
+                    timeout = max(sources[name][2] for name in names)
+                    remaining = max(0, started + timeout - time.monotonic())
+                    try:
+                        results = future.result(timeout=remaining)
+                    except FutureTimeout:
+                        timed_out[key] = future
+                        results = dict.fromkeys(names, FutureTimeout(f"timeout after {timeout}s"))
+                    except Exception as e:
+                        results = dict.fromkeys(names, e)
+                    for name, result in results.items():
+                        if isinstance(result, Exception):
+                            # pandas wraps driver errors; report the underlying cause
+                            errors[name] = str(result.__cause__ or result)
+                        else:
+                            data[name] = result
+                        if name in errors:
+                            print(f"Error getting {name} data: {errors[name]}")
+                # A timed-out getter would keep its worker and that worker's
+                # connection busy into the next fetch on this executor: drop it
+                # if it never started, otherwise interrupt it until it returns
+                for key, future in timed_out.items():
+                    if future.cancel():
+                        continue
+                    while not wait([future], timeout=0.05).done:
+                        if key in running:
+                            running[key].interrupt()
+                record['errors'] = dict(errors)
+        finally:
+            if owned:
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        return data, errors
+    
+    def _dates(self, schema, start, end):
+        """Trading-date subquery and params: the latest two dates, or [start, end] plus the date before start"""
+        if end is None:
+            return self.db.latest_dates_sql(schema, 2), ()
+        return self.db.range_dates_sql(schema), (start, start, end)
+    
+    def _window(self, table, column, start, end):
+        """Query tail and params: the rows of the latest two dates, or of [start, end] plus the date before start
         
+        Duplicated dates are all returned, for check_quality() to drop, rather
+        than pushing the previous date out of the window.
+        """
+        if end is None:
+            return f"WHERE {column} IN (SELECT DISTINCT {column} FROM {table} ORDER BY {column} DESC LIMIT 2)\n        ORDER BY {column} DESC", ()
+        return f"WHERE {_history_clause(table, column)}\n        ORDER BY {column} DESC", (start, start, end)
+    
     def get_latest_date(self, db_path, table_name, date_col):
         """Get the latest date from a database table"""
         try:
-            conn = sqlite3.connect(db_path)
-            query = f"SELECT MAX({date_col}) FROM {table_name}"
-            cursor = conn.cursor()
-            cursor.execute(query)
-            result = cursor.fetchone()[0]
-            conn.close()
-            return result
+            alias = self.db.alias_for(db_path)
+            query = f'SELECT MAX("{date_col}") FROM {alias}."{table_name}"'
+            return self.db.execute(query)[0][0]
         except Exception as e:
             print(f"Error getting latest date from {db_path}: {e}")
             return None
     
-    def get_yield_data(self):
+    @profiled('getter')
+    def get_yield_data(self, start=None, end=None):
         """Extract yield data from DB_PLTE"""
-        try:
-            conn = sqlite3.connect(DB_PLTE)
-            query = """
+        dates, params = self._dates('plte', start, end)
+        query = f"""
+        SELECT 
+            tanggal_transaksi as date,
+            Securities_Id as security,
+            Yield as yield,
+            Price as price,
+            Coupon_Rate as coupon,
+            Volume as volume,
+            Value as value
+        FROM plte.DB_PLTE
+        WHERE tanggal_transaksi IN ({dates})
+        ORDER BY tanggal_transaksi DESC, Securities_Id
+        """
+        return self.db.read_sql(query, params)
+    
+    @profiled('getter')
+    def get_plte_stats(self, start=None, end=None):
+        """Per-day, per-series statistics of the latest two PLTE trading days
+        
+        One pass over DB_PLTE (or PLTE_Daily_Series when it is fresh) serves
+        the SUN and SBSN headlines, the benchmark tables and the per-family
+        figures. Only trades with 0 < yield < 20 enter yield_count, yield_mean,
+        yield_m2 and the volume-weighted sums; positive_yield and price average
+        the trades with a positive yield, as quoted in the benchmark tables.
+        """
+        if self.db.aggregate_fresh('PLTE_Daily_Series'):
+            if end is None:
+                dates, params = """
+                SELECT DISTINCT tanggal FROM plte.PLTE_Daily_Series
+                ORDER BY tanggal DESC LIMIT 2
+            """, ()
+            else:
+                dates = f"""
+                SELECT DISTINCT tanggal FROM plte.PLTE_Daily_Series
+                WHERE {_history_clause('plte.PLTE_Daily_Series', 'tanggal')}
+            """
+                params = (start, start, end)
+            query = f"""
             SELECT 
-                tanggal_transaksi as date,
+                tanggal as date,
                 Securities_Id as security,
-                Yield as yield,
-                Price as price,
-                Coupon_Rate as coupon,
-                Volume as volume,
-                Value as value
-            FROM DB_PLTE
-            WHERE tanggal_transaksi IN (
-                SELECT DISTINCT tanggal_transaksi FROM DB_PLTE 
-                ORDER BY tanggal_transaksi DESC LIMIT 2
-            )
-            ORDER BY tanggal_transaksi DESC, Securities_Id
+                trades,
+                yield_count,
+                COALESCE(yield_sum / yield_count, 0) as yield_mean,
+                COALESCE(yield_sumsq - yield_sum * yield_sum / yield_count, 0) as yield_m2,
+                yield_volume,
+                yield_weighted,
+                positive_count,
+                positive_yield_sum / positive_count as positive_yield,
+                positive_price_sum / positive_price_count as price,
+                positive_price_count as price_count,
+                maturity,
+                volume,
+                value
+            FROM plte.PLTE_Daily_Series
+            WHERE tanggal IN ({dates})
+            ORDER BY tanggal DESC, Securities_Id
             """
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
-        except Exception as e:
-            print(f"Error getting yield data: {e}")
-            return None
+            stats = self.db.records(query, params)
+        else:
+            key = ('stream_plte_stats', tuple(PLTE_STATS_COLUMNS), YIELD_MIN, YIELD_MAX, start, end)
+            stats = self.db.cached(key, ['plte'], lambda: self.stream_plte_stats(start=start, end=end))
+        
+        for row in stats:
+            row['family'] = series_family(row['security'])
+            row['market'] = SERIES_FAMILIES.get(row['family'])
+        return stats
     
-    def get_benchmark_yields(self):
-        """Extract benchmark yield data - average yield per security per day"""
-        try:
-            conn = sqlite3.connect(DB_PLTE)
-            # Common benchmark series - get average yield per day
-            query = """
+    @profiled('getter')
+    def get_plte_flags(self, start=None, end=None):
+        """PLTE trades flagged by the quality stage; only they leave the database
+        
+        Within each day and series every valid yield (YIELD_MIN, YIELD_MAX)
+        gets a modified z-score, 0.6745 (yield - median) / MAD, or
+        (yield - median) / (1.2533 mean absolute deviation) when the MAD is
+        zero (Iglewicz and Hoaglin). A trade is returned when it is an outlier
+        (|z| above quality['robust_z'] in a series with quality['min_trades']
+        valid yields), when it is priced above par while yielding above its
+        coupon or the reverse (a mismatch), or when its positive yield is at or
+        above YIELD_MAX (invalid, yet counted in positive_yield and price).
+        
+        The medians and spreads come from PLTE_Daily_Series when it is fresh;
+        otherwise from one pass over the (date, series, yield) index, passed
+        back to the same query as JSON. Without the bootstrap index the
+        report dates' trades are first read into a temporary table, so the
+        join costs one scan of DB_PLTE rather than one per series.
+        """
+        settings = self.quality_settings()
+        dates, date_params = self._dates('plte', start, end)
+        params = date_params
+        if self.db.aggregate_fresh('PLTE_Daily_Series'):
+            robust = f"""
+            SELECT 
+                tanggal as date, Securities_Id as security, yield_count as n,
+                yield_median as median, yield_mad as mad, yield_mean_deviation as mean_deviation
+            FROM plte.PLTE_Daily_Series
+            WHERE tanggal IN ({dates}) AND yield_count > 0
+            """
+        else:
+            key = ('robust_plte_yields', YIELD_MIN, YIELD_MAX, start, end)
+            spreads = self.db.cached(key, ['plte'], lambda: self._robust_plte_yields(dates, date_params))
+            robust = """
+            SELECT 
+                json_extract(value, '$[0]') as date, json_extract(value, '$[1]') as security,
+                json_extract(value, '$[2]') as n, json_extract(value, '$[3]') as median,
+                json_extract(value, '$[4]') as mad, json_extract(value, '$[5]') as mean_deviation
+            FROM json_each(?)
+            """
+            params = (json.dumps(spreads),)
+        # robust is materialized so each JSON element is parsed once rather than
+        # per joined trade; trades only when no index serves the join
+        indexed = self.db.has_index('plte', 'idx_plte_tanggal_seri_yield')
+        query = f"""
+        WITH robust AS MATERIALIZED ({robust}),
+        trades AS {'NOT ' if indexed else ''}MATERIALIZED (
             SELECT 
                 tanggal_transaksi as date,
                 Securities_Id as security,
-                AVG(Yield) as yield,
-                AVG(Price) as price,
-                MAX(Mature_Date) as maturity
-            FROM DB_PLTE
-            WHERE tanggal_transaksi IN (
-                SELECT DISTINCT tanggal_transaksi FROM DB_PLTE 
-                ORDER BY tanggal_transaksi DESC LIMIT 2
-            )
-            AND Securities_Id IN (
-                'FR0091', 'FR0092', 'FR0093', 'FR0094', 'FR0095', 
-                'FR0096', 'FR0097', 'FR0098', 'FR0099'
-            )
-            AND Yield > 0
-            GROUP BY tanggal_transaksi, Securities_Id
-            ORDER BY tanggal_transaksi DESC, Mature_Date
-            """
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
-        except Exception as e:
-            print(f"Error getting benchmark yields: {e}")
-            return None
-    
-    def get_ownership_data(self):
-        """Extract ownership data from DB_Kepemilikan"""
-        try:
-            conn = sqlite3.connect(DB_KEPEMILIKAN)
-            query = """
+                Yield as yield,
+                Price as price,
+                Coupon_Rate as coupon,
+                Volume as volume
+            FROM plte.DB_PLTE
+            WHERE tanggal_transaksi IN ({dates}) AND Yield > ?
+        ),
+        scored AS (
             SELECT 
-                tanggal as date,
-                KATEGORI_SBN as category,
-                Total_CN as domestic_individual,
-                Total_CR as domestic_company,
-                Total_OR as non_resident
-            FROM Kepemilikan_Investor_Tradable
-            ORDER BY tanggal DESC LIMIT 2
+                t.*,
+                r.n,
+                COALESCE((t.yield - r.median) / CASE WHEN r.mad > 0 THEN r.mad / 0.6745
+                                                     ELSE NULLIF(r.mean_deviation * 1.253314, 0) END, 0) as robust_z
+            FROM robust r
+            JOIN trades t ON t.date = r.date AND t.security = r.security AND t.yield < ?
+        )
+        SELECT * FROM (
+            SELECT 
+                date, security, yield, price, coupon, volume, robust_z,
+                n >= ? AND ABS(robust_z) > ? as outlier,
+                COALESCE(coupon > 0 AND (
+                    (price - 100 > ? AND yield - coupon > ?) OR
+                    (price - 100 < -? AND yield - coupon < -?)
+                ), 0) as mismatch,
+                0 as invalid
+            FROM scored
+        )
+        WHERE outlier OR mismatch
+        UNION ALL
+        SELECT date, security, yield, price, coupon, volume, NULL, 0, 0, 1
+        FROM trades
+        WHERE yield >= ?
+        ORDER BY date DESC, security
+        """
+        par, coupon = settings['par_tolerance'], settings['coupon_tolerance']
+        params = (*params, *date_params, YIELD_MIN, YIELD_MAX, settings['min_trades'], settings['robust_z'],
+                  par, coupon, par, coupon, YIELD_MAX)
+        return self.db.records(query, params)
+    
+    def _robust_plte_yields(self, dates, params):
+        """[date, series, valid yields, median, MAD, mean absolute deviation] per series
+        
+        Read in (date, series, yield) order straight from idx_plte_tanggal_seri_yield.
+        """
+        query = f"""
+        SELECT tanggal_transaksi, Securities_Id, Yield
+        FROM plte.DB_PLTE
+        WHERE tanggal_transaksi IN ({dates}) AND Yield > ? AND Yield < ?
+        ORDER BY tanggal_transaksi, Securities_Id, Yield
+        """
+        spreads = []
+        series, values = None, []
+        for rows in self.db.iterate(query, (*params, YIELD_MIN, YIELD_MAX)):
+            for date, security, value in rows:
+                if (date, security) != series:
+                    if values:
+                        spreads.append([*series, len(values), *robust_spread(values)])
+                    series, values = (date, security), []
+                values.append(value)
+        if values:
+            spreads.append([*series, len(values), *robust_spread(values)])
+        return spreads
+    
+    def stream_plte_stats(self, chunk_size=STREAM_CHUNK_SIZE, start=None, end=None):
+        """Reduce the raw trades of the latest two days (or a range) to per-series statistics
+        
+        Trades are fetched chunk_size rows at a time and folded into one
+        accumulator per (date, series), so peak memory does not depend on the
+        number of trades on heavy auction days.
+        """
+        dates, params = self._dates('plte', start, end)
+        query = f"""
+        SELECT 
+            tanggal_transaksi as date,
+            Securities_Id as security,
+            Yield as yield,
+            Price as price,
+            Volume as volume,
+            Value as value,
+            Mature_Date as maturity
+        FROM plte.DB_PLTE
+        WHERE tanggal_transaksi IN ({dates})
+        """
+        # (date, series) -> [trades, RunningStats, positive count, positive yield sum,
+        #                    price count, price sum, maturity, volume, value]
+        series = {}
+        for rows in self.db.iterate(query, params, chunk_size=chunk_size):
+            for date, security, value, price, volume, traded, maturity in rows:
+                acc = series.get((date, security))
+                if acc is None:
+                    acc = series[(date, security)] = [0, RunningStats(), 0, 0.0, 0, 0.0, None, 0.0, 0.0]
+                acc[0] += 1
+                acc[7] += volume or 0
+                acc[8] += traded or 0
+                if value is None or value <= 0:
+                    continue
+                if value < YIELD_MAX:
+                    acc[1].add(value, volume)
+                acc[2] += 1
+                acc[3] += value
+                if price is not None:
+                    acc[4] += 1
+                    acc[5] += price
+                if maturity is not None and (acc[6] is None or maturity > acc[6]):
+                    acc[6] = maturity
+        
+        records = []
+        for (date, security), acc in sorted(series.items(), key=lambda item: item[0][0], reverse=True):
+            stats = acc[1]
+            records.append(dict(zip(PLTE_STATS_COLUMNS, (
+                date, security, acc[0], stats.count, stats.mean, stats.m2, stats.volume, stats.weighted,
+                acc[2], acc[3] / acc[2] if acc[2] else None, acc[5] / acc[4] if acc[4] else None, acc[4],
+                acc[6], acc[7], acc[8]
+            ))))
+        return records
+    
+    @profiled('getter')
+    def get_ownership_data(self, start=None, end=None):
+        """Extract ownership levels per SBN category with their previous-day,
+        month-start and year-start levels from DB_Kepemilikan
+        
+        Reads Kepemilikan_Daily_Category when it is fresh, so the day, mtd and
+        ytd changes are lookups; otherwise computes the same rows from the raw
+        table, reading back to the last date before the year.
+        """
+        columns = """
+            tanggal as date,
+            KATEGORI_SBN as category,
+            total_cn as domestic_individual,
+            total_cr as domestic_company,
+            total_or as non_resident,
+            prev_cn as prev_domestic_individual,
+            prev_cr as prev_domestic_company,
+            prev_or as prev_non_resident,
+            month_base_cn as month_base_domestic_individual,
+            month_base_cr as month_base_domestic_company,
+            month_base_or as month_base_non_resident,
+            year_base_cn as year_base_domestic_individual,
+            year_base_cr as year_base_domestic_company,
+            year_base_or as year_base_non_resident
+        """
+        if self.db.aggregate_fresh('Kepemilikan_Daily_Category'):
+            table = 'kepemilikan.Kepemilikan_Daily_Category'
+            if end is None:
+                dates, params = f"SELECT MAX(tanggal) FROM {table}", ()
+            else:
+                dates, params = f"SELECT DISTINCT tanggal FROM {table} WHERE {_history_clause(table, 'tanggal')}", (start, start, end)
+            query = f"""
+            SELECT {columns}
+            FROM {table}
+            WHERE tanggal IN ({dates})
+            ORDER BY tanggal DESC, KATEGORI_SBN
             """
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
-        except Exception as e:
-            print(f"Error getting ownership data: {e}")
-            return None
+            return self.db.records(query, params)
+        
+        table = 'kepemilikan.Kepemilikan_Investor_Tradable'
+        if end is None:
+            dates, params = f"SELECT MAX(tanggal) FROM {table}", ()
+        else:
+            dates, params = f"SELECT DISTINCT tanggal FROM {table} WHERE {_history_clause(table, 'tanggal')}", (start, start, end)
+        query = f"""
+        WITH dates(tanggal) AS ({dates}),
+        history AS (
+            SELECT
+                tanggal,
+                KATEGORI_SBN,
+                SUM(Total_CN) as total_cn,
+                SUM(Total_CR) as total_cr,
+                SUM(Total_OR) as total_or
+            FROM {table}
+            WHERE tanggal >= COALESCE((
+                SELECT MAX(tanggal) FROM {table}
+                WHERE tanggal < substr((SELECT MIN(tanggal) FROM dates), 1, 4) || '-01-01'
+            ), '') AND tanggal <= (SELECT MAX(tanggal) FROM dates)
+            GROUP BY tanggal, KATEGORI_SBN
+        )
+        SELECT {columns}
+        FROM ({OWNERSHIP_FLOWS_SQL})
+        WHERE tanggal IN (SELECT tanggal FROM dates)
+        ORDER BY tanggal DESC, KATEGORI_SBN
+        """
+        return self.db.records(query, params)
     
-    def get_transaction_data(self):
-        """Extract transaction data from DB_Transaksi_Harian"""
-        try:
-            conn = sqlite3.connect(DB_TRANSAKSI)
-            query = """
+    @profiled('getter')
+    def get_transaction_data(self, start=None, end=None):
+        """Extract per-type settlements with month- and year-to-date sums from DB_Transaksi_Harian"""
+        columns = """
+            tanggal as settle_date,
+            JENIS_TRANSAKSI as trans_type,
+            NULL as series,
+            transactions as transaction_count,
+            nominal as total_volume,
+            value as total_value,
+            yield_sum / yield_count as avg_yield,
+            mtd_nominal as mtd_volume,
+            mtd_value,
+            mtd_days,
+            ytd_nominal as ytd_volume,
+            ytd_value,
+            ytd_days
+        """
+        if self.db.aggregate_fresh('Transaksi_Daily_Type'):
+            if end is None:
+                dates, params = """
+                SELECT DISTINCT tanggal FROM transaksi.Transaksi_Daily_Type
+                ORDER BY tanggal DESC LIMIT 2
+            """, ()
+            else:
+                dates = f"""
+                SELECT DISTINCT tanggal FROM transaksi.Transaksi_Daily_Type
+                WHERE {_history_clause('transaksi.Transaksi_Daily_Type', 'tanggal')}
+            """
+                params = (start, start, end)
+            query = f"""
+            SELECT {columns}
+            FROM transaksi.Transaksi_Daily_Type
+            WHERE tanggal IN ({dates})
+            ORDER BY tanggal DESC, JENIS_TRANSAKSI
+            """
+            return self.db.records(query, params)
+        
+        # Without the aggregate the running sums need the raw rows since the year start
+        dates, params = self._dates('transaksi', start, end)
+        query = f"""
+        WITH dates(tanggal) AS ({dates}),
+        history AS (
             SELECT 
-                TANGGAL_SETELMEN as settle_date,
-                JENIS_TRANSAKSI as trans_type,
-                SERI as series,
-                COUNT(*) as transaction_count,
-                SUM(NOMINAL) as total_volume,
-                SUM(NILAI_TRANSAKSI) as total_value,
-                AVG(YIELD) as avg_yield
-            FROM Transaksi_Harian
-            WHERE TANGGAL_SETELMEN IN (
-                SELECT DISTINCT TANGGAL_SETELMEN FROM Transaksi_Harian
-                ORDER BY TANGGAL_SETELMEN DESC LIMIT 2
-            )
+                TANGGAL_SETELMEN as tanggal,
+                JENIS_TRANSAKSI,
+                COUNT(*) as transactions,
+                SUM(NOMINAL) as nominal,
+                SUM(NILAI_TRANSAKSI) as value,
+                COUNT(YIELD) as yield_count,
+                TOTAL(YIELD) as yield_sum
+            FROM transaksi.Transaksi_Harian
+            WHERE TANGGAL_SETELMEN >= substr((SELECT MIN(tanggal) FROM dates), 1, 4) || '-01-01'
+              AND TANGGAL_SETELMEN <= (SELECT MAX(tanggal) FROM dates)
             GROUP BY TANGGAL_SETELMEN, JENIS_TRANSAKSI
-            ORDER BY TANGGAL_SETELMEN DESC
-            """
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
-        except Exception as e:
-            print(f"Error getting transaction data: {e}")
-            return None
+        )
+        SELECT {columns}
+        FROM ({TRANSACTIONS_TO_DATE_SQL})
+        WHERE tanggal IN (SELECT tanggal FROM dates)
+        ORDER BY tanggal DESC, JENIS_TRANSAKSI
+        """
+        return self.db.records(query, params)
     
-    def get_fx_data(self):
+    @profiled('getter')
+    def get_fx_data(self, start=None, end=None):
         """Extract FX rate data"""
-        try:
-            conn = sqlite3.connect(DB_DOMESTIK)
-            query = """
-            SELECT tanggal, USD, EUR, JPY, SGD
-            FROM Kurs_IDR
-            ORDER BY tanggal DESC LIMIT 2
-            """
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
-        except Exception as e:
-            print(f"Error getting FX data: {e}")
-            return None
+        window, params = self._window('domestik.Kurs_IDR', 'tanggal', start, end)
+        query = f"""
+        SELECT tanggal, USD, EUR, JPY, SGD
+        FROM domestik.Kurs_IDR
+        {window}
+        """
+        return self.db.records(query, params)
     
-    def get_ust_data(self):
+    @profiled('getter')
+    def get_ust_data(self, start=None, end=None):
         """Extract US Treasury yield data"""
-        try:
-            conn = sqlite3.connect(DB_DOMESTIK)
-            query = """
-            SELECT tanggal, Indonesia, USA
-            FROM '10Y_General'
-            ORDER BY tanggal DESC LIMIT 2
-            """
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
-        except Exception as e:
-            print(f"Error getting UST data: {e}")
-            return None
+        window, params = self._window('domestik."10Y_General"', 'tanggal', start, end)
+        query = f"""
+        SELECT tanggal, Indonesia, USA
+        FROM domestik."10Y_General"
+        {window}
+        """
+        return self.db.records(query, params)
     
-    def get_cds_data(self):
+    @profiled('getter')
+    def get_cds_data(self, start=None, end=None):
         """Extract CDS data"""
-        try:
-            conn = sqlite3.connect(DB_DOMESTIK)
-            query = """
-            SELECT DISTINCT tanggal, PRICE as price, TENOR as tenor
-            FROM CDS_Indo
-            WHERE TENOR IN ('CDS 5Y', 'CDS 10Y')
-            AND tanggal IN (
-                SELECT DISTINCT tanggal FROM CDS_Indo ORDER BY tanggal DESC LIMIT 1
-            )
-            ORDER BY tanggal DESC, TENOR
-            """
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
-        except Exception as e:
-            print(f"Error getting CDS data: {e}")
-            return None
+        if end is None:
+            dates, params = "SELECT DISTINCT tanggal FROM domestik.CDS_Indo ORDER BY tanggal DESC LIMIT 1", ()
+        else:
+            dates = f"SELECT DISTINCT tanggal FROM domestik.CDS_Indo WHERE {_history_clause('domestik.CDS_Indo', 'tanggal')}"
+            params = (start, start, end)
+        query = f"""
+        SELECT DISTINCT tanggal, PRICE as price, TENOR as tenor
+        FROM domestik.CDS_Indo
+        WHERE TENOR IN ('CDS 5Y', 'CDS 10Y')
+        AND tanggal IN (
+            {dates}
+        )
+        ORDER BY tanggal DESC, TENOR
+        """
+        return self.db.records(query, params)
     
-    def get_ndf_data(self):
+    @profiled('getter')
+    def get_ndf_data(self, start=None, end=None):
         """Extract NDF data"""
-        try:
-            conn = sqlite3.connect(DB_DOMESTIK)
-            query = """
-            SELECT tanggal, IHN_1M_Curncy, IHN_6M_Curncy, IHN_12M_Curncy
-            FROM NDF_Update
-            ORDER BY tanggal DESC LIMIT 2
-            """
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
-        except Exception as e:
-            print(f"Error getting NDF data: {e}")
-            return None
+        window, params = self._window('domestik.NDF_Update', 'tanggal', start, end)
+        query = f"""
+        SELECT tanggal, IHN_1M_Curncy, IHN_6M_Curncy, IHN_12M_Curncy
+        FROM domestik.NDF_Update
+        {window}
+        """
+        return self.db.records(query, params)
     
-    def get_stock_indices(self):
+    @profiled('getter')
+    def get_stock_indices(self, start=None, end=None):
         """Extract stock index data"""
-        try:
-            conn = sqlite3.connect(DB_DOMESTIK)
-            query = """
-            SELECT tanggal, Indonesia, USA, Japan, Hongkong, Shanghai, German
-            FROM Saham_Peers
-            ORDER BY tanggal DESC LIMIT 2
-            """
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
-        except Exception as e:
-            print(f"Error getting stock index data: {e}")
-            return None
+        window, params = self._window('domestik.Saham_Peers', 'tanggal', start, end)
+        query = f"""
+        SELECT tanggal, Indonesia, USA, Japan, Hongkong, Shanghai, German
+        FROM domestik.Saham_Peers
+        {window}
+        """
+        return self.db.records(query, params)
     
-    def get_commodity_data(self):
+    @profiled('getter')
+    def get_commodity_data(self, start=None, end=None):
         """Extract commodity price data"""
-        try:
-            conn = sqlite3.connect(DB_DOMESTIK)
-            query = """
-            SELECT tanggal, ICP, WTI, PALM_OIL
-            FROM Commodity_DB
-            ORDER BY tanggal DESC LIMIT 2
-            """
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-            return df
-        except Exception as e:
-            print(f"Error getting commodity data: {e}")
-            return None
+        window, params = self._window('domestik.Commodity_DB', 'tanggal', start, end)
+        query = f"""
+        SELECT tanggal, ICP, WTI, PALM_OIL
+        FROM domestik.Commodity_DB
+        {window}
+        """
+        return self.db.records(query, params)
+    
+    @profiled('validate')
+    def check_quality(self, data):
+        """Validate a fetched dataset once, ahead of the report calculations
+        
+        The PLTE trades are scored in SQL by get_plte_flags(): a yield outside
+        (YIELD_MIN, YIELD_MAX) is invalid, a valid yield whose robust z-score
+        within its series and day exceeds quality['robust_z'] is an outlier,
+        and a trade priced above par while yielding above its coupon (or the
+        reverse) is a price/yield mismatch. The outliers are subtracted from
+        their series' statistics, volume-weighted sums included, and invalid
+        yields above YIELD_MAX from the benchmark averages. In the
+        market data tables a repeated date is dropped (the
+        first row is kept), a value equal to the same series' value on the
+        previous date is flagged as carried forward, and every source is
+        checked for business days missing between its dates. Returns
+        (data, quality): a checked copy of data and the quality report, or
+        data and None when disabled.
+        """
+        settings = self.quality_settings()
+        if not settings['enabled']:
+            return data, None
+        started = time.perf_counter()
+        data = dict(data)
+        quality = {'plte': None, 'sources': {}}
+        
+        flags = data.get('plte_flags')
+        if flags is not None and data.get('plte'):
+            data['plte'], quality['plte'] = _check_trades(data['plte'], flags, settings)
+        
+        for name, key in QUALITY_KEYS.items():
+            rows = data.get(name)
+            if not rows:
+                continue
+            kept, seen = [], set()
+            for row in rows:
+                observation = tuple(row[column] for column in key)
+                if observation not in seen:
+                    seen.add(observation)
+                    kept.append(row)
+            # Rows arrive latest date first; compare each value with the same series' previous date
+            previous, stale = {}, {}
+            for row in reversed(kept):
+                series = tuple(row[column] for column in key[1:])
+                values = {column: value for column, value in row.items() if column not in key}
+                date = row[key[0]]
+                if series in previous:
+                    unchanged = [column for column, value in values.items()
+                                 if value is not None and previous[series][column] == value]
+                    whole, columns = stale.get(date, (True, []))
+                    stale[date] = (whole and len(unchanged) == len(values),
+                                   columns + [' '.join(map(str, (*series, column))) for column in unchanged])
+                previous[series] = values
+            data[name] = kept
+            quality['sources'][name] = {
+                'rows': len(rows),
+                'duplicates': len(rows) - len(kept),
+                'stale_dates': sorted((date for date, (whole, _) in stale.items() if whole), reverse=True),
+                'stale_columns': [{'date': date, 'columns': columns}
+                                  for date, (whole, columns) in sorted(stale.items(), reverse=True)
+                                  if columns and not whole],
+                'gaps': _date_gaps([row[key[0]] for row in kept], settings['max_missing_days'])
+            }
+        if data.get('plte'):
+            quality['sources']['plte'] = {
+                'rows': len(data['plte']),
+                'duplicates': 0,
+                'stale_dates': [],
+                'stale_columns': [],
+                'gaps': _date_gaps([row['date'] for row in data['plte']], settings['max_missing_days'])
+            }
+        
+        quality['elapsed_ms'] = (time.perf_counter() - started) * 1000
+        return data, quality
     
-    def calculate_yield_changes(self, yields_df):
-        """Calculate yield changes between latest two dates"""
-        if yields_df is None or len(yields_df) < 2:
+    @profiled('calculate')
+    def calculate_yield_changes(self, yields_rows, market=None):
+        """Calculate yield changes between latest two dates from per-series statistics
+        
+        market restricts the calculation to 'SUN' or 'SBSN' series; by default
+        every traded series is included.
+        """
+        if yields_rows is None or len(yields_rows) < 2:
             return None
+        if market is not None:
+            yields_rows = [row for row in yields_rows if row['market'] == market]
         
-        # Filter out invalid yields (0 or very high)
-        yields_clean = yields_df[(yields_df['yield'] > 0) & (yields_df['yield'] < 20)].copy()
+        # Merge the per-series accumulators into one per date (latest first)
+        daily = {}
+        for row in yields_rows:
+            stats = daily.setdefault(row['date'], RunningStats())
+            stats.merge(RunningStats(row['yield_count'], row['yield_mean'], row['yield_m2'],
+                                     row['yield_volume'], row['yield_weighted']))
+        dates = [date for date, stats in daily.items() if stats.count > 0][:2]  # Latest 2 dates
         
-        dates = yields_clean['date'].unique()[:2]  # Latest 2 dates
         if len(dates) < 2:
             return None
         
-        today = yields_clean[yields_clean['date'] == dates[0]].groupby('date')['yield'].agg(['mean', 'std']).iloc[0]
-        yesterday = yields_clean[yields_clean['date'] == dates[1]].groupby('date')['yield'].agg(['mean', 'std']).iloc[0]
-        
-        change_bps = (today['mean'] - yesterday['mean']) * 100  # Convert to basis points
+        today = daily[dates[0]]
+        yesterday = daily[dates[1]]
+        change_bps = (today.mean - yesterday.mean) * 100  # Convert to basis points
         
         return {
             'date': dates[0],
             'prev_date': dates[1],
-            'today_yield': today['mean'],
-            'yesterday_yield': yesterday['mean'],
+            'today_yield': today.mean,
+            'yesterday_yield': yesterday.mean,
+            'today_std': today.std,
+            'yesterday_std': yesterday.std,
+            'today_vw_yield': today.vw_mean,
+            'yesterday_vw_yield': yesterday.vw_mean,
             'change_bps': change_bps,
             'trend': 'naik' if change_bps > 0 else 'turun'
         }
     
-    def calculate_ownership_changes(self, ownership_df):
-        """Calculate ownership changes"""
-        if ownership_df is None or len(ownership_df) == 0:
+    @profiled('calculate')
+    def calculate_family_stats(self, plte_rows):
+        """Yield change, trades, volume and value per series family for the latest date"""
+        if plte_rows is None or len(plte_rows) == 0:
             return None
         
-        # Group by date and sum ownership
-        ownership_summary = ownership_df.groupby('date')[['domestic_individual', 'domestic_company', 'non_resident']].sum()
+        dates = _unique(row['date'] for row in plte_rows)[:2]
+        families = {}
+        for row in plte_rows:
+            family = families.get(row['family'])
+            if family is None:
+                family = families[row['family']] = {
+                    'market': row['market'],
+                    'stats': {date: RunningStats() for date in dates},
+                    'trades': 0,
+                    'volume': 0.0,
+                    'value': 0.0
+                }
+            if row['date'] not in family['stats']:
+                continue
+            family['stats'][row['date']].merge(RunningStats(row['yield_count'], row['yield_mean'], row['yield_m2'],
+                                                            row['yield_volume'], row['yield_weighted']))
+            if row['date'] == dates[0]:
+                family['trades'] += row['trades']
+                family['volume'] += row['volume']
+                family['value'] += row['value']
         
-        if len(ownership_summary) >= 1:
-            latest = ownership_summary.iloc[0]
-            total_ownership = latest.sum()
-            
-            return {
-                'date': ownership_summary.index[0],
-                'domestic_individual': latest['domestic_individual'],
-                'domestic_company': latest['domestic_company'],
-                'non_resident': latest['non_resident'],
-                'total': total_ownership
+        rows = []
+        for name, family in sorted(families.items(), key=lambda item: (item[1]['market'] or '~', item[0] or '')):
+            today = family['stats'][dates[0]]
+            yesterday = family['stats'][dates[1]] if len(dates) > 1 else RunningStats()
+            both = today.count > 0 and yesterday.count > 0
+            rows.append({
+                'family': name,
+                'market': family['market'],
+                'today_yield': today.mean if today.count else None,
+                'yesterday_yield': yesterday.mean if yesterday.count else None,
+                'change_bps': (today.mean - yesterday.mean) * 100 if both else None,
+                'vw_yield': today.vw_mean if today.volume else None,
+                'trades': family['trades'],
+                'volume': family['volume'],
+                'value': family['value']
+            })
+        return {'date': dates[0], 'prev_date': dates[1] if len(dates) > 1 else None, 'families': rows}
+    
+    @profiled('calculate')
+    def calculate_trading_summary(self, plte_rows, market=None):
+        """Trades, volume and value traded on the latest PLTE date"""
+        if plte_rows is None or len(plte_rows) == 0:
+            return None
+        
+        latest = plte_rows[0]['date']
+        today = [row for row in plte_rows
+                 if row['date'] == latest and (market is None or row['market'] == market)]
+        
+        return {
+            'date': latest,
+            'trades': sum(row['trades'] for row in today),
+            'volume': sum(row['volume'] for row in today),
+            'value': sum(row['value'] for row in today)
+        }
+    
+    @profiled('calculate')
+    def calculate_ownership_changes(self, ownership_rows):
+        """Calculate ownership levels and their day, mtd and ytd changes, in total and per SBN category"""
+        if ownership_rows is None or len(ownership_rows) == 0:
+            return None
+        
+        # One row per category, latest date first
+        latest = ownership_rows[0]['date']
+        today = [row for row in ownership_rows if row['date'] == latest]
+        ownership = dict(date=latest, **_ownership_changes(today))
+        ownership['categories'] = {
+            category: _ownership_changes([row for row in today if row['category'] == category])
+            for category in _unique(row['category'] for row in today)
+        }
+        return ownership
+    
+    @profiled('calculate')
+    def calculate_transaction_summary(self, trans_rows):
+        """Calculate outright and repo volumes for the latest settlement date"""
+        if trans_rows is None or len(trans_rows) == 0:
+            return None
+        
+        # Filter today's transactions
+        latest_settle = trans_rows[0]['settle_date']
+        today_trans = [row for row in trans_rows if row['settle_date'] == latest_settle]
+        
+        # Calculate outright, repo non-BI, repo BI
+        outright_types = ['SALE', 'ALLOTMENT', 'FOP']
+        repo_types = ['REPO', 'REPO 2nd LEG']
+        
+        def to_date(prefix):
+            # Every type traded earlier in the year has a row on each date, so these are complete
+            return {
+                'days': today_trans[0][f'{prefix}_days'],
+                'outright_volume': sum(row[f'{prefix}_volume'] or 0 for row in today_trans if row['trans_type'] in outright_types),
+                'repo_volume': sum(row[f'{prefix}_volume'] or 0 for row in today_trans if row['trans_type'] in repo_types)
             }
-        return None
+        
+        return {
+            'date': latest_settle,
+            'outright_volume': sum(row['total_volume'] or 0 for row in today_trans if row['trans_type'] in outright_types),
+            'repo_volume': sum(row['total_volume'] or 0 for row in today_trans if row['trans_type'] in repo_types),
+            'mtd': to_date('mtd'),
+            'ytd': to_date('ytd')
+        }
+    
+    @profiled('calculate')
+    def calculate_benchmark_changes(self, plte_rows, market='SUN'):
+        """Calculate per-series yield changes for the configured benchmark series of a market"""
+        if plte_rows is None or len(plte_rows) == 0:
+            return None
+        
+        dates = _unique(row['date'] for row in plte_rows)
+        if len(dates) < 2:
+            return None
+        
+        series = set(self.config['benchmarks'].get(market, []))
+        bench = [row for row in plte_rows if row['security'] in series and row['positive_count'] > 0]
+        yesterday = {row['security']: row['positive_yield'] for row in bench if row['date'] == dates[1]}
+        today = [row for row in bench if row['date'] == dates[0] and row['security'] in yesterday]
+        today.sort(key=lambda row: (row['maturity'] is None, row['maturity'] or ''))
+        
+        rows = [
+            {
+                'security': row['security'],
+                'today_yield': row['positive_yield'],
+                'yesterday_yield': yesterday[row['security']],
+                'change_bps': (row['positive_yield'] - yesterday[row['security']]) * 100,
+                'tenor_years': years
+            }
+            for row, years in zip(today, _remaining_years([row['maturity'] for row in today], dates[0]))
+        ]
+        return {'date': dates[0], 'prev_date': dates[1], 'rows': rows}
+    
+    @profiled('calculate')
+    def calculate_yield_curve(self, plte_rows, market='SUN'):
+        """Fit today's and yesterday's yield curve and compare them at the configured tenors
+        
+        Every traded series of the market's curve families contributes its
+        clean (0-20%) average yield at its remaining tenor. Curves are fitted
+        with Nelson-Siegel, or interpolated linearly when too few series
+        traded.
+        """
+        if plte_rows is None or len(plte_rows) == 0:
+            return None
+        
+        dates = _unique(row['date'] for row in plte_rows)
+        if len(dates) < 2:
+            return None
+        
+        import numpy as np
+        families = self.config['curves'].get(market, [])
+        points = [row for row in plte_rows if row['family'] in families and row['yield_count'] > 0]
+        tenors = np.asarray(self.config['curve_tenors'], dtype=float)
+        
+        curves = {}
+        for label, date in (('today', dates[0]), ('yesterday', dates[1])):
+            day = [row for row in points if row['date'] == date]
+            years = np.asarray(_remaining_years([row['maturity'] for row in day], date))
+            valid = years > 0
+            years, yields = years[valid], np.asarray([row['yield_mean'] for row in day], dtype=float)[valid]
+            if len(years) >= NS_MIN_POINTS:
+                params = fit_nelson_siegel(years, yields)
+                curves[label] = {'method': 'nelson-siegel', 'params': list(params), 'series': len(years),
+                                 'yields': nelson_siegel(tenors, *params)}
+            elif len(years) >= 2:
+                order = np.argsort(years)
+                curves[label] = {'method': 'linear', 'params': None, 'series': len(years),
+                                 'yields': np.interp(tenors, years[order], yields[order])}
+            else:
+                return None
+        
+        changes = (curves['today']['yields'] - curves['yesterday']['yields']) * 100
+        return {
+            'date': dates[0],
+            'prev_date': dates[1],
+            'families': families,
+            'method': curves['today']['method'],
+            'params': {label: curve['params'] for label, curve in curves.items()},
+            'series': {label: curve['series'] for label, curve in curves.items()},
+            'points': [
+                {
+                    'tenor': f"{tenor:g}Y",
+                    'years': tenor,
+                    'today_yield': today,
+                    'yesterday_yield': yesterday,
+                    'change_bps': change
+                }
+                for tenor, today, yesterday, change in zip(tenors, curves['today']['yields'],
+                                                           curves['yesterday']['yields'], changes)
+            ]
+        }
+    
+    @profiled('calculate')
+    def calculate_fx_changes(self, fx_rows, stale=()):
+        """Calculate Rupiah/USD movement
+        
+        stale holds the carried-forward columns of the latest date; their
+        change is left None and only the level is reported.
+        """
+        if fx_rows is None or len(fx_rows) < 2:
+            return None
+        
+        usd_today = fx_rows[0]['USD']
+        usd_yesterday = fx_rows[1]['USD']
+        if 'USD' in stale:
+            return {'date': fx_rows[0]['tanggal'], 'usd': usd_today, 'usd_prev': usd_yesterday,
+                    'change': None, 'pct_change': None, 'trend': None}
+        usd_change = usd_today - usd_yesterday
+        
+        return {
+            'date': fx_rows[0]['tanggal'],
+            'usd': usd_today,
+            'usd_prev': usd_yesterday,
+            'change': usd_change,
+            'pct_change': (usd_change / usd_yesterday) * 100,
+            'trend': "melemah" if usd_change > 0 else "menguat"
+        }
+    
+    @profiled('calculate')
+    def calculate_index_changes(self, stocks_rows, stale=()):
+        """Calculate IHSG and global stock index movements
+        
+        An index in stale (carried forward on the latest date) keeps its level
+        with a None change.
+        """
+        if stocks_rows is None or len(stocks_rows) < 2:
+            return None
+        
+        changes = []
+        for key, label in STOCK_INDICES.items():
+            if key in stocks_rows[0]:
+                today_val = stocks_rows[0][key]
+                yesterday_val = stocks_rows[1][key]
+                change = None if key in stale else today_val - yesterday_val
+                changes.append({
+                    'key': key,
+                    'label': label,
+                    'value': today_val,
+                    'prev_value': yesterday_val,
+                    'change': change,
+                    'pct_change': None if change is None else (change / yesterday_val) * 100,
+                    'trend': None if change is None else "naik" if change > 0 else "turun"
+                })
+        
+        return {'date': stocks_rows[0]['tanggal'], 'indices': changes}
     
-    def generate_report(self):
-        """Generate the market update report"""
-        print("\n" + "="*80)
-        print("DIREKTORAT JENDERAL PENGELOLAAN PEMBIAYAAN DAN RISIKO")
-        print("KEMENTERIAN KEUANGAN RI")
-        print("="*80)
+    @profiled('calculate')
+    def calculate_ust_changes(self, ust_rows, stale=()):
+        """Calculate Indonesia 10Y, UST 10Y and spread movements
+        
+        Each change is computed per column: one whose yield is in stale
+        (carried forward on the latest date) is None, and so is the spread
+        change when either yield is stale.
+        """
+        if ust_rows is None or len(ust_rows) < 2:
+            return None
+        
+        indo_yield_today = ust_rows[0]['Indonesia']
+        indo_yield_yesterday = ust_rows[1]['Indonesia']
+        indo_change = None if 'Indonesia' in stale else (indo_yield_today - indo_yield_yesterday) * 100  # to bps
+        
+        ust_yield_today = ust_rows[0]['USA']
+        ust_yield_yesterday = ust_rows[1]['USA']
+        ust_change = None if 'USA' in stale else (ust_yield_today - ust_yield_yesterday) * 100
         
+        # Calculate spread
+        spread_today = (indo_yield_today - ust_yield_today) * 100  # in bps
+        spread_yesterday = (indo_yield_yesterday - ust_yield_yesterday) * 100
+        
+        return {
+            'date': ust_rows[0]['tanggal'],
+            'indo_yield': indo_yield_today,
+            'indo_change_bps': indo_change,
+            'indo_trend': None if indo_change is None else "naik" if indo_change > 0 else "turun",
+            'ust_yield': ust_yield_today,
+            'ust_change_bps': ust_change,
+            'ust_trend': None if ust_change is None else "naik" if ust_change > 0 else "turun",
+            'spread_bps': spread_today,
+            'prev_spread_bps': spread_yesterday,
+            'spread_change_bps': (None if indo_change is None or ust_change is None
+                                  else spread_today - spread_yesterday)
+        }
+    
+    @profiled('calculate')
+    def calculate_cds_levels(self, cds_rows):
+        """Collect the latest CDS levels per tenor"""
+        if cds_rows is None or len(cds_rows) < 1:
+            return None
+        
+        return {
+            'date': cds_rows[0]['tanggal'],
+            'tenors': [{'tenor': row['tenor'], 'price': row['price']} for row in cds_rows]
+        }
+    
+    @profiled('calculate')
+    def calculate_ndf_changes(self, ndf_rows, stale=()):
+        """Calculate NDF movements
+        
+        A tenor in stale (carried forward on the latest date) keeps its level
+        with a None change.
+        """
+        if ndf_rows is None or len(ndf_rows) < 2:
+            return None
+        
+        def change(column):
+            return None if column in stale else ndf_rows[0][column] - ndf_rows[1][column]
+        
+        ndf_1m_change = change('IHN_1M_Curncy')
+        
+        return {
+            'date': ndf_rows[0]['tanggal'],
+            'ndf_1m': ndf_rows[0]['IHN_1M_Curncy'],
+            'ndf_6m': ndf_rows[0]['IHN_6M_Curncy'],
+            'ndf_12m': ndf_rows[0]['IHN_12M_Curncy'],
+            'ndf_1m_change': ndf_1m_change,
+            'ndf_6m_change': change('IHN_6M_Curncy'),
+            'ndf_12m_change': change('IHN_12M_Curncy'),
+            'trend': None if ndf_1m_change is None else "naik" if ndf_1m_change > 0 else "turun"
+        }
+    
+    @profiled('calculate')
+    def calculate_commodity_levels(self, commodity_rows):
+        """Collect the latest commodity prices"""
+        if commodity_rows is None or len(commodity_rows) < 1:
+            return None
+        
+        return {
+            'date': commodity_rows[0]['tanggal'],
+            'icp': commodity_rows[0]['ICP'],
+            'wti': commodity_rows[0]['WTI'],
+            'palm_oil': commodity_rows[0]['PALM_OIL']
+        }
+    
+    def build_report(self, data=None, errors=None, quality=None):
+        """Fetch every source once and compute the structured report model.
+        
+        The returned dict only holds plain Python values, so it can be passed
+        to any of the render_* functions or serialized to JSON as-is. data and
+        errors, as returned by fetch_all(), skip the fetch; the data is then
+        checked with check_quality() unless its quality report is passed too.
+        """
         # Get all data
-        yields_df = self.get_yield_data()
-        benchmark_df = self.get_benchmark_yields()
-        ownership_df = self.get_ownership_data()
-        trans_df = self.get_transaction_data()
-        fx_df = self.get_fx_data()
-        ust_df = self.get_ust_data()
-        cds_df = self.get_cds_data()
-        ndf_df = self.get_ndf_data()
-        stocks_df = self.get_stock_indices()
-        commodity_df = self.get_commodity_data()
-        
-        if yields_df is None or len(yields_df) == 0:
-            print("No data available")
-            return
+        if data is None:
+            data, self.errors = self.fetch_all()
+        else:
+            self.errors = dict(errors or {})
+        if quality is None:
+            data, quality = self.check_quality(data)
+        plte_rows = data['plte']
+        ownership_rows = data['ownership']
+        trans_rows = data['transactions']
+        fx_rows = data['fx']
+        ust_rows = data['ust']
+        cds_rows = data['cds']
+        ndf_rows = data['ndf']
+        stocks_rows = data['stocks']
+        commodity_rows = data['commodities']
         
-        latest_date = yields_df['date'].iloc[0]
-        print(f"\n{latest_date}\n")
-        print("SBN Daily Market Update\n")
-        
-        # ======================== HEADLINES PASAR SUN ========================
-        print("Headlines Pasar SUN")
-        print("-" * 80)
-        
-        # Yield changes
-        yield_changes = self.calculate_yield_changes(yields_df)
-        if yield_changes:
-            print("• Pasar SUN bergerak " + yield_changes['trend'] + 
-                  f". Berdasarkan yield rata-rata, yield SUN " +
-                  f"bergerak {yield_changes['trend']} sebesar {abs(yield_changes['change_bps']):.1f} bps" +
-                  f" dibandingkan hari kemarin (dari {yield_changes['yesterday_yield']:.4f}% menjadi {yield_changes['today_yield']:.4f}%).")
-        
-        # FX rate changes
-        if fx_df is not None and len(fx_df) >= 2:
-            usd_today = fx_df.iloc[0]['USD']
-            usd_yesterday = fx_df.iloc[1]['USD']
-            usd_change = usd_today - usd_yesterday
-            trend = "melemah" if usd_change > 0 else "menguat"
-            print(f"  Nilai tukar Rupiah {trend} sebesar {abs(usd_change):.2f} poin ke level Rp{usd_today:,.0f}/US$.")
-        
-        # Stock index (IHSG)
-        if stocks_df is not None and len(stocks_df) >= 2:
-            ihsg_today = stocks_df.iloc[0]['Indonesia']
-            ihsg_yesterday = stocks_df.iloc[1]['Indonesia']
-            ihsg_change = ihsg_today - ihsg_yesterday
-            ihsg_pct = (ihsg_change / ihsg_yesterday) * 100
-            trend = "naik" if ihsg_change > 0 else "turun"
-            print(f"  Indeks IHSG {trend} sebesar {abs(ihsg_change):.2f} poin ({ihsg_pct:.2f}%) ke level {ihsg_today:,.2f}.")
+        report = {
+            'date': None,
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'sun': {},
+            'benchmarks': None,
+            'sbsn': {},
+            'plte': None,
+            'curves': {},
+            'international': {},
+            'sections': list(self.config.get('sections', SECTION_SOURCES)),
+            'quality': quality,
+            'unavailable': dict(self.errors)
+        }
         
-        print()
+        # The PLTE trading date leads the report; fall back to the Domestik
+        # tables when PLTE itself is unavailable
+        if plte_rows is not None and len(plte_rows) > 0:
+            report['date'] = plte_rows[0]['date']
+        else:
+            dates = [rows[0]['tanggal'] for rows in (fx_rows, ust_rows, stocks_rows, ndf_rows, commodity_rows)
+                     if rows]
+            if not dates:
+                return report
+            report['date'] = max(dates)
         
-        # Ownership summary
-        ownership = self.calculate_ownership_changes(ownership_df)
-        if ownership:
-            print("• Kepemilikan SBN per " + str(ownership['date']) + ":")
-            print(f"  - Investor Domestik Individu: Rp{ownership['domestic_individual']/1e12:.2f} T")
-            print(f"  - Investor Domestik Korporat: Rp{ownership['domestic_company']/1e12:.2f} T")
-            print(f"  - Non Resident: Rp{ownership['non_resident']/1e12:.2f} T")
-            print(f"  - Total Kepemilikan: Rp{ownership['total']/1e12:.2f} T")
+        report['sun'] = {
+            'yield': self.calculate_yield_changes(plte_rows, market='SUN'),
+            'trading': self.calculate_trading_summary(plte_rows, market='SUN'),
+            'fx': self.calculate_fx_changes(fx_rows, _carried_forward(quality, 'fx', fx_rows)),
+            'ownership': self.calculate_ownership_changes(ownership_rows),
+            'transactions': self.calculate_transaction_summary(trans_rows)
+        }
+        report['benchmarks'] = self.calculate_benchmark_changes(plte_rows, 'SUN')
+        report['sbsn'] = {
+            'yield': self.calculate_yield_changes(plte_rows, market='SBSN'),
+            'trading': self.calculate_trading_summary(plte_rows, market='SBSN'),
+            'benchmarks': self.calculate_benchmark_changes(plte_rows, 'SBSN')
+        }
+        report['curves'] = {market: self.calculate_yield_curve(plte_rows, market) for market in self.config['curves']}
+        report['plte'] = {
+            'market': self.calculate_yield_changes(plte_rows),
+            'trading': self.calculate_trading_summary(plte_rows),
+            'families': self.calculate_family_stats(plte_rows)
+        }
+        report['international'] = {
+            'ust': self.calculate_ust_changes(ust_rows, _carried_forward(quality, 'ust', ust_rows)),
+            'cds': self.calculate_cds_levels(cds_rows),
+            'ndf': self.calculate_ndf_changes(ndf_rows, _carried_forward(quality, 'ndf', ndf_rows)),
+            'stocks': self.calculate_index_changes(stocks_rows, _carried_forward(quality, 'stocks', stocks_rows)),
+            'commodities': self.calculate_commodity_levels(commodity_rows)
+        }
         
-        print()
+        self.report_date = report['date']
+        self.previous_date = report['sun']['yield']['prev_date'] if report['sun']['yield'] else None
+        self.data = _to_native(report)
+        return self.data
+    
+    def build_reports(self, start, end, formats=(), processes=None, days=None):
+        """Build the reports of every PLTE trading day in [start, end]
         
-        # Transaction summary
-        if trans_df is not None and len(trans_df) > 0:
-            # Filter today's transactions
-            latest_settle = trans_df['settle_date'].iloc[0]
-            today_trans = trans_df[trans_df['settle_date'] == latest_settle]
-            
-            # Calculate outright, repo non-BI, repo BI
-            outright_types = ['SALE', 'ALLOTMENT', 'FOP']
-            repo_types = ['REPO', 'REPO 2nd LEG']
+        Each source is fetched once for the whole range, including the trading
+        date before start so the first day has its comparison. The range is
+        then cut per day with slice_history() and the days are built and
+        exported on a process pool. The chart history, when charts are
+        exported, is fetched once as well and cut per day with
+        slice_chart_history(). `days` limits the reports to those dates of
+        the range. Returns the report models in date order.
+        """
+        # Dates are compared as text; cover timestamps stored for the last day
+        end = f"{str(end)[:10]} 23:59:59"
+        data, errors = self.fetch_all(start=start, end=end)
+        
+        # Report days follow PLTE, or the Domestik tables when it is unavailable
+        dates = set()
+        for name in ('plte', 'fx', 'ust', 'stocks', 'ndf', 'commodities'):
+            rows = data.get(name)
+            if rows:
+                column = SOURCE_HISTORY[name][0]
+                dates = {str(row[column])[:10] for row in rows}
+                dates = {date for date in dates if str(start) <= date <= end}
+                break
+        if days is not None:
+            dates &= {str(day)[:10] for day in days}
+        
+        charts = None
+        if 'charts' in formats and dates:
+            charts, _ = self.fetch_all({name: SOURCES[name] for name in CHART_SOURCES},
+                                       start=_chart_start(min(dates)), end=end)
+        jobs = [(slice_history(data, date), errors, self.config, tuple(formats), None, None,
+                 charts and slice_chart_history(charts, date)) for date in sorted(dates)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            return list(pool.map(_build_day, jobs))
+    
+    def build_variants(self, names=None, processes=None):
+        """Build and export the report variants declared in config['variants']
+        
+        Every source is fetched once, in one fetch_all() call, and all
+        variants are calculated and rendered from those same rows on a process
+        pool, so N variants cost one set of queries and one check_quality()
+        pass. A variant that overrides 'quality' checks the unchecked rows
+        itself, with its PLTE flags fetched at its own thresholds. A variant overrides any
+        top-level configuration key (sections, benchmarks, curves, ...) and
+        lists the formats exported for it; its files carry the variant name.
+        Returns {name: report model}.
+        """
+        variants = self.config.get('variants', {})
+        names = list(variants) if names is None else list(names)
+        jobs = []
+        for name in names:
+            if name not in variants:
+                raise ValueError(f"Unknown report variant: {name} (configured: {', '.join(variants) or 'none'})")
+            config = dict(self.config, **variants[name])
+            formats = tuple(config.pop('formats', ('txt',)))
+            config.pop('variants', None)
+            unknown = [section for section in config.get('sections', ()) if section not in SECTION_SOURCES]
+            if unknown:
+                raise ValueError(f"Unknown report sections in variant {name}: {', '.join(unknown)}")
+            jobs.append((config, formats, name, 'quality' in variants[name]))
+        if not jobs:
+            return {}
+        
+        data, errors = self.fetch_all()
+        checked, quality = self.check_quality(data)
+        # Every variant reports the same date, so the trend charts share one history
+        charts = None
+        if any('charts' in formats for _, formats, _, _ in jobs):
+            date = data['plte'][0]['date'] if data.get('plte') else max(
+                (data[name][0]['tanggal'] for name in ('fx', 'ust', 'stocks', 'ndf', 'commodities') if data.get(name)),
+                default=None)
+            if date is not None:
+                charts, _ = self.fetch_all({name: SOURCES[name] for name in CHART_SOURCES},
+                                           start=_chart_start(date), end=str(date)[:10])
+        specs, jobs = jobs, []
+        for config, formats, name, own_quality in specs:
+            if not own_quality:
+                jobs.append((checked, errors, config, formats, name, quality, charts))
+                continue
+            own = {source: rows for source, rows in data.items() if source not in QUALITY_SOURCES}
+            own_errors = {source: error for source, error in errors.items() if source not in QUALITY_SOURCES}
+            variant = MarketReportGenerator(connect=self.connect, config=config)
+            try:
+                if variant.quality_settings()['enabled']:
+                    flags, flag_errors = variant.fetch_all(QUALITY_SOURCES)
+                    own.update(flags)
+                    own_errors.update(flag_errors)
+            finally:
+                variant.close()
+            jobs.append((own, own_errors, config, formats, name, None, charts))
+        with ProcessPoolExecutor(max_workers=min(len(jobs), processes or os.cpu_count() or 1)) as pool:
+            return dict(zip(names, pool.map(_build_day, jobs)))
+    
+    def generate_report(self, report=None):
+        """Generate the market update report on the console"""
+        if report is None:
+            report = self.build_report()
+        print(self._render(render_text, report), end='')
+        return report
+    
+    def export_to_text(self, filename=None, report=None):
+        """Export report to text file"""
+        if filename is None:
+            filename = f"Market_Update_{datetime.now().strftime('%Y%m%d')}.txt"
+        return self._export(filename, render_text, report)
+    
+    def export_to_markdown(self, filename=None, report=None):
+        """Export report to Markdown file"""
+        if filename is None:
+            filename = f"Market_Update_{datetime.now().strftime('%Y%m%d')}.md"
+        return self._export(filename, render_markdown, report)
+    
+    def export_to_json(self, filename=None, report=None):
+        """Export the report model to JSON file"""
+        if filename is None:
+            filename = f"Market_Update_{datetime.now().strftime('%Y%m%d')}.json"
+        return self._export(filename, render_json, report)
+    
+    def export_charts(self, filename=None, report=None, processes=None, history=None):
+        """Render the report charts as PNG files in CHART_DIR, each in its own worker process
+        
+        Curve charts reuse the report model; the trend charts share one
+        concurrent fetch of CHART_WINDOW_DAYS of their sources, unless that
+        history is passed in. With processes=1 the charts are drawn in the
+        calling process, as in the build_reports() workers. Charts whose
+        input hash matches the one stored next to their PNG are not drawn
+        again. Returns the paths of all charts, drawn or unchanged.
+        """
+        if report is None:
+            report = self.build_report()
+        if report['date'] is None:
+            return []
+        if importlib.util.find_spec('matplotlib') is None:
+            print("matplotlib not found, skipping charts")
+            return []
+        
+        if history is None:
+            history, _ = self.fetch_all({name: SOURCES[name] for name in CHART_SOURCES},
+                                        start=_chart_start(report['date']), end=str(report['date'])[:10])
+        
+        prefix = Path(filename).stem if filename else f"Market_Update_{datetime.now().strftime('%Y%m%d')}"
+        CHART_DIR.mkdir(parents=True, exist_ok=True)
+        paths, jobs = [], []
+        for name, data in _chart_inputs(report, history).items():
+            if data is None:
+                continue
+            path = CHART_DIR / f"{prefix}_{name}.png"
+            digest = hashlib.sha256(json.dumps([CHART_VERSION, name, data], default=str).encode()).hexdigest()
+            stored = path.with_name(path.name + '.sha256')
+            paths.append(path)
+            if path.exists() and stored.exists() and stored.read_text() == digest:
+                print(f"Chart unchanged: {path}")
+                continue
+            jobs.append((name, data, path, digest))
+        
+        if jobs and processes == 1:
+            for path in map(_render_chart, jobs):
+                print(f"Chart exported to: {path}")
+        elif jobs:
+            with ProcessPoolExecutor(max_workers=min(len(jobs), processes or os.cpu_count() or 1)) as pool:
+                for path in pool.map(_render_chart, jobs):
+                    print(f"Chart exported to: {path}")
+        return paths
+    
+    def export_digest(self, filename=None, report=None):
+        """Export the English digest to text file"""
+        if filename is None:
+            filename = f"Market_Update_{datetime.now().strftime('%Y%m%d')}_en.txt"
+        return self._export(filename, render_digest, report)
+    
+    def export_summary(self, report=None, to_pdf=True, filename=None):
+        """Export the one-page summary as "Market Update YYYYMMDD - Summary.txt/.pdf"
+        
+        The PDF is produced with pandoc using the settings from
+        WORKFLOW_AUTOMATION.md; when pandoc is not installed only the text
+        file is written.
+        """
+        if report is None:
+            report = self.build_report()
+        if report['date'] is None:
+            print("No data available for summary")
+            return None
+        
+        if filename is None:
+            filename = f"Market Update {_parse_date(report['date']).strftime('%Y%m%d')} - Summary.txt"
+        filepath = self._export(filename, render_summary, report)
+        if not to_pdf:
+            return filepath
+        
+        if shutil.which('pandoc') is None:
+            print("pandoc not found, skipping PDF conversion")
+            return filepath
+        
+        pdf_path = filepath.with_suffix('.pdf')
+        result = subprocess.run([
+            'pandoc', str(filepath),
+            '-o', str(pdf_path),
+            '--pdf-engine=xelatex',
+            '-V', 'geometry:margin=2.5cm',
+            '-V', 'fontsize=11pt'
+        ], capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"Error converting summary to PDF: {result.stderr.strip()}")
+            return filepath
+        
+        print(f"Summary exported to: {pdf_path}")
+        return pdf_path
+    
+    def _render(self, renderer, report):
+        """Run a renderer, as a profiled stage when profiling"""
+        if self.profiler is None:
+            return renderer(report)
+        with self.profiler.stage(renderer.__name__, 'render') as record:
+            text = renderer(report)
+            record['output_bytes'] = len(text.encode('utf-8'))
+            return text
+    
+    def _export(self, filename, renderer, report):
+        """Render the report model with renderer and write it next to this script"""
+        if report is None:
+            report = self.build_report()
+        
+        filepath = Path(__file__).parent / filename
+        filepath.write_text(self._render(renderer, report), encoding='utf-8')
+        
+        print(f"Report exported to: {filepath}")
+        return filepath
+
+
+def _build_day(job):
+    """Process-pool worker of build_reports() and build_variants(): build and export one report
+    
+    job is (data, errors, config, formats, variant, quality, charts): the
+    variant name, if any, keeps its files apart from the other variants' of
+    the same day, the quality report of data already checked, if any, and
+    the chart history fetched by the parent when charts are exported. The
+    charts are drawn in this worker rather than on a pool of its own.
+    """
+    data, errors, config, formats, variant, quality, charts = job
+    generator = MarketReportGenerator(config=config)
+    report = generator.build_report(data, errors, quality)
+    if report['date'] is None:
+        return report
+    stamp = _parse_date(report['date']).strftime('%Y%m%d')
+    suffix = f"_{variant}" if variant else ""
+    for fmt in formats:
+        if fmt == 'summary':
+            label = f" ({variant})" if variant else ""
+            generator.export_summary(report=report, filename=f"Market Update {stamp} - Summary{label}.txt")
+        elif fmt == 'digest':
+            generator.export_digest(filename=f"Market_Update_{stamp}{suffix}_en.txt", report=report)
+        elif fmt == 'charts':
+            generator.export_charts(filename=f"Market_Update_{stamp}{suffix}.charts", report=report,
+                                    processes=1, history=charts)
+        elif fmt != 'console':
+            getattr(generator, RENDERERS[fmt])(filename=f"Market_Update_{stamp}{suffix}.{fmt}", report=report)
+    return report
+
+
+class ReportWatcher:
+    """Keep the report model current while the ETL loads new data (--watch)
+    
+    A probe connection polls PRAGMA data_version of every attached database,
+    which changes whenever another connection commits to it, plus the file's
+    inode to notice a file swapped out by the ETL. Only the sources reading a
+    changed database are fetched again, on a long-lived thread pool whose
+    connections stay open. The sources of one database are read in a single
+    read transaction. If a commit lands while a fetch runs, the sources of
+    that database are fetched again, so the model never mixes two ETL
+    states; when it keeps changing for WATCH_RETRIES fetches, the last
+    report is kept. The latest model is served as JSON over HTTP.
+    """
+    
+    def __init__(self, generator, formats=(), interval=WATCH_INTERVAL):
+        self.generator = generator
+        self.formats = tuple(formats)
+        self.interval = interval
+        self.sources = generator.sources()
+        self.data = {name: None for name in self.sources}
+        self.errors = {}
+        self.report = None
+        self.versions = {}
+        self.updated_at = None
+        self._lock = threading.Lock()
+        self._probe = generator.connect()
+        self._executor = ThreadPoolExecutor(max_workers=len(self.sources))
+    
+    def poll(self):
+        """Current (data_version, inode) of every attached database"""
+        versions = {}
+        for alias, path in self._probe.databases.items():
+            if alias in self._probe.unavailable:
+                versions[alias] = None
+                continue
+            data_version = self._probe.conn.execute(f"PRAGMA {alias}.data_version").fetchone()[0]
+            try:
+                inode = Path(path).stat().st_ino
+            except FileNotFoundError:
+                inode = None
+            versions[alias] = (data_version, inode)
+        return versions
+    
+    def refresh(self, schemas=None):
+        """Fetch the sources reading the given schemas (all when None) and rebuild the model
+        
+        Returns the new model, or None when the data kept changing and the
+        last report was kept.
+        """
+        pending = set(self._probe.databases) if schemas is None else set(schemas)
+        data, errors = dict(self.data), dict(self.errors)
+        for _ in range(WATCH_RETRIES):
+            before = self.poll()
+            sources = {name: spec for name, spec in self.sources.items() if spec[1] in pending}
+            fetched, failed = self.generator.fetch_all(sources, executor=self._executor, consistent=True)
+            for name in sources:
+                data[name] = fetched[name]
+                errors.pop(name, None)
+            errors.update(failed)
+            after = self.poll()
+            pending = {alias for alias in after if after[alias] != before.get(alias)}
+            if not pending:
+                break
+            print(f"Data changed while fetching ({', '.join(sorted(pending))}), fetching again")
+        else:
+            # The versions are left as they were, so the next poll fetches these databases again
+            print(f"Warning: {', '.join(sorted(pending))} still changing after {WATCH_RETRIES} fetches; "
+                  f"keeping the last report")
+            return None
+        self.data, self.errors = data, errors
+        self.versions = after
+        
+        report = self.generator.build_report(self.data, self.errors)
+        with self._lock:
+            self.report = report
+            self.updated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for fmt in self.formats:
+            if fmt == 'console':
+                self.generator.generate_report(report)
+            else:
+                getattr(self.generator, RENDERERS[fmt])(report=report)
+        return report
+    
+    def reconnect(self):
+        """Reopen every connection, after the ETL replaced a database file"""
+        self._executor.shutdown(wait=True)
+        self.generator.close()
+        self._probe.close()
+        self._probe = self.generator.connect()
+        self._executor = ThreadPoolExecutor(max_workers=len(self.sources))
+    
+    def serve(self, host=WATCH_HOST, port=WATCH_PORT):
+        """Serve GET /report (the model as JSON) and GET /status in a background thread"""
+        watcher = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0].rstrip('/')
+                with watcher._lock:
+                    report, updated_at = watcher.report, watcher.updated_at
+                if path in ('', '/report', '/report.json'):
+                    if report is None:
+                        return self._send(503, {'error': "report not built yet"})
+                    return self._send(200, report)
+                if path == '/status':
+                    return self._send(200, {'date': report and report['date'], 'updated_at': updated_at,
+                                            'unavailable': report and report['unavailable']})
+                self._send(404, {'error': f"unknown path {self.path}"})
             
-            outright_vol = today_trans[today_trans['trans_type'].isin(outright_types)]['total_volume'].sum() / 1e12
-            repo_vol = today_trans[today_trans['trans_type'].isin(repo_types)]['total_volume'].sum() / 1e12
+            def _send(self, status, body):
+                payload = render_json(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
             
-            print("• Transaksi Perdagangan Harian:")
-            print(f"  - Transaksi Outright: Rp{outright_vol:.2f} T")
-            print(f"  - Transaksi Repo: Rp{repo_vol:.2f} T")
+            def log_message(self, format, *args):
+                pass
         
-        print("\n")
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Serving the report model on http://{host}:{server.server_address[1]}/report")
+        return server
+    
+    def run(self, host=WATCH_HOST, port=WATCH_PORT):
+        """Build the report, then poll and refresh until interrupted"""
+        server = self.serve(host, port)
+        try:
+            if self.refresh():
+                print(f"Report for {self.report['date']} ready, watching for new data every {self.interval}s")
+            while True:
+                time.sleep(self.interval)
+                current = self.poll()
+                changed = {alias for alias in current if current[alias] != self.versions.get(alias)}
+                if not changed:
+                    continue
+                replaced = {alias for alias in changed
+                            if current[alias] and self.versions.get(alias)
+                            and current[alias][1] != self.versions[alias][1]}
+                if replaced:
+                    self.reconnect()
+                started = time.monotonic()
+                report = self.refresh(changed)
+                if report is None:
+                    continue
+                print(f"{datetime.now():%H:%M:%S} {', '.join(sorted(changed))} changed; "
+                      f"report for {report['date']} rebuilt in {time.monotonic() - started:.2f}s")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            self.close()
+    
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._probe.close()
+        self.generator.close()
+
+
+# ======================== MAINTENANCE ========================
+
+def explain_report_queries(db):
+    """Return {source: [(query, plan lines)]} for every report getter without running them"""
+    generator = MarketReportGenerator(db)
+    plans = {}
+    for name, (getter, schema, _) in generator.sources().items():
+        db.plans = []
+        try:
+            getattr(generator, getter)()
+        except sqlite3.Error as e:
+            db.plans.append((None, [f"unavailable: {e}"]))
+        except Exception:
+            pass  # post-processing of the empty explain result; plans are already recorded
+        finally:
+            plans[name] = db.plans
+            db.plans = None
+    return plans
+
+
+def _print_plans(title, plans):
+    print(title)
+    print("-" * 80)
+    for name, queries in plans.items():
+        print(f"[{name}]")
+        for _, plan in queries:
+            for line in plan:
+                print(f"  {line}")
+    print()
+
+
+def _refresh_date_catalog(db, schema):
+    """Add the trading dates of a raw table from its catalog's high-water mark on
+    
+    The latest cataloged date is re-read as well, as it may have been loaded
+    partially; an empty catalog is filled from the whole table. Returns the
+    number of dates in the catalog.
+    """
+    table, column, catalog = DATE_CATALOGS[schema]
+    with db.conn:
+        db.conn.execute(f"CREATE TABLE IF NOT EXISTS {schema}.{catalog} (tanggal TEXT PRIMARY KEY) WITHOUT ROWID")
+        since = db.conn.execute(f"SELECT MAX(tanggal) FROM {schema}.{catalog}").fetchone()[0] or ''
+        db.conn.execute(
+            f"INSERT OR IGNORE INTO {schema}.{catalog} (tanggal) "
+            f"SELECT DISTINCT {column} FROM {schema}.{table} WHERE {column} >= ?", (since,)
+        )
+    return db.conn.execute(f"SELECT COUNT(*) FROM {schema}.{catalog}").fetchone()[0]
+
+
+def bootstrap_indexes(databases=None):
+    """Create covering indexes and trading-date catalogs in the AKP databases
+    
+    Only tables and columns that actually exist are indexed. The query plans
+    of the report getters are printed before and after, so the effect of each
+    index is visible. Opens the database files read-write.
+    """
+    with AKPConnection(databases, read_only=False) as db:
+        for alias, reason in db.unavailable.items():
+            print(f"Skipping {alias}: {reason}")
         
-        # ======================== BENCHMARK YIELDS ========================
-        if benchmark_df is not None and len(benchmark_df) > 0:
-            print("Yield SUN Seri Benchmark")
-            print("-" * 80)
-            
-            dates = benchmark_df['date'].unique()
-            if len(dates) >= 2:
-                today_bench = benchmark_df[benchmark_df['date'] == dates[0]]
-                yesterday_bench = benchmark_df[benchmark_df['date'] == dates[1]]
-                
-                print(f"{'Seri':<10} {'Yield Hari Ini':>15} {'Yield Kemarin':>15} {'Perubahan (bps)':>18}")
-                print("-" * 80)
-                
-                for _, row_today in today_bench.iterrows():
-                    security = row_today['security']
-                    yield_today = row_today['yield']
-                    
-                    # Find matching yesterday data
-                    yesterday_row = yesterday_bench[yesterday_bench['security'] == security]
-                    if not yesterday_row.empty:
-                        yield_yesterday = yesterday_row.iloc[0]['yield']
-                        change_bps = (yield_today - yield_yesterday) * 100
-                        
-                        print(f"{security:<10} {yield_today:>14.4f}% {yield_yesterday:>14.4f}% {change_bps:>17.2f}")
-                
-                print()
+        _print_plans("Query plans before bootstrap", explain_report_queries(db))
         
-        print()
+        for schema, name, table, columns in INDEXES:
+            if schema in db.unavailable or not db.has_table(schema, table):
+                print(f"Skipping index {schema}.{name}: table {table} not found")
+                continue
+            existing = {row[1] for row in db.execute(f'PRAGMA {schema}.table_info("{table}")')}
+            missing = [column for column in columns if column not in existing]
+            if missing:
+                print(f"Skipping index {schema}.{name}: {table} has no column {', '.join(missing)}")
+                continue
+            column_list = ", ".join(f'"{column}"' for column in columns)
+            db.conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.{name} ON "{table}" ({column_list})')
+            print(f"Index {schema}.{name} on {table}({', '.join(columns)})")
         
-        # ======================== HEADLINES PASAR INTERNASIONAL ========================
-        print("Headlines Pasar Internasional")
-        print("-" * 80)
+        for schema, (table, column, catalog) in DATE_CATALOGS.items():
+            if schema in db.unavailable or not db.has_table(schema, table):
+                print(f"Skipping catalog {schema}.{catalog}: table {table} not found")
+                continue
+            # Triggers of earlier bootstraps cost every ETL insert; the catalog is refreshed instead
+            for event in ('insert', 'update', 'delete'):
+                db.conn.execute(f"DROP TRIGGER IF EXISTS {schema}.trg_{catalog}_{event}")
+            count = _refresh_date_catalog(db, schema)
+            print(f"Catalog {schema}.{catalog}: {count} trading dates")
         
-        # US Treasury yields
-        if ust_df is not None and len(ust_df) >= 2:
-            indo_yield_today = ust_df.iloc[0]['Indonesia']
-            indo_yield_yesterday = ust_df.iloc[1]['Indonesia']
-            indo_change = (indo_yield_today - indo_yield_yesterday) * 100  # to bps
+        for alias in db.databases:
+            if alias not in db.unavailable:
+                db.conn.execute(f"PRAGMA {alias}.optimize")
+        db.conn.commit()
+    
+    # Reconnect so the getters pick up the new catalogs
+    with AKPConnection(databases) as db:
+        print()
+        _print_plans("Query plans after bootstrap", explain_report_queries(db))
+
+
+@functools.lru_cache(maxsize=None)
+def _aggregate_columns(name):
+    """Column names declared by an aggregate's CREATE TABLE statement"""
+    spec = AGGREGATES[name]
+    scratch = sqlite3.connect(':memory:')
+    try:
+        scratch.executescript(spec['create'].format(schema='main'))
+        table = scratch.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchone()[0]
+        return [row[1] for row in scratch.execute(f"PRAGMA table_info({table})")]
+    finally:
+        scratch.close()
+
+
+def refresh_aggregates(databases=None):
+    """Bring the daily aggregate tables up to date with their raw tables
+    
+    Only dates from the stored high-water mark onwards are recomputed, so a
+    refresh costs one or two trading days of raw rows regardless of history.
+    Opens the database files read-write.
+    """
+    with AKPConnection(databases, read_only=False) as db:
+        for name, spec in AGGREGATES.items():
+            schema, table, column = spec['schema'], spec['table'], spec['column']
+            if schema in db.unavailable or not db.has_table(schema, table):
+                print(f"Skipping aggregate {schema}.{name}: table {table} not found")
+                continue
             
-            ust_yield_today = ust_df.iloc[0]['USA']
-            ust_yield_yesterday = ust_df.iloc[1]['USA']
-            ust_change = (ust_yield_today - ust_yield_yesterday) * 100
+            # Rebuild from scratch when the table predates a column change
+            if db.has_table(schema, name) and db.has_table(schema, AGGREGATE_LOG):
+                columns = [row[1] for row in db.execute(f"PRAGMA {schema}.table_info({name})")]
+                expected = _aggregate_columns(name)
+                if columns != expected:
+                    print(f"Aggregate {schema}.{name}: columns changed, rebuilding")
+                    db.conn.execute(f"DROP TABLE {schema}.{name}")
+                    db.conn.execute(f"DELETE FROM {schema}.{AGGREGATE_LOG} WHERE aggregate = ?", (name,))
+                    db.conn.commit()
             
-            # Calculate spread
-            spread_today = (indo_yield_today - ust_yield_today) * 100  # in bps
-            spread_yesterday = (indo_yield_yesterday - ust_yield_yesterday) * 100
-            spread_change = spread_today - spread_yesterday
+            db.conn.executescript(spec['create'].format(schema=schema) + f"""
+                CREATE TABLE IF NOT EXISTS {schema}.{AGGREGATE_LOG} (
+                    aggregate TEXT PRIMARY KEY,
+                    high_water_mark TEXT,
+                    high_water_rows INTEGER,
+                    refreshed_at TEXT
+                );
+            """)
+            row = db.conn.execute(
+                f"SELECT high_water_mark FROM {schema}.{AGGREGATE_LOG} WHERE aggregate = ?", (name,)
+            ).fetchone()
+            since = row[0] if row and row[0] is not None else ''
             
-            indo_trend = "naik" if indo_change > 0 else "turun"
-            ust_trend = "naik" if ust_change > 0 else "turun"
+            started = time.monotonic()
+            with db.conn:
+                db.conn.execute(f"DELETE FROM {schema}.{name} WHERE tanggal >= ?", (since,))
+                inserted = db.conn.execute(spec['refresh'].format(schema=schema), (since,)).rowcount
+                latest = db.conn.execute(f"SELECT MAX({column}) FROM {schema}.{table}").fetchone()[0]
+                latest_rows = db.conn.execute(
+                    f"SELECT COUNT(*) FROM {schema}.{table} WHERE {column} = ?", (latest,)
+                ).fetchone()[0]
+                db.conn.execute(
+                    f"INSERT OR REPLACE INTO {schema}.{AGGREGATE_LOG} VALUES (?, ?, ?, ?)",
+                    (name, latest, latest_rows, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                )
+            print(f"Aggregate {schema}.{name}: {inserted} rows from {since or 'the beginning'} "
+                  f"to {latest} in {time.monotonic() - started:.2f}s")
+        
+        for schema, (table, column, catalog) in DATE_CATALOGS.items():
+            if schema in db.unavailable or not db.has_table(schema, catalog):
+                continue  # created by --bootstrap-indexes
+            print(f"Catalog {schema}.{catalog}: {_refresh_date_catalog(db, schema)} trading dates")
+
+
+def _require_pyarrow():
+    """Import pyarrow on first use; only the columnar snapshot needs it"""
+    global pa, ds
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.dataset
+            import pyarrow.fs
+            import pyarrow.ipc
+        except ImportError:
+            raise RuntimeError("pyarrow is required for the columnar snapshot (pip install pyarrow)") from None
+        pa, ds = pyarrow, pyarrow.dataset
+
+
+def _snapshot_type(storage_classes):
+    """Arrow type for a column from the SQLite storage classes found in it"""
+    classes = set(storage_classes) - {'null'}
+    if classes == {'integer'}:
+        return 'int64'
+    if classes and classes <= {'integer', 'real'}:
+        return 'float64'
+    return 'string'
+
+
+def _snapshot_month_after(month):
+    year, number = map(int, month.split('-'))
+    return f"{year + number // 12:04d}-{number % 12 + 1:02d}"
+
+
+def export_snapshot(databases=None, directory=SNAPSHOT_DIR):
+    """Export the SNAPSHOT_TABLES to month-partitioned Arrow IPC files
+    
+    Incremental: the manifest of each table records the latest exported date
+    and its row count, and only the month holding that date (which may have
+    received more rows) and later months are written again. Rows are streamed
+    in STREAM_CHUNK_SIZE record batches, so memory does not grow with a
+    partition's size. A column layout change re-exports the whole table.
+    """
+    _require_pyarrow()
+    directory = Path(directory)
+    with AKPConnection(databases) as db:
+        for name, (schema, table, column) in SNAPSHOT_TABLES.items():
+            if not db.has_table(schema, table):
+                print(f"Skipping snapshot {name}: table {schema}.{table} not found")
+                continue
+            target = directory / name
+            manifest_path = target / SNAPSHOT_MANIFEST
+            manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
             
-            print(f"• Yield Global Bonds Indonesia (SUN Valas) 10Y bergerak {indo_trend} {abs(indo_change):.1f} bps ke {indo_yield_today:.3f}%.")
-            print(f"  Yield US Treasury 10Y bergerak {ust_trend} {abs(ust_change):.1f} bps ke {ust_yield_today:.3f}%.")
-            print(f"  Spread Indonesia terhadap UST 10Y: {spread_today:.0f} bps ({spread_change:+.0f} bps dari hari sebelumnya).")
-        
-        # CDS data
-        if cds_df is not None and len(cds_df) >= 1:
-            print(f"\n• Credit Risk Indonesia (CDS):")
-            for i, row in cds_df.iterrows():
-                print(f"  - {row['tenor']}: {row['price']:.2f} bps")
-        
-        # NDF data
-        if ndf_df is not None and len(ndf_df) >= 2:
-            ndf_1m_today = ndf_df.iloc[0]['IHN_1M_Curncy']
-            ndf_1m_yesterday = ndf_df.iloc[1]['IHN_1M_Curncy']
-            ndf_6m_today = ndf_df.iloc[0]['IHN_6M_Curncy']
-            ndf_12m_today = ndf_df.iloc[0]['IHN_12M_Curncy']
+            columns = [row[1] for row in db.execute(f'PRAGMA {schema}.table_info("{table}")')]
+            if manifest.get('columns') != columns:
+                if manifest:
+                    print(f"Snapshot {name}: columns changed, re-exporting")
+                shutil.rmtree(target, ignore_errors=True)
+                manifest = {}
             
-            ndf_1m_change = ndf_1m_today - ndf_1m_yesterday
-            trend = "naik" if ndf_1m_change > 0 else "turun"
+            latest, latest_rows = db.execute(f"""
+                SELECT {column}, COUNT(*) FROM {schema}."{table}"
+                WHERE {column} = (SELECT MAX({column}) FROM {schema}."{table}")
+            """)[0]
+            if latest is None or [latest, latest_rows] == [manifest.get('high_water_mark'),
+                                                          manifest.get('high_water_rows')]:
+                print(f"Snapshot {name}: up to date")
+                continue
+            since = (manifest.get('high_water_mark') or '')[:7]
             
-            print(f"\n• Nilai NDF bergerak {trend} pada hari ini:")
-            print(f"  - NDF 1M: {ndf_1m_today:,.0f} ({ndf_1m_change:+.0f} poin)")
-            print(f"  - NDF 6M: {ndf_6m_today:,.0f}")
-            print(f"  - NDF 12M: {ndf_12m_today:,.0f}")
-        
-        # Global stock indices
-        if stocks_df is not None and len(stocks_df) >= 2:
-            print(f"\n• Indeks Saham Global (perubahan hari ini):")
-            indices = {
-                'USA': 'S&P 500',
-                'Japan': 'Nikkei',
-                'Hongkong': 'Hang Seng',
-                'Shanghai': 'Shanghai',
-                'German': 'DAX'
-            }
+            if 'types' not in manifest:
+                # One pass over the new rows decides each column's Arrow type;
+                # it is then fixed for every later partition
+                classes = db.execute(f"""
+                    SELECT {', '.join(f'GROUP_CONCAT(DISTINCT typeof("{c}"))' for c in columns)}
+                    FROM {schema}."{table}" WHERE {column} >= ?
+                """, (since,))[0]
+                manifest['types'] = [_snapshot_type((found or '').split(',')) for found in classes]
+            arrow_schema = pa.schema([(c, getattr(pa, t)()) for c, t in zip(columns, manifest['types'])])
             
-            for key, label in indices.items():
-                if key in stocks_df.columns:
-                    today_val = stocks_df.iloc[0][key]
-                    yesterday_val = stocks_df.iloc[1][key]
-                    change = today_val - yesterday_val
-                    pct_change = (change / yesterday_val) * 100
-                    trend = "naik" if change > 0 else "turun"
-                    print(f"  - {label}: {trend} {abs(pct_change):.2f}% ke {today_val:,.2f}")
-        
-        # Commodity prices
-        if commodity_df is not None and len(commodity_df) >= 1:
-            icp = commodity_df.iloc[0]['ICP']
-            palm_oil = commodity_df.iloc[0]['PALM_OIL']
-            wti = commodity_df.iloc[0]['WTI']
+            started = time.monotonic()
+            months = [row[0] for row in db.execute(
+                f'SELECT DISTINCT substr({column}, 1, 7) FROM {schema}."{table}" WHERE {column} >= ? ORDER BY 1',
+                (since,)
+            )]
+            exported = 0
+            for month in months:
+                partition = target / f"month={month}"
+                partition.mkdir(parents=True, exist_ok=True)
+                tmp = partition / ".part-0.arrow.tmp"
+                query = f"""
+                SELECT {', '.join(f'"{c}"' for c in columns)} FROM {schema}."{table}"
+                WHERE {column} >= ? AND {column} < ?
+                ORDER BY {column}
+                """
+                with pa.ipc.new_file(str(tmp), arrow_schema) as writer:
+                    for rows in db.iterate(query, (month, _snapshot_month_after(month))):
+                        arrays = [
+                            pa.array([None if v is None else str(v) for v in values], type=field.type)
+                            if field.type == pa.string() else pa.array(values, type=field.type)
+                            for field, values in zip(arrow_schema, zip(*rows))
+                        ]
+                        writer.write_batch(pa.record_batch(arrays, schema=arrow_schema))
+                        exported += len(rows)
+                os.replace(tmp, partition / "part-0.arrow")
             
-            print(f"\n• Harga Komoditas:")
-            print(f"  - Minyak Mentah ICP: US${icp:.2f} per barel")
-            print(f"  - Minyak Mentah WTI: US${wti:.2f} per barel")
-            print(f"  - Minyak Sawit: US${palm_oil:.2f} per metric ton")
-        
-        print("\n" + "=" * 80)
-        print(f"Report generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("=" * 80 + "\n")
+            manifest.update(columns=columns, high_water_mark=latest, high_water_rows=latest_rows,
+                            exported_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            manifest_path.write_text(json.dumps(manifest, indent=2))
+            print(f"Snapshot {name}: {exported} rows in {len(months)} partitions from "
+                  f"{months[0]} to {months[-1]} in {time.monotonic() - started:.2f}s")
+
+
+def read_snapshot(name, columns=None, start=None, end=None, latest=None, directory=SNAPSHOT_DIR):
+    """Read a snapshot table as a pyarrow Table
     
-    def export_to_text(self, filename=None):
-        """Export report to text file"""
-        if filename is None:
-            filename = f"Market_Update_{datetime.now().strftime('%Y%m%d')}.txt"
-        
-        # Redirect print to file
-        filepath = Path(__file__).parent / filename
-        with open(filepath, 'w', encoding='utf-8') as f:
-            # Capture report content
-            sys.stdout = f
-            self.generate_report()
-            sys.stdout = sys.__stdout__
-        
-        print(f"Report exported to: {filepath}")
-        return filepath
+    Only the requested columns and the partitions overlapping [start, end]
+    (or the `latest` N partitions) are read; the files are memory-mapped, so
+    multi-year histories load without copying. Call .to_pandas() on the
+    result for a DataFrame.
+    """
+    return scan_snapshot(name, columns, start, end, latest, directory).to_table()
+
+
+def scan_snapshot(name, columns=None, start=None, end=None, latest=None, directory=SNAPSHOT_DIR):
+    """Scanner over a snapshot table, yielding STREAM_CHUNK_SIZE record batches (see read_snapshot())"""
+    _require_pyarrow()
+    _, _, column = SNAPSHOT_TABLES[name]
+    target = Path(directory) / name
+    manifest_path = target / SNAPSHOT_MANIFEST
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"No snapshot of {name} in {directory}; run --snapshot first")
+    manifest = json.loads(manifest_path.read_text())
+    
+    dataset = ds.dataset(
+        str(target), format='ipc',
+        partitioning=ds.partitioning(pa.schema([('month', pa.string())]), flavor='hive'),
+        filesystem=pa.fs.LocalFileSystem(use_mmap=True)
+    )
+    conditions = []
+    if latest:
+        months = sorted(p.name.split('=', 1)[1] for p in target.glob('month=*'))
+        conditions.append(ds.field('month') >= months[-latest:][0])
+    if start is not None:
+        conditions.append(ds.field('month') >= str(start)[:7])
+        conditions.append(ds.field(column) >= str(start))
+    if end is not None:
+        conditions.append(ds.field('month') <= str(end)[:7])
+        conditions.append(ds.field(column) <= str(end))
+    condition = functools.reduce(lambda a, b: a & b, conditions) if conditions else None
+    return dataset.scanner(columns=columns or manifest['columns'], filter=condition, batch_size=STREAM_CHUNK_SIZE)
+
+
+# ======================== RENDERERS ========================
+
+BULAN = ['Januari', 'Februari', 'Maret', 'April', 'Mei', 'Juni', 'Juli',
+         'Agustus', 'September', 'Oktober', 'November', 'Desember']
+
+
+# Report section -> sources feeding it, used to flag unavailable data
+SECTION_SOURCES = {
+    'sun': ['plte', 'fx', 'ownership', 'transactions'],
+    'sbsn': ['plte'],
+    'international': ['ust', 'cds', 'ndf', 'stocks', 'commodities']
+}
+
+SOURCE_LABELS = {
+    'plte': 'Perdagangan SBN (PLTE)',
+    'plte_flags': 'Transaksi PLTE',
+    'ownership': 'Kepemilikan SBN',
+    'transactions': 'Transaksi harian',
+    'fx': 'Kurs IDR',
+    'ust': 'Yield 10Y',
+    'cds': 'CDS',
+    'ndf': 'NDF',
+    'stocks': 'Indeks saham',
+    'commodities': 'Harga komoditas'
+}
+
+
+def _remaining_years(maturities, date):
+    """Years from date to each maturity (NaN when unparseable)"""
+    start = _parse_date(date)
+    years = []
+    for maturity in maturities:
+        try:
+            years.append((_parse_date(maturity) - start).days / 365.25)
+        except ValueError:
+            years.append(float('nan'))
+    return years
+
+
+def _to_native(value):
+    """Convert numpy/pandas scalars inside nested dicts/lists to plain Python values"""
+    if isinstance(value, dict):
+        return {key: _to_native(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_native(item) for item in value]
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+def _parse_date(value):
+    """Parse a database date ('YYYY-MM-DD' with optional time part)"""
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d')
+
+
+def _tanggal(value):
+    """Format a date in Indonesian, e.g. '5 Februari 2026'"""
+    date = _parse_date(value)
+    return f"{date.day} {BULAN[date.month - 1]} {date.year}"
+
+
+def _angka(value, decimals=2):
+    """Format a number in Indonesian notation (period thousands, comma decimals)"""
+    text = f"{value:,.{decimals}f}"
+    return text.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def _perubahan(value):
+    """Format a change in Rp trillion with its sign, e.g. 'Rp+1.25 T' ('n/a' when unknown)"""
+    return 'n/a' if value is None else f"Rp{value/1e12:+.2f} T"
+
+
+def _persen(level, change):
+    """Change as a percentage of the level before it"""
+    base = level - change
+    return change / base * 100 if base else 0.0
+
+
+def render_text(report):
+    """Render the report model as the plain-text console/.txt layout"""
+    lines = []
+    lines.append("\n" + "="*80)
+    lines.append("DIREKTORAT JENDERAL PENGELOLAAN PEMBIAYAAN DAN RISIKO")
+    lines.append("KEMENTERIAN KEUANGAN RI")
+    lines.append("="*80)
+    
+    if report['date'] is None:
+        lines.append("No data available")
+        for section in SECTION_SOURCES:
+            for item in _unavailable(report, section):
+                lines.append(f"  - {item}")
+        return "\n".join(lines) + "\n"
+    
+    lines.append(f"\n{report['date']}\n")
+    lines.append("SBN Daily Market Update\n")
+    
+    for section in report.get('sections', SECTION_SOURCES):
+        TEXT_SECTIONS[section](lines, report)
+    
+    notes = _quality_notes(report)
+    if notes:
+        lines.append("\nCatatan Kualitas Data")
+        lines.append("-" * 80)
+        for note in notes:
+            lines.append(f"• {note}")
+    
+    lines.append("\n" + "=" * 80)
+    lines.append(f"Report generated: {report['generated_at']}")
+    lines.append("=" * 80 + "\n")
+    return "\n".join(lines) + "\n"
+
+
+def _text_sun(lines, report):
+    """Append the SUN headlines, benchmark yields and curve to the plain-text layout"""
+    sun = report['sun']
+    intl = report['international']
+    
+    # ======================== HEADLINES PASAR SUN ========================
+    lines.append("Headlines Pasar SUN")
+    lines.append("-" * 80)
+    
+    yield_changes = sun['yield']
+    if yield_changes:
+        lines.append("• Pasar SUN bergerak " + yield_changes['trend'] +
+                     f". Berdasarkan yield rata-rata, yield SUN " +
+                     f"bergerak {yield_changes['trend']} sebesar {abs(yield_changes['change_bps']):.1f} bps" +
+                     f" dibandingkan hari kemarin (dari {yield_changes['yesterday_yield']:.4f}% menjadi {yield_changes['today_yield']:.4f}%).")
+    
+    fx = sun['fx']
+    if fx and fx['change'] is None:
+        lines.append(f"  Nilai tukar Rupiah di level Rp{fx['usd']:,.0f}/US$ ({STALE_TEXT}).")
+    elif fx:
+        lines.append(f"  Nilai tukar Rupiah {fx['trend']} sebesar {abs(fx['change']):.2f} poin ke level Rp{fx['usd']:,.0f}/US$.")
+    
+    ihsg = _index(intl['stocks'], 'Indonesia')
+    if ihsg and ihsg['change'] is None:
+        lines.append(f"  Indeks IHSG di level {ihsg['value']:,.2f} ({STALE_TEXT}).")
+    elif ihsg:
+        lines.append(f"  Indeks IHSG {ihsg['trend']} sebesar {abs(ihsg['change']):.2f} poin ({ihsg['pct_change']:.2f}%) ke level {ihsg['value']:,.2f}.")
+    
+    lines.append("")
+    
+    ownership = sun['ownership']
+    if ownership:
+        lines.append("• Kepemilikan SBN per " + str(ownership['date']) + ":")
+        lines.append(f"  - Investor Domestik Individu: Rp{ownership['domestic_individual']/1e12:.2f} T")
+        lines.append(f"  - Investor Domestik Korporat: Rp{ownership['domestic_company']/1e12:.2f} T")
+        lines.append(f"  - Non Resident: Rp{ownership['non_resident']/1e12:.2f} T")
+        lines.append(f"  - Total Kepemilikan: Rp{ownership['total']/1e12:.2f} T")
+        for period, label in (('day', 'harian'), ('mtd', 'mtd'), ('ytd', 'ytd')):
+            changes = ownership['changes'][period]
+            lines.append(f"  - Perubahan {label}: individu {_perubahan(changes['domestic_individual'])}, "
+                         f"korporat {_perubahan(changes['domestic_company'])}, "
+                         f"non resident {_perubahan(changes['non_resident'])}")
+    
+    lines.append("")
+    
+    transactions = sun['transactions']
+    if transactions:
+        lines.append("• Transaksi Perdagangan Harian:")
+        lines.append(f"  - Transaksi Outright: Rp{transactions['outright_volume']/1e12:.2f} T")
+        lines.append(f"  - Transaksi Repo: Rp{transactions['repo_volume']/1e12:.2f} T")
+        mtd = transactions['mtd']
+        lines.append(f"  - Rata-rata harian mtd ({mtd['days']} hari): outright Rp{mtd['outright_volume']/mtd['days']/1e12:.2f} T, "
+                     f"repo Rp{mtd['repo_volume']/mtd['days']/1e12:.2f} T")
+    
+    unavailable = _unavailable(report, 'sun')
+    if unavailable and transactions:
+        lines.append("")
+    for item in unavailable:
+        lines.append(f"• Data tidak tersedia: {item}")
+    
+    lines.append("\n")
+    
+    # ======================== BENCHMARK YIELDS ========================
+    _benchmark_table(lines, "Yield SUN Seri Benchmark", report['benchmarks'])
+    _curve_table(lines, "Kurva Yield SUN", report['curves'].get('SUN'))
+    
+    lines.append("")
+
+
+def _text_sbsn(lines, report):
+    """Append the SBSN headlines, benchmark yields and curve to the plain-text layout"""
+    # ======================== HEADLINES PASAR SBSN ========================
+    sbsn = report['sbsn']
+    lines.append("Headlines Pasar SBSN")
+    lines.append("-" * 80)
+    
+    yield_changes = sbsn.get('yield')
+    if yield_changes:
+        lines.append("• Pasar SBSN bergerak " + yield_changes['trend'] +
+                     f". Berdasarkan yield rata-rata, yield SBSN " +
+                     f"bergerak {yield_changes['trend']} sebesar {abs(yield_changes['change_bps']):.1f} bps" +
+                     f" dibandingkan hari kemarin (dari {yield_changes['yesterday_yield']:.4f}% menjadi {yield_changes['today_yield']:.4f}%).")
+    
+    benchmark_range = _benchmark_range(sbsn.get('benchmarks'))
+    if benchmark_range:
+        trend, low, high = benchmark_range
+        lines.append(f"  Yield SBSN seri benchmark bergerak {trend} dalam range {low:.2f} s.d. {high:.2f} bps.")
+    
+    trading = sbsn.get('trading')
+    if trading and trading['trades']:
+        lines.append(f"  Perdagangan SBSN: Rp{trading['volume']/1e12:.2f} T ({trading['trades']:,} transaksi).")
+    
+    unavailable = _unavailable(report, 'sbsn')
+    for item in unavailable:
+        lines.append(f"• Data tidak tersedia: {item}")
+    
+    lines.append("")
+    _benchmark_table(lines, "Yield SBSN Seri Benchmark", sbsn.get('benchmarks'))
+    _curve_table(lines, "Kurva Yield SBSN", report['curves'].get('SBSN'))
+    
+    lines.append("")
+
+
+def _text_international(lines, report):
+    """Append the international market headlines to the plain-text layout"""
+    intl = report['international']
+    
+    # ======================== HEADLINES PASAR INTERNASIONAL ========================
+    lines.append("Headlines Pasar Internasional")
+    lines.append("-" * 80)
+    
+    ust = intl['ust']
+    if ust:
+        if ust['indo_change_bps'] is None:
+            lines.append(f"• Yield Global Bonds Indonesia (SUN Valas) 10Y di {ust['indo_yield']:.3f}% ({STALE_TEXT}).")
+        else:
+            lines.append(f"• Yield Global Bonds Indonesia (SUN Valas) 10Y bergerak {ust['indo_trend']} {abs(ust['indo_change_bps']):.1f} bps ke {ust['indo_yield']:.3f}%.")
+        if ust['ust_change_bps'] is None:
+            lines.append(f"  Yield US Treasury 10Y di {ust['ust_yield']:.3f}% ({STALE_TEXT}).")
+        else:
+            lines.append(f"  Yield US Treasury 10Y bergerak {ust['ust_trend']} {abs(ust['ust_change_bps']):.1f} bps ke {ust['ust_yield']:.3f}%.")
+        if ust['spread_change_bps'] is None:
+            lines.append(f"  Spread Indonesia terhadap UST 10Y: {ust['spread_bps']:.0f} bps.")
+        else:
+            lines.append(f"  Spread Indonesia terhadap UST 10Y: {ust['spread_bps']:.0f} bps ({ust['spread_change_bps']:+.0f} bps dari hari sebelumnya).")
+    
+    cds = intl['cds']
+    if cds:
+        lines.append(f"\n• Credit Risk Indonesia (CDS):")
+        for row in cds['tenors']:
+            lines.append(f"  - {row['tenor']}: {row['price']:.2f} bps")
+    
+    ndf = intl['ndf']
+    if ndf and ndf['ndf_1m_change'] is None:
+        lines.append(f"\n• Nilai NDF pada hari ini:")
+        lines.append(f"  - NDF 1M: {ndf['ndf_1m']:,.0f} ({STALE_TEXT})")
+    elif ndf:
+        lines.append(f"\n• Nilai NDF bergerak {ndf['trend']} pada hari ini:")
+        lines.append(f"  - NDF 1M: {ndf['ndf_1m']:,.0f} ({ndf['ndf_1m_change']:+.0f} poin)")
+    if ndf:
+        lines.append(f"  - NDF 6M: {ndf['ndf_6m']:,.0f}")
+        lines.append(f"  - NDF 12M: {ndf['ndf_12m']:,.0f}")
+    
+    stocks = intl['stocks']
+    if stocks:
+        lines.append(f"\n• Indeks Saham Global (perubahan hari ini):")
+        for index in stocks['indices']:
+            if index['key'] != 'Indonesia' and index['change'] is None:
+                lines.append(f"  - {index['label']}: {index['value']:,.2f} ({STALE_TEXT})")
+            elif index['key'] != 'Indonesia':
+                lines.append(f"  - {index['label']}: {index['trend']} {abs(index['pct_change']):.2f}% ke {index['value']:,.2f}")
+    
+    commodities = intl['commodities']
+    if commodities:
+        lines.append(f"\n• Harga Komoditas:")
+        lines.append(f"  - Minyak Mentah ICP: US${commodities['icp']:.2f} per barel")
+        lines.append(f"  - Minyak Mentah WTI: US${commodities['wti']:.2f} per barel")
+        lines.append(f"  - Minyak Sawit: US${commodities['palm_oil']:.2f} per metric ton")
+
+
+# Report section -> plain-text section renderer
+TEXT_SECTIONS = {
+    'sun': _text_sun,
+    'sbsn': _text_sbsn,
+    'international': _text_international
+}
+
+
+def render_markdown(report):
+    """Render the report model as Markdown"""
+    lines = ["# SBN Daily Market Update", ""]
+    lines.append("DIREKTORAT JENDERAL PENGELOLAAN PEMBIAYAAN DAN RISIKO  ")
+    lines.append("KEMENTERIAN KEUANGAN RI")
+    lines.append("")
+    
+    if report['date'] is None:
+        lines.append("No data available")
+        return "\n".join(lines) + "\n"
+    
+    lines.append(f"**{report['date']}**")
+    lines.append("")
+    
+    for section in report.get('sections', SECTION_SOURCES):
+        MARKDOWN_SECTIONS[section](lines, report)
+    
+    notes = _quality_notes(report)
+    if notes:
+        lines.append("## Catatan Kualitas Data")
+        lines.append("")
+        for note in notes:
+            lines.append(f"- {note}")
+        lines.append("")
+    
+    lines.append(f"_Report generated: {report['generated_at']}_")
+    return "\n".join(lines) + "\n"
+
+
+def _markdown_sun(lines, report):
+    """Append the SUN headlines, benchmark yields and curve to the Markdown layout"""
+    sun = report['sun']
+    intl = report['international']
+    lines.append("## Headlines Pasar SUN")
+    lines.append("")
+    yield_changes = sun['yield']
+    if yield_changes:
+        lines.append(f"- Yield SUN rata-rata bergerak {yield_changes['trend']} {abs(yield_changes['change_bps']):.1f} bps "
+                     f"(dari {yield_changes['yesterday_yield']:.4f}% menjadi {yield_changes['today_yield']:.4f}%).")
+    fx = sun['fx']
+    if fx and fx['change'] is None:
+        lines.append(f"- Nilai tukar Rupiah di Rp{fx['usd']:,.0f}/US$ ({STALE_TEXT}).")
+    elif fx:
+        lines.append(f"- Nilai tukar Rupiah {fx['trend']} {abs(fx['change']):.2f} poin ke Rp{fx['usd']:,.0f}/US$.")
+    ihsg = _index(intl['stocks'], 'Indonesia')
+    if ihsg and ihsg['change'] is None:
+        lines.append(f"- IHSG di {ihsg['value']:,.2f} ({STALE_TEXT}).")
+    elif ihsg:
+        lines.append(f"- IHSG {ihsg['trend']} {abs(ihsg['change']):.2f} poin ({ihsg['pct_change']:.2f}%) ke {ihsg['value']:,.2f}.")
+    ownership = sun['ownership']
+    if ownership:
+        lines.append(f"- Kepemilikan SBN per {ownership['date']}: individu Rp{ownership['domestic_individual']/1e12:.2f} T, "
+                     f"korporat Rp{ownership['domestic_company']/1e12:.2f} T, non resident Rp{ownership['non_resident']/1e12:.2f} T "
+                     f"(total Rp{ownership['total']/1e12:.2f} T).")
+        changes = ownership['changes']
+        lines.append(f"- Non resident {_perubahan(changes['day']['non_resident'])} (harian), "
+                     f"{_perubahan(changes['mtd']['non_resident'])} (mtd), {_perubahan(changes['ytd']['non_resident'])} (ytd).")
+    transactions = sun['transactions']
+    if transactions:
+        lines.append(f"- Transaksi harian: outright Rp{transactions['outright_volume']/1e12:.2f} T, "
+                     f"repo Rp{transactions['repo_volume']/1e12:.2f} T.")
+        mtd = transactions['mtd']
+        lines.append(f"- Rata-rata harian mtd ({mtd['days']} hari): outright Rp{mtd['outright_volume']/mtd['days']/1e12:.2f} T, "
+                     f"repo Rp{mtd['repo_volume']/mtd['days']/1e12:.2f} T.")
+    for item in _unavailable(report, 'sun'):
+        lines.append(f"- _Data tidak tersedia: {item}_")
+    lines.append("")
+    
+    _markdown_benchmark_table(lines, "Yield SUN Seri Benchmark", report['benchmarks'])
+    _markdown_curve_table(lines, "Kurva Yield SUN", report['curves'].get('SUN'))
+
+
+def _markdown_sbsn(lines, report):
+    """Append the SBSN headlines, benchmark yields and curve to the Markdown layout"""
+    sbsn = report['sbsn']
+    lines.append("## Headlines Pasar SBSN")
+    lines.append("")
+    yield_changes = sbsn.get('yield')
+    if yield_changes:
+        lines.append(f"- Yield SBSN rata-rata bergerak {yield_changes['trend']} {abs(yield_changes['change_bps']):.1f} bps "
+                     f"(dari {yield_changes['yesterday_yield']:.4f}% menjadi {yield_changes['today_yield']:.4f}%).")
+    benchmark_range = _benchmark_range(sbsn.get('benchmarks'))
+    if benchmark_range:
+        trend, low, high = benchmark_range
+        lines.append(f"- Yield SBSN seri benchmark bergerak {trend} dalam range {low:.2f} s.d. {high:.2f} bps.")
+    trading = sbsn.get('trading')
+    if trading and trading['trades']:
+        lines.append(f"- Perdagangan SBSN: Rp{trading['volume']/1e12:.2f} T ({trading['trades']:,} transaksi).")
+    for item in _unavailable(report, 'sbsn'):
+        lines.append(f"- _Data tidak tersedia: {item}_")
+    lines.append("")
+    
+    _markdown_benchmark_table(lines, "Yield SBSN Seri Benchmark", sbsn.get('benchmarks'))
+    _markdown_curve_table(lines, "Kurva Yield SBSN", report['curves'].get('SBSN'))
+
+
+def _markdown_international(lines, report):
+    """Append the international market headlines to the Markdown layout"""
+    intl = report['international']
+    lines.append("## Headlines Pasar Internasional")
+    lines.append("")
+    ust = intl['ust']
+    if ust:
+        indo = (f"di {ust['indo_yield']:.3f}% ({STALE_TEXT})" if ust['indo_change_bps'] is None else
+                f"{ust['indo_trend']} {abs(ust['indo_change_bps']):.1f} bps ke {ust['indo_yield']:.3f}%")
+        treasury = (f"di {ust['ust_yield']:.3f}% ({STALE_TEXT})" if ust['ust_change_bps'] is None else
+                    f"{ust['ust_trend']} {abs(ust['ust_change_bps']):.1f} bps ke {ust['ust_yield']:.3f}%")
+        spread = "" if ust['spread_change_bps'] is None else f" ({ust['spread_change_bps']:+.0f} bps)"
+        lines.append(f"- Yield SUN Valas 10Y {indo}; UST 10Y {treasury}; spread {ust['spread_bps']:.0f} bps{spread}.")
+    if intl['cds']:
+        levels = ", ".join(f"{row['tenor']} {row['price']:.2f} bps" for row in intl['cds']['tenors'])
+        lines.append(f"- CDS: {levels}.")
+    ndf = intl['ndf']
+    if ndf and ndf['ndf_1m_change'] is None:
+        lines.append(f"- NDF: 1M {ndf['ndf_1m']:,.0f} ({STALE_TEXT}), 6M {ndf['ndf_6m']:,.0f}, 12M {ndf['ndf_12m']:,.0f}.")
+    elif ndf:
+        lines.append(f"- NDF {ndf['trend']}: 1M {ndf['ndf_1m']:,.0f} ({ndf['ndf_1m_change']:+.0f} poin), "
+                     f"6M {ndf['ndf_6m']:,.0f}, 12M {ndf['ndf_12m']:,.0f}.")
+    if intl['stocks']:
+        moves = ", ".join(f"{index['label']} {index['value']:,.2f} ({STALE_TEXT})" if index['change'] is None else
+                          f"{index['label']} {index['trend']} {abs(index['pct_change']):.2f}%"
+                          for index in intl['stocks']['indices'] if index['key'] != 'Indonesia')
+        lines.append(f"- Indeks saham global: {moves}.")
+    commodities = intl['commodities']
+    if commodities:
+        lines.append(f"- Komoditas: ICP US${commodities['icp']:.2f}/barel, WTI US${commodities['wti']:.2f}/barel, "
+                     f"minyak sawit US${commodities['palm_oil']:.2f}/metric ton.")
+    for item in _unavailable(report, 'international'):
+        lines.append(f"- _Data tidak tersedia: {item}_")
+    lines.append("")
+
+
+# Report section -> Markdown section renderer
+MARKDOWN_SECTIONS = {
+    'sun': _markdown_sun,
+    'sbsn': _markdown_sbsn,
+    'international': _markdown_international
+}
+
+
+def render_json(report):
+    """Render the report model as JSON"""
+    return json.dumps(report, indent=2, ensure_ascii=False, default=str) + "\n"
+
+
+def render_summary(report):
+    """Render the report model in the one-page "Market Update - Summary" layout
+    
+    Follows the header, section and number conventions described in
+    WORKFLOW_AUTOMATION.md (Indonesian dates, comma decimals, Rp...T).
+    """
+    lines = [
+        "DIREKTORAT JENDERAL PENGELOLAAN PEMBIAYAAN DAN RISIKO",
+        "KEMENTERIAN KEUANGAN RI",
+        "",
+        _tanggal(report['date']),
+        "",
+        "SBN Daily Market Update",
+        ""
+    ]
+    for section in report.get('sections', SECTION_SOURCES):
+        SUMMARY_SECTIONS[section](lines, report)
+    
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def _summary_sun(lines, report):
+    """Append the SUN market, ownership and transaction bullets to the summary"""
+    sun = report['sun']
+    intl = report['international']
+    
+    # ======================== HEADLINES PASAR SUN ========================
+    lines.append("Headlines Pasar SUN")
+    bullet = []
+    yield_changes = sun['yield']
+    if yield_changes:
+        direction = 'melemah' if yield_changes['change_bps'] > 0 else 'menguat'
+        bullet.append(f"Pasar SUN bergerak {direction}. Berdasarkan data PLTE tanggal {_tanggal(yield_changes['date'])}, "
+                      f"yield SUN rata-rata bergerak {yield_changes['trend']} sebesar {_angka(abs(yield_changes['change_bps']), 1)} bps "
+                      f"apabila dibandingkan hari kemarin (dari {_angka(yield_changes['yesterday_yield'], 4)}% "
+                      f"ke {_angka(yield_changes['today_yield'], 4)}%).")
+    curve = report['curves'].get('SUN')
+    if curve:
+        tenors = _daftar([point['tenor'] for point in curve['points']])
+        changes = _daftar([f"{_angka(point['change_bps'], 1)} bps" for point in curve['points']])
+        bullet.append(f"Berdasarkan kurva yield, yield SUN tenor {tenors} bergerak masing-masing {changes}.")
+    fx = sun['fx']
+    if fx and fx['change'] is None:
+        bullet.append(f"Nilai tukar Rupiah tercatat di level Rp{_angka(fx['usd'], 0)}/US$ ({STALE_TEXT}).")
+    elif fx:
+        penguatan = 'pelemahan' if fx['change'] > 0 else 'penguatan'
+        bullet.append(f"Nilai tukar Rupiah mengalami {penguatan}, di mana hari ini ditutup {fx['trend']} sebesar "
+                      f"{_angka(abs(fx['change']))} poin ({_angka(abs(fx['pct_change']))}%) ke level Rp{_angka(fx['usd'], 0)}/US$.")
+    ihsg = _index(intl['stocks'], 'Indonesia')
+    if ihsg and ihsg['change'] is None:
+        bullet.append(f"Indeks IHSG tercatat di level {_angka(ihsg['value'])} ({STALE_TEXT}).")
+    elif ihsg:
+        movement = 'kenaikan' if ihsg['change'] > 0 else 'penurunan'
+        bullet.append(f"Indeks IHSG mengalami {movement} sebesar {_angka(abs(ihsg['change']))} poin "
+                      f"({_angka(abs(ihsg['pct_change']))}%) ke level {_angka(ihsg['value'])}.")
+    _summary_bullet(lines, bullet)
+    
+    bullet = []
+    ownership = sun['ownership']
+    if ownership:
+        bullet.append(f"Kepemilikan SBN berdasarkan data setelmen BI tanggal {_tanggal(ownership['date'])} tercatat sebesar "
+                      f"Rp{_angka(ownership['total'] / 1e12)} T, terdiri dari Individu Residen Rp{_angka(ownership['domestic_individual'] / 1e12)} T, "
+                      f"Korporasi Residen Rp{_angka(ownership['domestic_company'] / 1e12)} T, dan Non Residen "
+                      f"Rp{_angka(ownership['non_resident'] / 1e12)} T.")
+        non_resident = ownership['non_resident']
+        changes = {period: ownership['changes'][period]['non_resident'] for period in ('day', 'mtd', 'ytd')}
+        if changes['day'] is not None:
+            kenaikan = 'kenaikan' if changes['day'] > 0 else 'penurunan'
+            bullet.append(f"Kepemilikan Non Residen atas SBN mengalami {kenaikan} sebesar "
+                          f"Rp{_angka(abs(changes['day']) / 1e12)} T ({_angka(abs(_persen(non_resident, changes['day'])))}%) "
+                          f"dari Rp{_angka((non_resident - changes['day']) / 1e12)} T ke Rp{_angka(non_resident / 1e12)} T.")
+        periods = [
+            f"{'naik' if change > 0 else 'turun'} Rp{_angka(abs(change) / 1e12)} T "
+            f"({_angka(abs(_persen(non_resident, change)))}%) secara {label}"
+            for change, label in ((changes['ytd'], 'year to date (ytd)'), (changes['mtd'], 'month to date (mtd)'))
+            if change is not None
+        ]
+        if periods:
+            bullet.append(f"Kepemilikan Non Residen {' dan '.join(periods)}.")
+    transactions = sun['transactions']
+    if transactions:
+        bullet.append(f"Transaksi perdagangan harian tanggal {_tanggal(transactions['date'])} adalah sebesar "
+                      f"Rp{_angka(transactions['outright_volume'] / 1e12)} T (outright) dan "
+                      f"Rp{_angka(transactions['repo_volume'] / 1e12)} T (repo).")
+        mtd = transactions['mtd']
+        date = _parse_date(transactions['date'])
+        bullet.append(f"Transaksi rata-rata perdagangan harian bulan {BULAN[date.month - 1]} {date.year} "
+                      f"(s.d. {_tanggal(transactions['date'])}) adalah sebesar "
+                      f"Rp{_angka(mtd['outright_volume'] / mtd['days'] / 1e12)} T (outright) dan "
+                      f"Rp{_angka(mtd['repo_volume'] / mtd['days'] / 1e12)} T (repo).")
+    _summary_bullet(lines, bullet)
+
+
+def _summary_sbsn(lines, report):
+    """Append the SBSN market bullets to the summary"""
+    # ======================== HEADLINES PASAR SBSN ========================
+    lines.append("Headlines Pasar SBSN")
+    sbsn = report['sbsn']
+    bullet = []
+    benchmark_range = _benchmark_range(sbsn.get('benchmarks'))
+    if benchmark_range:
+        trend, low, high = benchmark_range
+        rows = sbsn['benchmarks']['rows']
+        names = _daftar([row['security'] for row in rows])
+        changes = _daftar([f"{_angka(row['change_bps'], 1)} bps" for row in rows])
+        bullet.append(f"Yield SBSN seri benchmark bergerak {trend} dalam range {_angka(low, 1)} s.d. {_angka(high, 1)} bps. "
+                      f"{names} masing-masing bergerak {changes}.")
+    yield_changes = sbsn.get('yield')
+    if yield_changes:
+        bullet.append(f"Berdasarkan data PLTE tanggal {_tanggal(yield_changes['date'])}, yield SBSN rata-rata bergerak "
+                      f"{yield_changes['trend']} sebesar {_angka(abs(yield_changes['change_bps']), 1)} bps "
+                      f"(dari {_angka(yield_changes['yesterday_yield'], 4)}% ke {_angka(yield_changes['today_yield'], 4)}%).")
+    trading = sbsn.get('trading')
+    if trading and trading['trades']:
+        bullet.append(f"Perdagangan SBSN tercatat sebesar Rp{_angka(trading['volume'] / 1e12)} triliun.")
+    _summary_bullet(lines, bullet or ["Data pasar SBSN tidak tersedia pada database AKP."])
+
+
+def _summary_international(lines, report):
+    """Append the international market bullets to the summary"""
+    intl = report['international']
+    
+    # ======================== HEADLINES PASAR INTERNASIONAL ========================
+    lines.append("Headlines Pasar Internasional")
+    bullet = []
+    ust = intl['ust']
+    if ust:
+        for name, key in (('Global Bonds Indonesia (SUN Valas)', 'indo'), ('US Treasury', 'ust')):
+            if ust[f'{key}_change_bps'] is None:
+                bullet.append(f"Yield {name} tenor 10Y tercatat di level {_angka(ust[f'{key}_yield'], 3)}% ({STALE_TEXT}).")
+            else:
+                bullet.append(f"Yield {name} tenor 10Y bergerak {ust[f'{key}_trend']} "
+                              f"{_angka(abs(ust[f'{key}_change_bps']), 1)} bps ke level {_angka(ust[f'{key}_yield'], 3)}%.")
+    cds = intl['cds']
+    if cds:
+        levels = " dan ".join(f"{row['tenor']} di level {_angka(row['price'])} bps" for row in cds['tenors'])
+        bullet.append(f"Credit risk Indonesia yang tercermin dari nilai CDS tercatat {levels}.")
+    _summary_bullet(lines, bullet)
+    
+    bullet = []
+    if ust and ust['spread_change_bps'] is None:
+        bullet.append(f"Spread dari yield global bonds Indonesia terhadap UST tenor 10Y tercatat "
+                      f"{_angka(ust['spread_bps'], 0)} bps.")
+    elif ust:
+        spread_trend = 'naik' if ust['spread_change_bps'] > 0 else 'turun'
+        bullet.append(f"Spread dari yield global bonds Indonesia terhadap UST tenor 10Y bergerak {spread_trend} "
+                      f"{_angka(abs(ust['spread_change_bps']), 0)} bps (dari {_angka(ust['prev_spread_bps'], 0)} bps "
+                      f"ke {_angka(ust['spread_bps'], 0)} bps).")
+    ndf = intl['ndf']
+    if ndf and ndf['ndf_1m_change'] is None:
+        bullet.append(f"Nilai NDF tenor 1 bulan tercatat di level {_angka(ndf['ndf_1m'], 0)} ({STALE_TEXT}).")
+    elif ndf:
+        moves = [(tenor, ndf[f'ndf_{key}_change']) for tenor, key in (('1', '1m'), ('6', '6m'), ('12', '12m'))
+                 if ndf[f'ndf_{key}_change'] is not None]
+        bullet.append(f"Nilai NDF bergerak {ndf['trend']} dibandingkan hari sebelumnya, dengan NDF tenor "
+                      f"{_daftar([tenor for tenor, _ in moves])} bulan bergerak {'masing-masing ' if len(moves) > 1 else ''}"
+                      f"{_daftar([_angka(change, 0) for _, change in moves])} poin.")
+    _summary_bullet(lines, bullet)
+    
+    bullet = []
+    stocks = intl['stocks']
+    if stocks:
+        moves = [f"{index['label']} di level {_angka(index['value'])} ({STALE_TEXT})" if index['change'] is None else
+                 f"{index['label']} {index['trend']} {_angka(abs(index['pct_change']))}%"
+                 for index in stocks['indices'] if index['key'] != 'Indonesia']
+        if moves:
+            bullet.append(f"Indeks saham utama global pada sesi perdagangan {_tanggal(stocks['date'])}: {_daftar(moves)}.")
+    commodities = intl['commodities']
+    if commodities:
+        bullet.append(f"Harga minyak mentah ICP pada {_tanggal(commodities['date'])} tercatat di level "
+                      f"US${_angka(commodities['icp'])} per barel, sementara minyak sawit berada di level "
+                      f"US${_angka(commodities['palm_oil'])} per metric ton.")
+    _summary_bullet(lines, bullet)
+
+
+# Report section -> summary section renderer
+SUMMARY_SECTIONS = {
+    'sun': _summary_sun,
+    'sbsn': _summary_sbsn,
+    'international': _summary_international
+}
+
+
+def render_digest(report):
+    """Render the report model as a short English digest for readers outside the desk"""
+    lines = ["Indonesia Government Securities - Daily Market Digest", ""]
+    if report['date'] is None:
+        lines.append("No data available")
+        return "\n".join(lines) + "\n"
+    
+    date = _parse_date(report['date'])
+    lines.append(f"{date.day} {date.strftime('%B %Y')}")
+    lines.append("")
+    for section in report.get('sections', SECTION_SOURCES):
+        DIGEST_SECTIONS[section](lines, report)
+    
+    lines.append(f"Generated {report['generated_at']}")
+    return "\n".join(lines) + "\n"
+
+
+def _moved(change, up='rose', down='fell'):
+    """English verb for the direction of a change"""
+    if not change:
+        return 'was unchanged'
+    return up if change > 0 else down
+
+
+def _digest_change(change, spec, unit):
+    """A signed change for the digest, or 'not updated' for one skipped as carried forward"""
+    return "not updated" if change is None else f"{change:{spec}}{unit}"
+
+
+def _digest_unavailable(lines, report, section):
+    """Append the failed sources of one report section to the digest"""
+    unavailable = [name for name in SECTION_SOURCES[section] if name in report.get('unavailable', {})]
+    if unavailable:
+        lines.append(f"- Not available: {', '.join(unavailable)}.")
+
+
+def _digest_sun(lines, report):
+    """Append the SUN market, ownership and turnover lines to the digest"""
+    sun = report['sun']
+    lines.append("Government Bonds (SUN)")
+    yield_changes = sun['yield']
+    if yield_changes:
+        lines.append(f"- Average yield {_moved(yield_changes['change_bps'])} {abs(yield_changes['change_bps']):.1f} bps "
+                     f"to {yield_changes['today_yield']:.4f}%.")
+    benchmarks = report['benchmarks']
+    if benchmarks and benchmarks['rows']:
+        levels = ", ".join(f"{row['security']} {row['today_yield']:.3f}% ({row['change_bps']:+.1f} bps)"
+                           for row in benchmarks['rows'])
+        lines.append(f"- Benchmark series: {levels}.")
+    fx = sun['fx']
+    if fx and fx['change'] is None:
+        lines.append(f"- The rupiah at Rp{fx['usd']:,.0f}/US$ (not updated).")
+    elif fx:
+        lines.append(f"- The rupiah {_moved(fx['change'], 'weakened', 'strengthened')} {abs(fx['pct_change']):.2f}% "
+                     f"to Rp{fx['usd']:,.0f}/US$.")
+    ownership = sun['ownership']
+    if ownership:
+        changes = {period: ownership['changes'][period]['non_resident'] for period in ('day', 'mtd', 'ytd')}
+        lines.append(f"- Non-resident holdings as of {ownership['date']}: Rp{ownership['non_resident']/1e12:,.2f} T "
+                     f"({_perubahan(changes['day'])} on the day, {_perubahan(changes['mtd'])} month to date, "
+                     f"{_perubahan(changes['ytd'])} year to date).")
+    transactions = sun['transactions']
+    if transactions:
+        mtd = transactions['mtd']
+        lines.append(f"- Turnover: Rp{transactions['outright_volume']/1e12:,.2f} T outright and "
+                     f"Rp{transactions['repo_volume']/1e12:,.2f} T repo; month-to-date daily average "
+                     f"Rp{mtd['outright_volume']/mtd['days']/1e12:,.2f} T outright.")
+    _digest_unavailable(lines, report, 'sun')
+    lines.append("")
+
+
+def _digest_sbsn(lines, report):
+    """Append the SBSN market lines to the digest"""
+    sbsn = report['sbsn']
+    lines.append("Islamic Government Securities (SBSN)")
+    yield_changes = sbsn.get('yield')
+    if yield_changes:
+        lines.append(f"- Average yield {_moved(yield_changes['change_bps'])} {abs(yield_changes['change_bps']):.1f} bps "
+                     f"to {yield_changes['today_yield']:.4f}%.")
+    benchmark_range = _benchmark_range(sbsn.get('benchmarks'))
+    if benchmark_range:
+        _, low, high = benchmark_range
+        lines.append(f"- Benchmark yields moved between {low:+.1f} and {high:+.1f} bps.")
+    trading = sbsn.get('trading')
+    if trading and trading['trades']:
+        lines.append(f"- Turnover: Rp{trading['volume']/1e12:,.2f} T in {trading['trades']:,} trades.")
+    _digest_unavailable(lines, report, 'sbsn')
+    lines.append("")
+
+
+def _digest_international(lines, report):
+    """Append the international market lines to the digest"""
+    intl = report['international']
+    lines.append("International Markets")
+    ust = intl['ust']
+    if ust:
+        lines.append(f"- 10Y INDON {ust['indo_yield']:.3f}% ({_digest_change(ust['indo_change_bps'], '+.1f', ' bps')}), "
+                     f"10Y UST {ust['ust_yield']:.3f}% ({_digest_change(ust['ust_change_bps'], '+.1f', ' bps')}); "
+                     f"spread {ust['spread_bps']:.0f} bps ({_digest_change(ust['spread_change_bps'], '+.0f', ' bps')}).")
+    cds = intl['cds']
+    if cds:
+        levels = ", ".join(f"{row['tenor']} {row['price']:.2f} bps" for row in cds['tenors'])
+        lines.append(f"- CDS: {levels}.")
+    ndf = intl['ndf']
+    if ndf:
+        lines.append(f"- 1M NDF {ndf['ndf_1m']:,.0f} ({_digest_change(ndf['ndf_1m_change'], '+.0f', ' points')}).")
+    stocks = intl['stocks']
+    if stocks:
+        moves = ", ".join(f"{index['label']} {_digest_change(index['pct_change'], '+.2f', '%')}"
+                          for index in stocks['indices'])
+        lines.append(f"- Equities: {moves}.")
+    commodities = intl['commodities']
+    if commodities:
+        lines.append(f"- Oil: ICP US${commodities['icp']:.2f}/bbl, WTI US${commodities['wti']:.2f}/bbl; "
+                     f"palm oil US${commodities['palm_oil']:.2f}/t.")
+    _digest_unavailable(lines, report, 'international')
+    lines.append("")
+
+
+# Report section -> digest section renderer
+DIGEST_SECTIONS = {
+    'sun': _digest_sun,
+    'sbsn': _digest_sbsn,
+    'international': _digest_international
+}
+
+
+def _benchmark_table(lines, title, benchmarks):
+    """Append a benchmark yield table to the plain-text layout"""
+    if not benchmarks or not benchmarks['rows']:
+        return
+    lines.append(title)
+    lines.append("-" * 80)
+    lines.append(f"{'Seri':<10} {'Yield Hari Ini':>15} {'Yield Kemarin':>15} {'Perubahan (bps)':>18}")
+    lines.append("-" * 80)
+    for row in benchmarks['rows']:
+        lines.append(f"{row['security']:<10} {row['today_yield']:>14.4f}% {row['yesterday_yield']:>14.4f}% {row['change_bps']:>17.2f}")
+    lines.append("")
+
+
+def _markdown_benchmark_table(lines, title, benchmarks):
+    """Append a benchmark yield table to the Markdown layout"""
+    if not benchmarks or not benchmarks['rows']:
+        return
+    lines.append(f"## {title}")
+    lines.append("")
+    lines.append("| Seri | Yield Hari Ini | Yield Kemarin | Perubahan (bps) |")
+    lines.append("|---|---:|---:|---:|")
+    for row in benchmarks['rows']:
+        lines.append(f"| {row['security']} | {row['today_yield']:.4f}% | {row['yesterday_yield']:.4f}% | {row['change_bps']:.2f} |")
+    lines.append("")
+
+
+def _curve_table(lines, title, curve):
+    """Append the fitted yield curve at the configured tenors to the plain-text layout"""
+    if not curve:
+        return
+    lines.append(f"{title} ({curve['method']}, {curve['series']['today']} seri)")
+    lines.append("-" * 80)
+    lines.append(f"{'Tenor':<10} {'Yield Hari Ini':>15} {'Yield Kemarin':>15} {'Perubahan (bps)':>18}")
+    lines.append("-" * 80)
+    for point in curve['points']:
+        lines.append(f"{point['tenor']:<10} {point['today_yield']:>14.4f}% {point['yesterday_yield']:>14.4f}% {point['change_bps']:>17.2f}")
+    lines.append("")
+
+
+def _markdown_curve_table(lines, title, curve):
+    """Append the fitted yield curve at the configured tenors to the Markdown layout"""
+    if not curve:
+        return
+    lines.append(f"## {title}")
+    lines.append("")
+    lines.append(f"_{curve['method']}, {curve['series']['today']} seri_")
+    lines.append("")
+    lines.append("| Tenor | Yield Hari Ini | Yield Kemarin | Perubahan (bps) |")
+    lines.append("|---|---:|---:|---:|")
+    for point in curve['points']:
+        lines.append(f"| {point['tenor']} | {point['today_yield']:.4f}% | {point['yesterday_yield']:.4f}% | {point['change_bps']:.2f} |")
+    lines.append("")
+
+
+def _benchmark_range(benchmarks):
+    """Return (trend, lowest, highest) bps change of a benchmark table, or None"""
+    if not benchmarks or not benchmarks['rows']:
+        return None
+    changes = [row['change_bps'] for row in benchmarks['rows']]
+    if all(change > 0 for change in changes):
+        trend = 'naik'
+    elif all(change < 0 for change in changes):
+        trend = 'turun'
+    else:
+        trend = 'mixed'
+    return trend, min(changes), max(changes)
+
+
+def _daftar(items):
+    """Join items as an Indonesian list: 'a, b, dan c'"""
+    items = list(items)
+    if len(items) <= 1:
+        return "".join(items)
+    return ", ".join(items[:-1]) + ", dan " + items[-1]
+
+
+def _summary_bullet(lines, sentences):
+    """Append one summary bullet made of sentences, followed by a blank line"""
+    if sentences:
+        lines.append("• " + " ".join(sentences))
+        lines.append("")
+
+
+def _unavailable(report, section):
+    """List 'label (reason)' for the failed sources of one report section"""
+    unavailable = report.get('unavailable', {})
+    return [f"{SOURCE_LABELS.get(name, name)} ({unavailable[name]})"
+            for name in SECTION_SOURCES[section] if name in unavailable]
+
+
+def _quality_notes(report):
+    """Describe the findings of the quality report in the report's language"""
+    quality = report.get('quality')
+    if not quality:
+        return []
+    notes = []
+    plte = quality['plte']
+    if plte and plte['outliers']:
+        notes.append(f"{plte['outliers']:,} transaksi PLTE dengan yield menyimpang dari serinya dikeluarkan dari "
+                     f"statistik yield.")
+    if plte and plte['invalid_yields']:
+        notes.append(f"{plte['invalid_yields']:,} transaksi PLTE dengan yield di luar {YIELD_MIN}-{YIELD_MAX}% "
+                     f"tidak dihitung dalam statistik yield.")
+    if plte and plte['adjusted_series']:
+        notes.append(f"Statistik {plte['adjusted_series']} seri PLTE dihitung ulang tanpa transaksi tersebut.")
+    if plte and plte['mismatches']:
+        notes.append(f"{plte['mismatches']:,} transaksi PLTE dengan harga dan yield yang tidak konsisten terhadap kupon.")
+    if plte is None and 'plte_flags' in report.get('unavailable', {}):
+        notes.append(f"Transaksi PLTE tidak diperiksa ({report['unavailable']['plte_flags']}).")
+    for name, checks in quality['sources'].items():
+        label = SOURCE_LABELS.get(name, name)
+        if checks['duplicates']:
+            notes.append(f"{label}: {checks['duplicates']} baris dengan tanggal ganda diabaikan.")
+        excluded = "; perubahannya tidak dihitung" if name in STALE_EXCLUDED else ""
+        for date in checks['stale_dates']:
+            notes.append(f"{label}: data {date} sama dengan tanggal sebelumnya (tidak diperbarui{excluded}).")
+        for stale in checks.get('stale_columns', []):
+            columns = ", ".join(STOCK_INDICES.get(column, column) if name == 'stocks' else column
+                                for column in stale['columns'])
+            notes.append(f"{label}: {columns} pada {stale['date']} sama dengan tanggal sebelumnya "
+                         f"(tidak diperbarui{excluded}).")
+        for gap in checks['gaps']:
+            notes.append(f"{label}: {gap['missing_days']} hari kerja tanpa data antara {gap['from']} dan {gap['to']}.")
+    return notes
+
+
+def _index(stocks, key):
+    """Look up one index entry in the stocks section of the report model"""
+    if not stocks:
+        return None
+    for index in stocks['indices']:
+        if index['key'] == key:
+            return index
+    return None
+
+
+def _chart_series(rows, column):
+    """(date, value) pairs of a column in date order, skipping missing values"""
+    if not rows:
+        return None
+    points = sorted((str(row['tanggal'])[:10], row[column]) for row in rows if row[column] is not None)
+    return points or None
+
+
+def _chart_inputs(report, history):
+    """Chart name -> the plain data it is drawn from (None when unavailable)"""
+    def curve(market, benchmarks):
+        fitted = report['curves'].get(market)
+        if not fitted:
+            return None
+        return {
+            'method': fitted['method'],
+            'params': fitted['params'],
+            'points': [(point['years'], point['today_yield'], point['yesterday_yield']) for point in fitted['points']],
+            'benchmarks': [(row['security'], row['tenor_years'], row['today_yield'])
+                           for row in (benchmarks or {}).get('rows', []) if row['tenor_years'] == row['tenor_years']]
+        }
+    
+    def trend(source, columns):
+        series = {label: _chart_series(history.get(source), column) for label, column in columns.items()}
+        series = {label: points for label, points in series.items() if points}
+        return series or None
+    
+    rupiah = trend('fx', {'USD/IDR': 'USD'})
+    ndf = trend('ndf', {'NDF 1M': 'IHN_1M_Curncy', 'NDF 6M': 'IHN_6M_Curncy', 'NDF 12M': 'IHN_12M_Curncy'})
+    ust = trend('ust', {'Indonesia 10Y': 'Indonesia', 'UST 10Y': 'USA'})
+    return {
+        'sun_curve': curve('SUN', report['benchmarks']),
+        'sbsn_curve': curve('SBSN', report['sbsn'].get('benchmarks')),
+        'rupiah_ndf': rupiah and dict(rupiah, **(ndf or {})),
+        'stocks': trend('stocks', {label: column for column, label in STOCK_INDICES.items()}),
+        'ust_spread': ust if ust and len(ust) == 2 else None
+    }
+
+
+def _plot_curve(ax, data):
+    tenors = [point[0] for point in data['points']]
+    if data['method'] == 'nelson-siegel':
+        years = [0.25 + i * (max(tenors) - 0.25) / 100 for i in range(101)]
+        for label, style in (('today', '-'), ('yesterday', '--')):
+            ax.plot(years, nelson_siegel(years, *data['params'][label]), style,
+                    label='Hari ini' if label == 'today' else 'Kemarin')
+    else:
+        ax.plot(tenors, [point[1] for point in data['points']], '-', label='Hari ini')
+        ax.plot(tenors, [point[2] for point in data['points']], '--', label='Kemarin')
+    for security, years, value in data['benchmarks']:
+        ax.scatter(years, value, s=12, color='black')
+        ax.annotate(security, (years, value), fontsize=7, xytext=(3, 3), textcoords='offset points')
+    ax.set_xlabel('Tenor (tahun)')
+    ax.set_ylabel('Yield (%)')
+    ax.legend()
+
+
+def _plot_rupiah_ndf(ax, data):
+    for label, points in data.items():
+        ax.plot([_parse_date(date) for date, _ in points], [value for _, value in points],
+                linewidth=2 if label == 'USD/IDR' else 1, label=label)
+    ax.figure.autofmt_xdate()
+    ax.set_ylabel('Rp/US$')
+    ax.legend()
+
+
+def _plot_stocks(ax, data):
+    for label, points in data.items():
+        base = points[0][1]
+        ax.plot([_parse_date(date) for date, _ in points], [value / base * 100 for _, value in points],
+                linewidth=2 if label == 'IHSG' else 1, label=label)
+    ax.figure.autofmt_xdate()
+    ax.set_ylabel('Indeks (awal periode = 100)')
+    ax.legend(fontsize=8)
+
+
+def _plot_ust_spread(ax, data):
+    for label, points in data.items():
+        ax.plot([_parse_date(date) for date, _ in points], [value for _, value in points], label=label)
+    ax.figure.autofmt_xdate()
+    ax.set_ylabel('Yield (%)')
+    ust = dict(data['UST 10Y'])
+    spread = [(date, (value - ust[date]) * 100) for date, value in data['Indonesia 10Y'] if date in ust]
+    spread_ax = ax.twinx()
+    spread_ax.fill_between([_parse_date(date) for date, _ in spread], [value for _, value in spread],
+                           alpha=0.2, color='grey', label='Spread')
+    spread_ax.set_ylabel('Spread (bps)')
+    ax.legend(loc='upper left')
+
+
+# Chart name -> (plot function, title)
+CHARTS = {
+    'sun_curve': (_plot_curve, "Kurva Yield SUN"),
+    'sbsn_curve': (_plot_curve, "Kurva Yield SBSN"),
+    'rupiah_ndf': (_plot_rupiah_ndf, "Nilai Tukar Rupiah dan NDF"),
+    'stocks': (_plot_stocks, "IHSG dan Indeks Saham Global"),
+    'ust_spread': (_plot_ust_spread, "Yield 10Y Indonesia, UST 10Y dan Spread")
+}
+
+
+def _render_chart(job):
+    """Process-pool worker of export_charts(): draw one chart with the non-interactive Agg backend"""
+    name, data, path, digest = job
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plot, title = CHARTS[name]
+    fig, ax = plt.subplots(figsize=(8, 4.5))
+    try:
+        plot(ax, data)
+        ax.set_title(title)
+        ax.grid(alpha=0.3)
+        fig.tight_layout()
+        fig.savefig(path, dpi=120)
+    finally:
+        plt.close(fig)
+    Path(f"{path}.sha256").write_text(digest)
+    return path
+
+
+RENDERERS = {
+    'txt': 'export_to_text',
+    'md': 'export_to_markdown',
+    'json': 'export_to_json',
+    'summary': 'export_summary',
+    'digest': 'export_digest',
+    'charts': 'export_charts'
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the SBN Daily Market Update from the AKP databases")
+    parser.add_argument('--format', dest='formats', action='append', choices=['console'] + list(RENDERERS),
+                        help="output to produce; may be repeated (default: console and txt)")
+    parser.add_argument('--config', help="report configuration file (default: report_config.json)")
+    parser.add_argument('--from', dest='start', metavar='YYYY-MM-DD',
+                        help="first report date of a historical range (requires --to)")
+    parser.add_argument('--to', dest='end', metavar='YYYY-MM-DD',
+                        help="last report date of a historical range (requires --from)")
+    parser.add_argument('--processes', type=int,
+                        help="worker processes for a historical range or --variants (default: one per CPU)")
+    parser.add_argument('--variants', nargs='*', metavar='NAME',
+                        help="build the named report variants of the configuration (default: all) from one fetch")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep running, rebuild the report when new data arrives and serve it as JSON over HTTP")
+    parser.add_argument('--port', type=int, default=WATCH_PORT,
+                        help=f"HTTP port of --watch on {WATCH_HOST} (default: {WATCH_PORT})")
+    parser.add_argument('--interval', type=float, default=WATCH_INTERVAL,
+                        help=f"seconds between database polls in --watch (default: {WATCH_INTERVAL})")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="record time, rows, I/O, memory, query plans and cache use of every stage to FILE")
+    parser.add_argument('--profile-format', choices=['jsonl', 'openmetrics'], default='jsonl',
+                        help="append JSON lines (default) or write OpenMetrics text for --profile")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="ignore cached query results and re-read every database")
+    parser.add_argument('--backend', choices=['sqlite', 'snapshot'], default='sqlite',
+                        help="read the AKP databases directly or the columnar snapshot (default: sqlite)")
+    parser.add_argument('--snapshot', action='store_true',
+                        help="export new partitions of the AKP tables to the columnar snapshot, then exit")
+    parser.add_argument('--bootstrap-indexes', action='store_true',
+                        help="create covering indexes and trading-date catalogs, then exit")
+    parser.add_argument('--refresh-aggregates', action='store_true',
+                        help="update the daily aggregate tables since their high-water mark, then exit")
+    args = parser.parse_args(argv)
+    if (args.start is None) != (args.end is None):
+        parser.error("--from and --to must be given together")
+    if args.watch and (args.start is not None or args.backend != 'sqlite'):
+        parser.error("--watch reads the live databases; it cannot be combined with --from/--to or --backend snapshot")
+    if args.variants is not None and (args.start is not None or args.watch or args.formats):
+        parser.error("--variants exports the formats configured per variant; it cannot be combined with "
+                     "--format, --from/--to or --watch")
+    
+    if args.bootstrap_indexes or args.refresh_aggregates or args.snapshot:
+        if args.bootstrap_indexes:
+            bootstrap_indexes()
+        if args.refresh_aggregates:
+            refresh_aggregates()
+        if args.snapshot:
+            export_snapshot()
+        return
+    if args.watch:
+        # Fetched frames stay in memory between refreshes; no query cache needed
+        generator = MarketReportGenerator(config=load_config(args.config))
+        ReportWatcher(generator, args.formats or [], args.interval).run(port=args.port)
+        return
+    formats = args.formats or ['console', 'txt']
+    
+    if args.backend == 'snapshot':
+        connect = SnapshotConnection
+    else:
+        connect = functools.partial(AKPConnection, cache=QueryCache(refresh=args.no_cache))
+    profiler = Profiler() if args.profile else None
+    config = load_config(args.config)
+    unknown = [name for name in args.variants or [] if name not in config['variants']]
+    if unknown:
+        parser.error(f"unknown report variants: {', '.join(unknown)} (configured: {', '.join(config['variants']) or 'none'})")
+    generator = MarketReportGenerator(connect=connect, config=config, profiler=profiler)
+    if args.variants is not None:
+        try:
+            reports = generator.build_variants(args.variants or None, processes=args.processes)
+        finally:
+            generator.close()
+            if profiler:
+                profiler.write(args.profile, args.profile_format)
+        print(f"Built {len(reports)} report variants: {', '.join(reports)}")
+        return
+    if args.start is not None:
+        try:
+            reports = generator.build_reports(args.start, args.end, formats, processes=args.processes)
+        finally:
+            generator.close()
+            if profiler:
+                profiler.write(args.profile, args.profile_format)
+        if 'console' in formats:
+            for report in reports:
+                generator.generate_report(report)
+        print(f"Built {len(reports)} reports from {args.start} to {args.end}")
+        return
+    
+    try:
+        report = generator.build_report()
+        for fmt in formats:
+            if fmt == 'console':
+                generator.generate_report(report)
+            else:
+                getattr(generator, RENDERERS[fmt])(report=report)
+    finally:
+        generator.close()
+        if profiler:
+            profiler.write(args.profile, args.profile_format)
 
 
 if __name__ == "__main__":
-    generator = MarketReportGenerator()
-    generator.generate_report()
-    generator.export_to_text()
+    main()
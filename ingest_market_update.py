@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Market Update PDF Ingestion
+Extracts Market Update PDFs page by page into cached text and table records
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import shutil
+import subprocess
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from generate_market_report import BULAN, YIELD_MAX, YIELD_MIN, MarketReportGenerator, QueryCache, load_config
+
+PDF_CACHE_DIR = Path(__file__).parent / ".pdf_cache"
+PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Identity of the extraction stored with each cached page; bump the version
+# when the table parsing changes so pages are extracted and parsed again
+EXTRACTOR = ('pdftotext', '-layout', 2)
+
+# Layout text: cells are separated by two or more spaces
+CELL_SPLIT = re.compile(r'\s{2,}')
+NUMBER = re.compile(r'^\(?[+-]?(?:Rp|US\$)?\s*\d[\d.,]*\s*(?:%|bps|T)?\)?$')
+SERIES_CODE = re.compile(r'^[A-Z]{2,4}\d{3,4}$')
+# Report date: YYYYMMDD in the file name ("Market Update 20260204.pdf"), or
+# the first date written out on the pages ("5 Februari 2026")
+NAME_DATE = re.compile(r'(?<!\d)(20\d{2})(\d{2})(\d{2})(?!\d)')
+TEXT_DATE = re.compile(rf"\b(\d{{1,2}}) ({'|'.join(BULAN)}) (\d{{4}})\b")
+
+OBJECT = re.compile(rb'(\d+)\s+\d+\s+obj\b(.*?)endobj', re.S)
+REFERENCE = re.compile(rb'(\d+)\s+\d+\s+R\b')
+STREAM = re.compile(rb'stream\r?\n(.*?)\r?\nendstream', re.S)
+
+
+def _pdf_objects(data):
+    """Object number -> body of every object in a PDF, including those packed in object streams
+
+    Later definitions win, as with incremental updates. This is just enough
+    structure to find the pages and their content, not a PDF parser.
+    """
+    objects = {}
+    for number, body in OBJECT.findall(data):
+        objects[int(number)] = body
+    for body in list(objects.values()):
+        if not re.search(rb'/Type\s*/ObjStm\b', body):
+            continue
+        stream = STREAM.search(body)
+        count = re.search(rb'/N\s+(\d+)', body)
+        first = re.search(rb'/First\s+(\d+)', body)
+        if not (stream and count and first and b'/FlateDecode' in body):
+            continue
+        packed = zlib.decompress(stream.group(1))
+        header = [int(value) for value in packed[:int(first.group(1))].split()]
+        offsets = list(zip(header[0::2], header[1::2]))
+        for i, (number, offset) in enumerate(offsets):
+            end = offsets[i + 1][1] if i + 1 < len(offsets) else len(packed) - int(first.group(1))
+            objects.setdefault(number, packed[int(first.group(1)) + offset:int(first.group(1)) + end])
+    return objects
+
+
+def page_hashes(path):
+    """Content hash of every page of a PDF, in page order
+
+    A page hashes its own dictionary and the objects it refers to directly
+    (content streams, fonts, images), so an unchanged page of a new day's
+    PDF hashes the same. Falls back to the file hash plus the page number
+    (page count from pdfinfo) when the page tree cannot be followed.
+    """
+    data = Path(path).read_bytes()
+    try:
+        objects = _pdf_objects(data)
+        catalog = next(body for body in objects.values() if re.search(rb'/Type\s*/Catalog\b', body))
+        root = int(re.search(rb'/Pages\s+(\d+)\s+\d+\s+R', catalog).group(1))
+        pages, pending = [], [root]
+        while pending:
+            body = objects[pending.pop(0)]
+            if re.search(rb'/Type\s*/Pages\b', body):
+                kids = re.search(rb'/Kids\s*\[(.*?)\]', body, re.S).group(1)
+                pending[:0] = [int(number) for number in REFERENCE.findall(kids)]
+            else:
+                pages.append(body)
+        hashes = []
+        for body in pages:
+            digest = hashlib.sha256(body)
+            own = re.sub(rb'/Parent\s+\d+\s+\d+\s+R', b'', body)
+            for number in REFERENCE.findall(own):
+                digest.update(objects.get(int(number), b''))
+            hashes.append(digest.hexdigest())
+        return hashes
+    except (StopIteration, AttributeError, KeyError, ValueError, zlib.error):
+        file_hash = hashlib.sha256(data).hexdigest()
+        return [hashlib.sha256(f"{file_hash}:{page}".encode()).hexdigest()
+                for page in range(1, _pdfinfo_pages(path) + 1)]
+
+
+def _pdfinfo_pages(path):
+    if shutil.which('pdfinfo') is None:
+        raise RuntimeError("pdfinfo not found and the PDF page tree could not be read (install poppler-utils)")
+    result = subprocess.run(['pdfinfo', str(path)], capture_output=True, text=True, check=True)
+    return int(re.search(r'^Pages:\s+(\d+)', result.stdout, re.M).group(1))
+
+
+def extract_page(path, page):
+    """Layout text of one page, as `pdftotext -layout -f page -l page`"""
+    if shutil.which('pdftotext') is None:
+        raise RuntimeError("pdftotext is required to extract uncached pages (install poppler-utils)")
+    result = subprocess.run(
+        ['pdftotext', '-layout', '-f', str(page), '-l', str(page), str(path), '-'],
+        capture_output=True, check=True
+    )
+    return result.stdout.decode('utf-8', errors='replace')
+
+
+def parse_number(cell, decimal=',', rate=False):
+    """Parse a table cell such as '5,2530', '1.044,37', 'Rp16.782', '(0,23%)' or '-1.3 bps'
+
+    With both separators the last one is the decimal point, and a separator
+    that appears more than once groups thousands. A single separator followed
+    by exactly three digits is ambiguous: in a rate (a cell of a yield or
+    price column, or one marked % or bps) it is the decimal point, so '5.253'
+    is 5.253; otherwise, and always in a currency cell, it is read by
+    `decimal` (the Market Update is written in Indonesian notation, so
+    'Rp16.782' is 16782).
+    """
+    text = cell.strip()
+    negative = text.startswith('(') and text.endswith(')')
+    rate = (rate or bool(re.search(r'%|bps', text))) and not re.search(r'Rp|US\$', text)
+    text = re.sub(r'Rp|US\$|%|bps|T$|[()\s]', '', text)
+    if '.' in text and ',' in text:
+        point = '.' if text.rfind('.') > text.rfind(',') else ','
+    elif text.count(',') > 1 or text.count('.') > 1:
+        point = '.' if text.count(',') > 1 else ','
+    elif re.search(r'[.,]\d{3}$', text):
+        point = text[-4] if rate else decimal
+    else:
+        point = ',' if ',' in text else '.'
+    thousands = ',' if point == '.' else '.'
+    try:
+        value = float(text.replace(thousands, '').replace(point, '.'))
+    except ValueError:
+        return None
+    return -value if negative else value
+
+
+def parse_tables(text, page=None):
+    """Table rows of a page's layout text: a label followed by numeric cells
+
+    Returns one record per row with its label, parsed values and raw cells,
+    e.g. {'page': 1, 'line': 12, 'label': 'FR0100', 'values': [6.21, 6.19, 2.0], ...}.
+    The cells of a series row (yields, prices and their changes) are parsed
+    as rates.
+    """
+    records = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        cells = [cell for cell in CELL_SPLIT.split(line.strip()) if cell]
+        label = []
+        for cell in cells:
+            if NUMBER.match(cell):
+                break
+            label.append(cell)
+        numbers = cells[len(label):]
+        if not label or not numbers or not all(NUMBER.match(cell) for cell in numbers):
+            continue
+        rate = bool(SERIES_CODE.match(label[0]))
+        records.append({
+            'page': page,
+            'line': line_number,
+            'label': ' '.join(label),
+            'values': [parse_number(cell, rate=rate) for cell in numbers],
+            'cells': cells
+        })
+    return records
+
+
+def ingest(paths, first=None, last=None, cache=None, max_workers=None):
+    """Extract pages first..last of each PDF into text and table records
+
+    Pages are looked up in the cache by content hash and only the misses are
+    extracted, concurrently (one pdftotext process per page), so a rerun or
+    a backlog of PDFs sharing pages only extracts what it has not seen.
+    Returns {path: [{'page', 'hash', 'cached', 'text', 'records'}, ...]}.
+    """
+    cache = cache if cache is not None else QueryCache(PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES)
+    results, jobs = {}, {}
+    for path in paths:
+        hashes = page_hashes(path)
+        start, end = first or 1, min(last or len(hashes), len(hashes))
+        results[path] = []
+        for page in range(start, end + 1):
+            digest = hashes[page - 1]
+            hit, entry = cache.get(digest, EXTRACTOR)
+            results[path].append(dict(page=page, hash=digest, cached=hit, **(entry or {})))
+            if not hit:
+                jobs.setdefault(digest, (path, page))
+
+    def extract(job):
+        digest, (path, page) = job
+        text = extract_page(path, page)
+        entry = {'text': text, 'records': parse_tables(text)}
+        cache.put(digest, EXTRACTOR, entry)
+        return digest, entry
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        extracted = dict(pool.map(extract, jobs.items()))
+    for pages in results.values():
+        for page in pages:
+            if not page['cached']:
+                page.update(extracted[page['hash']])
+            # Cached records are shared between pages with the same content
+            page['records'] = [dict(record, page=page['page']) for record in page['records']]
+    return results
+
+
+def report_date(path, pages):
+    """Date (YYYY-MM-DD) a Market Update reports on, or None if neither its name nor its pages give one"""
+    match = NAME_DATE.search(Path(path).name)
+    if match:
+        return '-'.join(match.groups())
+    for page in pages:
+        match = TEXT_DATE.search(page.get('text') or '')
+        if match:
+            day, month, year = match.groups()
+            return f"{year}-{BULAN.index(month) + 1:02d}-{int(day):02d}"
+    return None
+
+
+def compare_with_report(pages, report):
+    """Compare benchmark series yields in the PDF tables with the report model
+
+    A series row's PDF yield is its first value in the plausible yield range.
+    Returns [{'security', 'page', 'pdf_yield', 'db_yield', 'difference_bps'}].
+    """
+    db_yields = {}
+    for benchmarks in (report.get('benchmarks'), (report.get('sbsn') or {}).get('benchmarks')):
+        for row in (benchmarks or {}).get('rows', []):
+            db_yields[row['security']] = row['today_yield']
+
+    comparisons = []
+    for page in pages:
+        for record in page['records']:
+            security = record['label'].split()[0]
+            if not SERIES_CODE.match(security) or security not in db_yields:
+                continue
+            pdf_yield = next((value for value in record['values']
+                              if value is not None and YIELD_MIN < value < YIELD_MAX), None)
+            db_yield = db_yields[security]
+            comparisons.append({
+                'security': security,
+                'page': record['page'],
+                'pdf_yield': pdf_yield,
+                'db_yield': db_yield,
+                'difference_bps': None if pdf_yield is None or db_yield is None else (db_yield - pdf_yield) * 100
+            })
+    return comparisons
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract Market Update PDFs into cached text and table records")
+    parser.add_argument('pdfs', nargs='+', help="Market Update PDF files")
+    parser.add_argument('-f', '--first', type=int, help="first page to extract (default: 1)")
+    parser.add_argument('-l', '--last', type=int, help="last page to extract (default: last page)")
+    parser.add_argument('--workers', type=int, help="concurrent pdftotext processes")
+    parser.add_argument('--no-cache', action='store_true', help="extract every page again (results still refresh the cache)")
+    parser.add_argument('--json', metavar='FILE', help="write the pages and records as JSON")
+    parser.add_argument('--compare', action='store_true',
+                        help="compare benchmark yields in the tables with the report of each PDF's date built from the databases")
+    parser.add_argument('--config', help="report configuration file (default: report_config.json)")
+    args = parser.parse_args(argv)
+
+    cache = QueryCache(PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES, refresh=args.no_cache)
+    try:
+        results = ingest(args.pdfs, args.first, args.last, cache, args.workers)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    for path, pages in results.items():
+        extracted = sum(not page['cached'] for page in pages)
+        records = sum(len(page['records']) for page in pages)
+        print(f"{path}: {len(pages)} pages ({extracted} extracted, {len(pages) - extracted} cached), {records} table rows")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({str(path): pages for path, pages in results.items()}, f, indent=2, ensure_ascii=False)
+        print(f"Pages written to: {args.json}")
+
+    if args.compare:
+        # Each PDF is compared with the report of its own date; the dates are
+        # built together from one range fetch
+        by_date = {}
+        for path, pages in results.items():
+            by_date.setdefault(report_date(path, pages), []).append(path)
+        for path in by_date.pop(None, []):
+            print(f"{path}: no report date in the file name or pages, not compared")
+        reports = {}
+        if by_date:
+            generator = MarketReportGenerator(config=load_config(args.config))
+            try:
+                reports = generator.build_reports(min(by_date), max(by_date), days=by_date)
+            finally:
+                generator.close()
+            reports = {str(report['date'])[:10]: report for report in reports}
+        for date, paths in sorted(by_date.items()):
+            if date not in reports:
+                print(f"\nNo report for {date}: not a trading day in the databases")
+                continue
+            print(f"\nBenchmark yields vs. databases ({date})")
+            for path in paths:
+                for row in compare_with_report(results[path], reports[date]):
+                    difference = 'n/a' if row['difference_bps'] is None else f"{row['difference_bps']:+.1f} bps"
+                    pdf_yield, db_yield = ('n/a' if value is None else f"{value:.4f}%"
+                                           for value in (row['pdf_yield'], row['db_yield']))
+                    print(f"  {Path(path).name} p.{row['page']} {row['security']:<8} PDF {pdf_yield:>9}  "
+                          f"DB {db_yield:>9}  {difference}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
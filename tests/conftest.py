@@ -0,0 +1,24 @@
+import contextlib
+import io
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import benchmark_market_report  # noqa: E402
+import generate_market_report  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def synthetic(tmp_path_factory):
+    """Schema alias -> database file of a small synthetic dataset with its indexes and aggregates"""
+    directory = tmp_path_factory.mktemp('akp')
+    with contextlib.redirect_stdout(io.StringIO()):
+        benchmark_market_report.generate_databases(directory, 4000, 0.1, seed=7, end=date(2026, 2, 11))
+        databases = benchmark_market_report.databases_in(directory)
+        generate_market_report.bootstrap_indexes(databases)
+        generate_market_report.refresh_aggregates(databases)
+    return databases
@@ -0,0 +1,52 @@
+import math
+import shutil
+import sqlite3
+from copy import deepcopy
+
+import pytest
+
+from generate_market_report import DEFAULT_CONFIG, AKPConnection, MarketReportGenerator, refresh_aggregates
+
+
+def stats_by_series(rows):
+    return {(row['date'], row['security']): row for row in rows}
+
+
+@pytest.mark.parametrize('window', [(None, None), ('2026-01-20', '2026-02-11')])
+def test_plte_stats_aggregate_matches_stream(synthetic, window):
+    generator = MarketReportGenerator(connect=lambda: AKPConnection(synthetic), config=deepcopy(DEFAULT_CONFIG))
+    try:
+        assert generator.db.aggregate_fresh('PLTE_Daily_Series')
+        aggregate = generator.get_plte_stats(*window)
+        generator.db.aggregate_fresh = lambda name: False
+        streamed = generator.get_plte_stats(*window)
+    finally:
+        generator.close()
+    
+    assert aggregate and len(aggregate) == len(streamed)
+    aggregate, streamed = stats_by_series(aggregate), stats_by_series(streamed)
+    assert aggregate.keys() == streamed.keys()
+    for series, row in aggregate.items():
+        for column, value in row.items():
+            other = streamed[series][column]
+            if isinstance(value, float) and isinstance(other, float):
+                assert math.isclose(value, other, rel_tol=1e-9, abs_tol=1e-9), (series, column)
+            else:
+                assert value == other, (series, column)
+
+
+def test_date_catalog_is_skipped_until_refreshed(synthetic, tmp_path, capsys):
+    databases = {alias: shutil.copy(path, tmp_path / path.name) for alias, path in synthetic.items()}
+    with sqlite3.connect(databases['plte']) as conn:
+        assert not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger'").fetchall()
+        conn.execute("INSERT INTO DB_PLTE (tanggal_transaksi, Securities_Id, Yield) VALUES ('2026-02-12', 'FR0100', 6.5)")
+    conn.close()
+    
+    def latest(databases):
+        with AKPConnection(databases) as db:
+            return db.catalog_fresh('plte'), [row[0] for row in db.execute(db.latest_dates_sql('plte', 2))]
+    
+    # An ETL load ahead of the catalog reads the raw table instead
+    assert latest(databases) == (False, ['2026-02-12', '2026-02-11'])
+    refresh_aggregates(databases)
+    assert latest(databases) == (True, ['2026-02-12', '2026-02-11'])
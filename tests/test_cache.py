@@ -0,0 +1,37 @@
+import os
+
+from generate_market_report import QueryCache
+
+
+def test_query_cache_keys_on_database_identity(tmp_path):
+    cache = QueryCache(tmp_path)
+    assert cache.get('SELECT 1', ('v1',)) == (False, None)
+    cache.put('SELECT 1', ('v1',), [1])
+    assert cache.get('SELECT 1', ('v1',)) == (True, [1])
+    # A changed database misses, and storing its result drops the older entry
+    assert cache.get('SELECT 1', ('v2',)) == (False, None)
+    cache.put('SELECT 1', ('v2',), [2])
+    assert len(list(tmp_path.glob('*.pkl'))) == 1
+    assert cache.get('SELECT 1', ('v1',)) == (False, None)
+    assert cache.get('SELECT 1', ('v2',)) == (True, [2])
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_query_cache_refresh_skips_reads(tmp_path):
+    QueryCache(tmp_path).put('SELECT 1', (), [1])
+    assert QueryCache(tmp_path, refresh=True).get('SELECT 1', ()) == (False, None)
+
+
+def test_query_cache_evicts_least_recently_used(tmp_path):
+    cache = QueryCache(tmp_path)
+    for age, key in enumerate(('a', 'b', 'c')):
+        cache.put(key, (), b'x' * 1000)
+        # Distinct, increasing access times
+        path, = tmp_path.glob(f"{cache._digest(key)}-*.pkl")
+        os.utime(path, (1_000_000 + age, 1_000_000 + age))
+    assert cache.get('a', ())[0]  # a read makes 'a' the most recently used
+    
+    cache.max_bytes = 2500
+    cache.put('d', (), b'x' * 1000)
+    
+    assert [key for key in 'abcd' if cache.get(key, ())[0]] == ['a', 'd']
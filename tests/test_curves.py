@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+
+from generate_market_report import NS_TAU_GRID, fit_nelson_siegel, nelson_siegel
+
+
+def test_nelson_siegel_fit_recovers_curve():
+    tau = np.linspace(*NS_TAU_GRID)[10]
+    tenors = [0.5, 1, 2, 3, 5, 7, 10, 15, 20, 30]
+    yields = nelson_siegel(tenors, 7.0, -1.5, 0.8, tau)
+    
+    beta0, beta1, beta2, fitted_tau = fit_nelson_siegel(tenors, yields)
+    
+    assert fitted_tau == pytest.approx(tau)
+    assert (beta0, beta1, beta2) == pytest.approx((7.0, -1.5, 0.8), abs=1e-6)
+    assert nelson_siegel(tenors, beta0, beta1, beta2, fitted_tau) == pytest.approx(yields, abs=1e-8)
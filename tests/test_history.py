@@ -0,0 +1,53 @@
+from copy import deepcopy
+
+import generate_market_report
+from generate_market_report import (
+    CHART_SOURCES, DEFAULT_CONFIG, SOURCES, AKPConnection, MarketReportGenerator, _chart_start, slice_chart_history,
+    slice_history
+)
+
+
+def test_slice_history_cuts_each_source_to_one_report_day():
+    data = {
+        'plte': [{'date': day, 'security': 'FR0100'} for day in ('2026-02-11', '2026-02-10', '2026-02-09')],
+        'ownership': [{'date': day} for day in ('2026-02-11', '2026-02-10', '2026-02-10', '2026-02-09')],
+        'fx': [{'tanggal': day} for day in ('2026-02-11 00:00:00', '2026-02-10 00:00:00')],
+        'ust': None,
+        'unlisted': [{'tanggal': '2026-02-11'}]
+    }
+    
+    sliced = slice_history(data, '2026-02-10')
+    
+    assert [row['date'] for row in sliced['plte']] == ['2026-02-10', '2026-02-09']
+    assert [row['date'] for row in sliced['ownership']] == ['2026-02-10', '2026-02-10']
+    # Timestamps are compared on their date part
+    assert [row['tanggal'] for row in sliced['fx']] == ['2026-02-10 00:00:00']
+    assert sliced['ust'] is None
+    assert sliced['unlisted'] == data['unlisted']
+
+
+def test_slice_history_keeps_flags_of_the_plte_dates():
+    data = {
+        'plte': [{'date': day, 'security': 'FR0100'} for day in ('2026-02-11', '2026-02-10', '2026-02-09')],
+        'plte_flags': [{'date': day, 'yield': 25.0} for day in ('2026-02-11', '2026-02-09', '2026-02-06')]
+    }
+    
+    sliced = slice_history(data, '2026-02-10')
+    
+    assert [row['date'] for row in sliced['plte_flags']] == ['2026-02-09']
+
+
+def test_slice_chart_history_matches_a_fetch_of_the_day(synthetic, monkeypatch):
+    # A window inside the synthetic data, so the day's fetch also returns the date before it
+    monkeypatch.setattr(generate_market_report, 'CHART_WINDOW_DAYS', 10)
+    generator = MarketReportGenerator(connect=lambda: AKPConnection(synthetic), config=deepcopy(DEFAULT_CONFIG))
+    sources = {name: SOURCES[name] for name in CHART_SOURCES}
+    try:
+        history, errors = generator.fetch_all(sources, start=_chart_start('2026-01-16'), end='2026-02-11')
+        day, _ = generator.fetch_all(sources, start=_chart_start('2026-01-20'), end='2026-01-20')
+    finally:
+        generator.close()
+    
+    assert not errors and all(day.values())
+    assert min(row['tanggal'] for row in day['fx']) < _chart_start('2026-01-20')
+    assert slice_chart_history(history, '2026-01-20') == day
@@ -0,0 +1,27 @@
+import pytest
+
+from ingest_market_update import parse_number
+
+
+@pytest.mark.parametrize('cell, expected', [
+    ('5,2530', 5.253),
+    ('1.044,37', 1044.37),
+    ('1,044.37', 1044.37),
+    ('Rp16.782', 16782.0),
+    ('US$1.250', 1250.0),
+    ('(0,23%)', -0.23),
+    ('-1.3 bps', -1.3),
+    ('12.345.678', 12345678.0),
+    ('5.253%', 5.253),
+    ('n/a', None),
+])
+def test_parse_number(cell, expected):
+    assert parse_number(cell) == expected
+
+
+def test_parse_number_three_decimal_rate():
+    # A yield cell: the lone separator before three digits is the decimal point
+    assert parse_number('5.253', rate=True) == 5.253
+    assert parse_number('5,253', rate=True) == 5.253
+    # Elsewhere it groups thousands, as the report is written in Indonesian notation
+    assert parse_number('5.253') == 5253.0
@@ -0,0 +1,143 @@
+import math
+from copy import deepcopy
+
+import pytest
+
+from generate_market_report import (
+    DEFAULT_CONFIG, QUALITY_SOURCES, MarketReportGenerator, AKPConnection, RunningStats, _carried_forward,
+    _check_trades, robust_spread
+)
+
+
+def settings():
+    return dict(DEFAULT_CONFIG['quality'])
+
+
+def test_robust_spread_by_hand():
+    # median 3; deviations 2, 1, 0, 1, 97 -> MAD 1, mean 101 / 5
+    assert robust_spread([1.0, 2.0, 3.0, 4.0, 100.0]) == (3.0, 1.0, 20.2)
+    # even count: median and MAD average the middle pair
+    assert robust_spread([1.0, 2.0, 4.0, 8.0]) == (3.0, 1.5, 2.25)
+
+
+def series_row(trades):
+    """A get_plte_stats() row for (yield, price, volume) trades of one series"""
+    stats, positive = RunningStats(), [(value, price) for value, price, _ in trades if value > 0]
+    for value, _, volume in trades:
+        if 0 < value < 20:
+            stats.add(value, volume)
+    return {
+        'date': '2026-02-11', 'security': 'FR0100', 'trades': len(trades),
+        'yield_count': stats.count, 'yield_mean': stats.mean, 'yield_m2': stats.m2,
+        'yield_volume': stats.volume, 'yield_weighted': stats.weighted,
+        'positive_count': len(positive), 'positive_yield': sum(value for value, _ in positive) / len(positive),
+        'price': sum(price for _, price in positive) / len(positive), 'price_count': len(positive)
+    }
+
+
+def flag(value, price, volume, **issues):
+    return dict({'date': '2026-02-11', 'security': 'FR0100', 'yield': value, 'price': price, 'coupon': 6.5,
+                 'volume': volume, 'robust_z': issues.pop('robust_z', None),
+                 'outlier': 0, 'invalid': 0, 'mismatch': 0}, **issues)
+
+
+def test_check_trades_removes_outlier_and_invalid_yield():
+    clean = [(6.0, 101.0, 10.0), (6.1, 100.5, 20.0), (6.2, 100.0, 30.0), (6.3, 99.5, 40.0)]
+    outlier, invalid = (9.0, 80.0, 50.0), (25.0, 40.0, 60.0)
+    stats = [series_row(clean + [outlier, invalid])]
+    flags = [flag(*outlier, robust_z=40.5, outlier=1), flag(*invalid, invalid=1)]
+    
+    checked, report = _check_trades(stats, flags, settings())
+    
+    expected = series_row(clean)
+    row = checked[0]
+    assert row['trades'] == 6
+    assert row['yield_count'] == 4 and row['positive_count'] == 4 and row['price_count'] == 4
+    for column in ('yield_mean', 'yield_m2', 'yield_volume', 'yield_weighted', 'positive_yield', 'price'):
+        assert row[column] == pytest.approx(expected[column]), column
+    assert stats[0]['yield_count'] == 5  # the input rows are left alone
+    assert {key: report[key] for key in ('trades', 'invalid_yields', 'outliers', 'mismatches', 'adjusted_series')} == {
+        'trades': 6, 'invalid_yields': 1, 'outliers': 1, 'mismatches': 0, 'adjusted_series': 1
+    }
+    assert [trade['issues'] for trade in report['flagged']] == [['outlier'], ['invalid']]
+
+
+def test_check_quality_duplicates_stale_columns_and_gaps():
+    generator = MarketReportGenerator(config=deepcopy(DEFAULT_CONFIG))
+    fx = [
+        {'tanggal': '2026-02-11', 'USD': 16700.0, 'EUR': 19800.0, 'JPY': 108.0, 'SGD': 12400.0},
+        {'tanggal': '2026-02-11', 'USD': 16650.0, 'EUR': 19700.0, 'JPY': 107.0, 'SGD': 12300.0},
+        {'tanggal': '2026-02-10', 'USD': 16710.0, 'EUR': 19800.0, 'JPY': 108.0, 'SGD': 12410.0},
+        {'tanggal': '2026-02-02', 'USD': 16600.0, 'EUR': 19600.0, 'JPY': 106.0, 'SGD': 12350.0},
+    ]
+    commodities = [
+        {'tanggal': '2026-02-11', 'ICP': 70.0, 'WTI': 65.0, 'PALM_OIL': 900.0},
+        {'tanggal': '2026-02-10', 'ICP': 70.0, 'WTI': 65.0, 'PALM_OIL': 900.0},
+    ]
+    
+    data, quality = generator.check_quality({'fx': fx, 'commodities': commodities})
+    
+    checks = quality['sources']['fx']
+    assert checks['duplicates'] == 1
+    assert checks['stale_dates'] == []
+    assert checks['stale_columns'] == [{'date': '2026-02-11', 'columns': ['EUR', 'JPY']}]
+    assert checks['gaps'] == [{'from': '2026-02-02', 'to': '2026-02-10', 'missing_days': 5}]
+    # The first row of the duplicated date is kept and the values are left as they are
+    assert data['fx'] == [fx[0], fx[2], fx[3]]
+    # Commodities are only flagged
+    assert quality['sources']['commodities']['stale_dates'] == ['2026-02-11']
+    assert _carried_forward(quality, 'commodities', data['commodities']) == set()
+    
+    assert _carried_forward(quality, 'fx', data['fx']) == {'EUR', 'JPY'}
+    change = generator.calculate_fx_changes(data['fx'], _carried_forward(quality, 'fx', data['fx']))
+    assert change['change'] == pytest.approx(-10.0)
+    change = generator.calculate_fx_changes(data['fx'], {'USD'})
+    assert change['usd'] == 16700.0 and change['change'] is None and change['trend'] is None
+
+
+def test_carried_forward_column_keeps_the_other_changes():
+    generator = MarketReportGenerator(config=deepcopy(DEFAULT_CONFIG))
+    ust = [
+        {'tanggal': '2026-02-11', 'Indonesia': 6.40, 'USA': 4.20},
+        {'tanggal': '2026-02-10', 'Indonesia': 6.35, 'USA': 4.20},
+    ]
+    data, quality = generator.check_quality({'ust': ust})
+    
+    stale = _carried_forward(quality, 'ust', data['ust'])
+    assert stale == {'USA'}
+    changes = generator.calculate_ust_changes(data['ust'], stale)
+    assert changes['indo_change_bps'] == pytest.approx(5.0) and changes['indo_trend'] == 'naik'
+    assert changes['ust_yield'] == 4.20 and changes['ust_change_bps'] is None
+    assert changes['spread_bps'] == pytest.approx(220.0) and changes['spread_change_bps'] is None
+
+
+def test_quality_sources_follow_the_enabled_setting():
+    config = deepcopy(DEFAULT_CONFIG)
+    assert set(QUALITY_SOURCES) <= set(MarketReportGenerator(config=config).sources())
+    config['quality'] = {'enabled': False}
+    assert not set(QUALITY_SOURCES) & set(MarketReportGenerator(config=config).sources())
+
+
+def test_plte_flags_from_aggregate_match_index_pass(synthetic):
+    generator = MarketReportGenerator(connect=lambda: AKPConnection(synthetic), config=deepcopy(DEFAULT_CONFIG))
+    try:
+        assert generator.db.aggregate_fresh('PLTE_Daily_Series')
+        aggregate = generator.get_plte_flags('2026-01-05', '2026-02-11')
+        generator.db.aggregate_fresh = lambda name: False
+        scanned = generator.get_plte_flags('2026-01-05', '2026-02-11')
+        # Without the bootstrap index the report dates' trades are materialized first
+        generator.db.has_index = lambda schema, index: False
+        unindexed = generator.get_plte_flags('2026-01-05', '2026-02-11')
+    finally:
+        generator.close()
+    
+    assert aggregate and any(trade['outlier'] for trade in aggregate)
+    assert unindexed == scanned
+    assert len(aggregate) == len(scanned)
+    for left, right in zip(aggregate, scanned):
+        assert {key: value for key, value in left.items() if key != 'robust_z'} == \
+               {key: value for key, value in right.items() if key != 'robust_z'}
+        if left['robust_z'] is None:
+            assert right['robust_z'] is None
+        else:
+            assert math.isclose(left['robust_z'], right['robust_z'], rel_tol=1e-9, abs_tol=1e-9)
@@ -0,0 +1,39 @@
+import statistics
+
+import pytest
+
+from generate_market_report import RunningStats
+
+VALUES = [6.12, 6.25, 5.98, 6.40, 6.33, 6.07, 6.18]
+VOLUMES = [10.0, 25.0, 5.0, 40.0, 15.0, 30.0, 20.0]
+
+
+def accumulate(values, volumes):
+    stats = RunningStats()
+    for value, volume in zip(values, volumes):
+        stats.add(value, volume)
+    return stats
+
+
+def assert_matches(stats, values, volumes):
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(statistics.fmean(values))
+    assert stats.variance == pytest.approx(statistics.variance(values))
+    assert stats.vw_mean == pytest.approx(sum(v * w for v, w in zip(values, volumes)) / sum(volumes))
+
+
+def test_running_stats_add():
+    assert_matches(accumulate(VALUES, VOLUMES), VALUES, VOLUMES)
+
+
+def test_running_stats_merge():
+    merged = accumulate(VALUES[:3], VOLUMES[:3]).merge(accumulate(VALUES[3:], VOLUMES[3:]))
+    assert_matches(merged, VALUES, VOLUMES)
+    assert_matches(RunningStats().merge(accumulate(VALUES, VOLUMES)), VALUES, VOLUMES)
+
+
+def test_running_stats_remove_undoes_merge():
+    remaining = accumulate(VALUES, VOLUMES).remove(accumulate(VALUES[4:], VOLUMES[4:]))
+    assert_matches(remaining, VALUES[:4], VOLUMES[:4])
+    emptied = accumulate(VALUES, VOLUMES).remove(accumulate(VALUES, VOLUMES))
+    assert (emptied.count, emptied.mean, emptied.m2, emptied.volume) == (0, 0.0, 0.0, 0.0)
@@ -0,0 +1,28 @@
+from copy import deepcopy
+
+from generate_market_report import DEFAULT_CONFIG, AKPConnection, MarketReportGenerator, ReportWatcher
+
+
+def test_consistent_fetch_matches_concurrent_fetch(synthetic):
+    generator = MarketReportGenerator(connect=lambda: AKPConnection(synthetic), config=deepcopy(DEFAULT_CONFIG))
+    try:
+        assert generator.fetch_all(consistent=True) == generator.fetch_all()
+    finally:
+        generator.close()
+
+
+def test_watcher_keeps_the_last_report_while_data_keeps_changing(synthetic):
+    generator = MarketReportGenerator(connect=lambda: AKPConnection(synthetic), config=deepcopy(DEFAULT_CONFIG))
+    watcher = ReportWatcher(generator)
+    try:
+        report = watcher.refresh()
+        assert report is not None and watcher.report is report
+        versions = watcher.versions
+        
+        # Every poll sees a new commit, so no fetch is ever consistent
+        commits = iter(range(1000))
+        watcher.poll = lambda: {alias: (next(commits), 0) for alias in synthetic}
+        assert watcher.refresh() is None
+        assert watcher.report is report and watcher.versions == versions
+    finally:
+        watcher.close()